@@ -0,0 +1 @@
+"""Benchmarks for MindCraft's model and file handling."""
@@ -0,0 +1,90 @@
+"""Cost of keeping map analytics up to date while editing.
+
+Builds the analytics of a 100k node tree map (100k connections) once,
+then times single edits with them tracked: adding and removing cross
+links, cutting a random tree connection and putting it back, and
+deleting a node and undoing that.  Each edit's time includes the
+graph's own work; the same edits without analytics are timed for
+comparison.
+
+    python -m benchmarks.bench_analytics
+"""
+
+import random
+import statistics
+import time
+
+from mindcraft.graph import Node
+from mindcraft.mapfile import graph_from_data
+
+from .synthetic import tree_map
+
+NODES = 100_001
+EDITS = 2_000
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(graph, rng):
+    ids = list(graph.nodes)
+    times = {"link": [], "unlink": [], "cut": [], "rejoin": [], "delete": [], "restore": []}
+    for _ in range(EDITS):
+        a, b = rng.sample(ids, 2)
+        if graph.add_edge(a, b) is not None:
+            graph.remove_edge(a, b)
+            times["link"].append(timed(graph.add_edge, a, b))
+            times["unlink"].append(timed(graph.remove_edge, a, b))
+
+        conn = graph.edges[rng.choice(list(graph.edges))]
+        times["cut"].append(timed(graph.remove_edge, conn.from_id, conn.to_id))
+        times["rejoin"].append(timed(graph.add_edge, conn.from_id, conn.to_id))
+
+        node = graph.nodes[rng.choice(ids)]
+        start = time.perf_counter()
+        _, removed = graph.remove_node(node.id)
+        times["delete"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        graph.add_node(Node(node.id, node.x, node.y, node.w, node.h, node.text))
+        for c in removed:
+            graph.add_edge(c.from_id, c.to_id)
+        times["restore"].append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    data = tree_map(NODES)
+    print(f"{NODES} nodes, {NODES - 1} connections, {EDITS} edits of each kind")
+
+    plain = run(graph_from_data(data), random.Random(0))
+    graph = graph_from_data(data)
+    build = timed(graph.track_analytics)
+    tracked = run(graph, random.Random(0))
+    print(f"analytics built in {build * 1e3:.0f} ms")
+
+    print(f"{'edit':>8}  {'plain med':>10}  {'tracked med':>12}  {'p99 (us)':>9}  "
+          f"{'max (us)':>9}")
+    for name, times in tracked.items():
+        times.sort()
+        print(
+            f"{name:>8}  {statistics.median(plain[name]) * 1e6:>10.1f}  "
+            f"{statistics.median(times) * 1e6:>12.1f}  "
+            f"{times[int(len(times) * 0.99)] * 1e6:>9.1f}  {times[-1] * 1e6:>9.1f}"
+        )
+
+    analytics = graph.analytics
+    fresh = type(analytics)(graph)
+    agreed = (
+        analytics.degrees == fresh.degrees
+        and analytics.orphans == fresh.orphans
+        and sorted(analytics.sizes.values()) == sorted(fresh.sizes.values())
+        and analytics.largest_trees(3) == fresh.largest_trees(3)
+    )
+    print(f"matches a rebuild: {agreed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Editing, save and load timings through the app itself.
+
+Drives a real MindCraftApp on a withdrawn Tk root, so every operation
+pays for the model, the renderer, the journal and undo history, just as
+it does for a user:
+
+    create_node        nodes added at random points in view
+    create_connection  connections between random nodes
+    drag               one motion frame of a node drag (event + redraw)
+    move_node          a node moved by the app's move_node
+    delete_node        random nodes deleted with their connections
+    save_map           JSON and binary saves of the whole map
+    load_map           loading and installing the map in the app
+
+Save and load run on the calling thread (the app hands the same calls
+to a worker), so their times do not include the worker's polling delay.
+
+Results are seconds per operation.  `--json` writes them, with the
+parameters used, for comparing revisions; `--baseline` compares against
+such a file and exits with status 1 if any operation got more than
+`--threshold` times slower.  On a machine without a display, run it
+under Xvfb:
+
+    python -m benchmarks.bench_app --nodes 20000 --json now.json
+    xvfb-run python -m benchmarks.bench_app --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from mindcraft import mapfile
+
+from .synthetic import random_map, tree_map
+
+DEFAULT_THRESHOLD = 1.25  # slowdown tolerated before the run fails
+
+
+class Event:
+    """The fields of a Tk mouse event the canvas handlers read."""
+
+    def __init__(self, x, y, state=0):
+        self.x = x
+        self.y = y
+        self.state = state
+
+
+def make_map(kind, node_count, degree, seed):
+    if kind == "tree":
+        return tree_map(node_count, branching=degree, seed=seed)
+    return random_map(node_count, degree=degree, seed=seed)
+
+
+def make_app(tmp):
+    """A withdrawn MindCraftApp journaling into `tmp`, or None without a display."""
+    try:
+        import tkinter as tk
+
+        import main
+    except ImportError as e:
+        print(f"skipped: {e}")
+        return None
+    # keep the benchmark's edits out of the user's autosave
+    main.UNTITLED_BASE = os.path.join(tmp, "untitled")
+    try:
+        app = main.MindCraftApp()
+    except tk.TclError as e:
+        print(f"skipped: no display ({e})")
+        return None
+    app.withdraw()
+    app.update()
+    return app
+
+
+def per_op(fn, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count
+
+
+def run(app, data, ops, rng, tmp):
+    results = {}
+    json_path = os.path.join(tmp, "map.json")
+    binary_path = os.path.join(tmp, "map" + mapfile.BINARY_EXTENSION)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    def load(path):
+        start = time.perf_counter()
+        app.install_graph(mapfile.load_map(path), path)
+        app.update_idletasks()
+        return time.perf_counter() - start
+
+    results["load_map"] = load(json_path)
+    camera = app.renderer.camera
+    width = app.canvas.winfo_width()
+    height = app.canvas.winfo_height()
+
+    def point_in_view(_=None):
+        return camera.to_world(rng.uniform(0, width), rng.uniform(0, height))
+
+    created = []
+
+    def create(i):
+        created.append(app.create_node(*point_in_view(), f"Benchmark idea {i}"))
+
+    results["create_node"] = per_op(create, ops)
+
+    node_ids = list(app.graph.nodes)
+
+    def connect(i):
+        app.create_connection(rng.choice(created), rng.choice(node_ids))
+
+    results["create_connection"] = per_op(connect, ops)
+
+    # drag a node in view by small steps, one flushed frame per event
+    node_id = created[0]
+    node = app.graph.nodes[node_id]
+    x, y = camera.to_screen(node.x, node.y)
+    app.on_canvas_mouse_down(Event(x, y))
+
+    def drag(i):
+        app.on_canvas_mouse_drag(Event(x + i % 50, y + i % 30))
+        app.flush_drag()
+        app.update_idletasks()
+
+    results["drag"] = per_op(drag, ops)
+    app.on_canvas_mouse_up(Event(x, y))
+
+    def move(i):
+        app.move_node(rng.choice(created), rng.uniform(-5, 5), rng.uniform(-5, 5))
+
+    results["move_node"] = per_op(move, ops)
+
+    victims = rng.sample(list(app.graph.nodes), min(ops, len(app.graph.nodes)))
+    results["delete_node"] = per_op(lambda i: app.delete_node(victims[i]), len(victims))
+
+    for name, path in (("save_map", json_path), ("save_map_binary", binary_path)):
+        start = time.perf_counter()
+        mapfile.save_map(app.graph.snapshot(), path)
+        results[name] = time.perf_counter() - start
+    results["load_map_binary"] = load(binary_path)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Names of operations more than `threshold` times slower than `baseline`."""
+    return [
+        name
+        for name, seconds in results.items()
+        if baseline.get(name) and seconds > baseline[name] * threshold
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_app")
+    parser.add_argument("--kind", choices=("tree", "random"), default="tree")
+    parser.add_argument("--nodes", type=int, default=20_000)
+    parser.add_argument(
+        "--degree", type=int, default=4,
+        help="children per node (tree) or mean connections per node (random)",
+    )
+    parser.add_argument("--ops", type=int, default=500, help="operations timed per kind")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        if app is None:
+            return 0
+        print(f"{args.kind} map, {args.nodes} nodes, degree {args.degree}, {args.ops} ops")
+        data = make_map(args.kind, args.nodes, args.degree, args.seed)
+        try:
+            results = run(app, data, args.ops, random.Random(args.seed), tmp)
+        finally:
+            app.journal.close()
+            app.destroy()
+
+    params = {
+        "kind": args.kind,
+        "nodes": args.nodes,
+        "degree": args.degree,
+        "ops": args.ops,
+        "seed": args.seed,
+    }
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            earlier = json.load(f)
+        baseline = earlier["results"]
+        if earlier.get("params") != params:
+            print(f"warning: the baseline was run with {earlier.get('params')}")
+
+    print(f"{'operation':<18}  {'time':>12}  {'baseline':>12}")
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        ratio = f"  {seconds / before:>5.2f}x" if before else ""
+        before = f"{before * 1e3:>9.3f} ms" if before else f"{'-':>12}"
+        print(f"{name:<18}  {seconds * 1e3:>9.3f} ms  {before}{ratio}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "params": params,
+                    "python": platform.python_version(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print(f"FAIL: slower than the baseline by more than {args.threshold}x: {', '.join(slower)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Per-event drag cost as the total number of connections grows.
+
+Dragging a node moves it in the model (including its spatial index
+entries) and redraws the lines attached to it.  With the adjacency index
+that work is O(degree), so the time per motion event should stay flat
+while the map gets bigger.  The old full scan of the connection
+list is timed alongside for comparison.
+
+    python -m benchmarks.bench_drag
+"""
+
+import random
+import time
+
+from mindcraft.graph import Graph, Node
+
+EDGE_COUNTS = (1_000, 5_000, 20_000, 100_000)
+DRAGGED_DEGREE = 8
+EVENTS = 200
+
+
+def build_graph(edge_count, seed=0):
+    """Random map with `edge_count` connections plus one hub of fixed degree."""
+    rng = random.Random(seed)
+    graph = Graph()
+    node_count = max(DRAGGED_DEGREE + 1, edge_count // 2)
+    for node_id in range(1, node_count + 1):
+        graph.add_node(Node(node_id, rng.uniform(0, 5000), rng.uniform(0, 5000), 100, 40, ""))
+
+    hub = 1
+    for other in range(2, DRAGGED_DEGREE + 2):
+        graph.add_edge(hub, other)
+    while len(graph.edges) < edge_count:
+        a = rng.randint(DRAGGED_DEGREE + 2, node_count)
+        b = rng.randint(DRAGGED_DEGREE + 2, node_count)
+        if a != b:
+            graph.add_edge(a, b)
+    return graph, hub
+
+
+def drag_indexed(graph, node_id):
+    graph.move_node(node_id, 1, 1)
+    node = graph.nodes[node_id]
+    coords = []
+    for conn in graph.edges_of(node_id):
+        other = graph.nodes[conn.to_id if conn.from_id == node_id else conn.from_id]
+        coords.append((node.x, node.y, other.x, other.y))
+    return coords
+
+
+def drag_full_scan(graph, node_id):
+    node = graph.nodes[node_id]
+    node.x += 1
+    node.y += 1
+    coords = []
+    for conn in graph.edges.values():
+        if conn.from_id == node_id or conn.to_id == node_id:
+            other_id = conn.to_id if conn.from_id == node_id else conn.from_id
+            other = graph.nodes[other_id]
+            coords.append((node.x, node.y, other.x, other.y))
+    return coords
+
+
+def time_per_event(fn, graph, node_id, events=EVENTS):
+    start = time.perf_counter()
+    for _ in range(events):
+        fn(graph, node_id)
+    return (time.perf_counter() - start) / events
+
+
+def main():
+    print(f"{'edges':>9}  {'indexed (us/event)':>19}  {'full scan (us/event)':>21}")
+    for edge_count in EDGE_COUNTS:
+        graph, hub = build_graph(edge_count)
+        indexed = time_per_event(drag_indexed, graph, hub)
+        scan = time_per_event(drag_full_scan, graph, hub, events=20)
+        print(f"{edge_count:>9}  {indexed * 1e6:>19.2f}  {scan * 1e6:>21.2f}")
+
+
+if __name__ == "__main__":
+    main()
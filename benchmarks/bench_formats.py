@@ -0,0 +1,45 @@
+"""Save/load time and file size of the JSON and binary map formats.
+
+    python -m benchmarks.bench_formats
+"""
+
+import os
+import tempfile
+import time
+
+from mindcraft.binmap import load_binary, save_binary
+from mindcraft.mapfile import graph_from_data, load_json, save_json
+
+from .synthetic import tree_map
+
+SIZES = (10_000, 100_000)
+FORMATS = (
+    ("json", ".json", save_json, load_json),
+    ("binary", ".mcmap", save_binary, load_binary),
+)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'nodes':>8}  {'format':>7}  {'size (KB)':>10}  {'save (ms)':>10}  {'load (ms)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            graph = graph_from_data(tree_map(size))
+            for name, ext, save, load in FORMATS:
+                path = os.path.join(tmp, f"map_{size}{ext}")
+                save_time = timed(save, graph, path)
+                load_time = timed(load, path)
+                kb = os.path.getsize(path) / 1024
+                print(
+                    f"{size:>8}  {name:>7}  {kb:>10.0f}  "
+                    f"{save_time * 1e3:>10.1f}  {load_time * 1e3:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
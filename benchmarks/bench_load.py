@@ -0,0 +1,55 @@
+"""Map loading time on synthetic maps of 1k, 10k and 100k nodes.
+
+Loading is linear in the size of the map, so the cost per node should
+stay roughly constant as maps grow.  The script exits with status 1 if
+the per-node cost at the largest size is more than `MAX_SLOWDOWN` times
+the cost at the smallest one.
+
+    python -m benchmarks.bench_load
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from mindcraft.mapfile import load_json
+
+from .synthetic import tree_map
+
+SIZES = (1_000, 10_000, 100_000)
+MAX_SLOWDOWN = 3.0
+
+
+def time_load(path, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_json(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    per_node = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'nodes':>8}  {'load (ms)':>10}  {'per node (us)':>14}")
+        for size in SIZES:
+            path = os.path.join(tmp, f"map_{size}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(tree_map(size), f, indent=2)
+            elapsed = time_load(path)
+            per_node[size] = elapsed / size
+            print(f"{size:>8}  {elapsed * 1e3:>10.1f}  {per_node[size] * 1e6:>14.2f}")
+
+    slowdown = per_node[SIZES[-1]] / per_node[SIZES[0]]
+    print(f"per-node slowdown {SIZES[0]} -> {SIZES[-1]}: {slowdown:.2f}x")
+    if slowdown > MAX_SLOWDOWN:
+        print(f"FAIL: loading is not linear (limit {MAX_SLOWDOWN}x)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Memory per node of the map model, against the old dict records.
+
+Nodes and connections used to be plain dicts; they are now slotted
+Node and Connection records with interned labels.  Both are built from
+the same JSON text, so the labels start out as separate string objects
+just as they do after a load.  The size of every distinct object kept
+(containers, records and the values in them) is divided by the node
+count.  The tree map reuses 97 labels, which is where interning pays
+off; the labelled map's labels are mostly distinct.
+
+    python -m benchmarks.bench_memory
+"""
+
+import json
+import sys
+
+from mindcraft.graph import Connection, Node
+
+from .synthetic import labelled_map, tree_map
+
+SIZES = (10_000, 100_000)
+
+
+def dict_records(data):
+    nodes = {
+        n["id"]: {
+            "id": n["id"], "x": n["x"], "y": n["y"],
+            "w": 100.0, "h": 40.0, "text": str(n["text"]),
+        }
+        for n in data["nodes"]
+    }
+    edges = [{"from": c["from"], "to": c["to"]} for c in data["connections"]]
+    return nodes, edges
+
+
+def slotted_records(data):
+    nodes = {
+        n["id"]: Node(n["id"], n["x"], n["y"], 100.0, 40.0, str(n["text"]))
+        for n in data["nodes"]
+    }
+    edges = [Connection(c["from"], c["to"]) for c in data["connections"]]
+    return nodes, edges
+
+
+def footprint(nodes, edges):
+    """Bytes held by the containers, the records and their values."""
+    seen = set()
+    total = sys.getsizeof(nodes) + sys.getsizeof(edges)
+    for record in (*nodes.values(), *edges):
+        if isinstance(record, dict):
+            values = list(record.values())
+        else:
+            values = [getattr(record, name) for name in record.__slots__]
+        for value in (record, *values):
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+def main():
+    print(f"{'nodes':>8}  {'labels':>8}  {'dicts':>10}  {'records':>10}")
+    for size in SIZES:
+        for name, data in (
+            ("distinct", labelled_map(size)),
+            ("repeated", tree_map(size)),
+        ):
+            text = json.dumps(data)
+            before = footprint(*dict_records(json.loads(text))) / size
+            after = footprint(*slotted_records(json.loads(text))) / size
+            print(f"{size:>8}  {name:>8}  {before:>8.0f} B  {after:>8.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Time to import and merge many maps at once.
+
+Writes MAPS labelled maps of NODES nodes each, then times reading them
+in one process and with the default pool, and merging what was read
+with and without label deduplication.  Reading scales with the number
+of CPUs (with one CPU the pool is skipped); the merge itself, which
+sizes the labels and builds the graph, runs in one process.
+
+    python -m benchmarks.bench_merge
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from mindcraft.merge import merge_maps, read_maps
+
+from .synthetic import labelled_map
+
+MAPS = 50
+NODES = 5_000
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(MAPS):
+            path = os.path.join(tmp, f"map_{i:02}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(labelled_map(NODES, seed=i), f)
+            paths.append(path)
+
+        print(f"{MAPS} maps x {NODES} nodes, {os.cpu_count()} CPU(s)")
+        _, serial = timed(read_maps, paths, jobs=1)
+        maps, pooled = timed(read_maps, paths)
+        print(f"  read, one process   {serial:>7.2f} s")
+        print(f"  read, process pool  {pooled:>7.2f} s")
+        for dedupe in (False, True):
+            merged, elapsed = timed(merge_maps, maps, dedupe=dedupe)
+            name = "merge, dedupe" if dedupe else "merge"
+            print(
+                f"  {name:<18}  {elapsed:>7.2f} s  "
+                f"({len(merged.nodes)} nodes, {len(merged.edges)} connections)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Cost of routing connection lines around nodes, and of a drag frame.
+
+Routes every connection in a window of the map once (what a full
+redraw of that view costs), then drags random nodes: each drag frame
+reroutes only the lines the move affects, which is timed against
+routing the whole window again.
+
+    python -m benchmarks.bench_routing
+"""
+
+import random
+import time
+
+from mindcraft.mapfile import graph_from_data
+from mindcraft.routing import EdgeRouter
+
+from .synthetic import random_map
+
+SIZES = (10_000, 100_000)
+WINDOW = 3_000  # world units on each side of the routed window
+MOVES = 200
+
+
+def main():
+    print(f"{'nodes':>8}  {'window edges':>12}  {'curved':>7}  {'full (ms)':>10}  "
+          f"{'drag (ms)':>10}  {'rerouted':>9}")
+    for size in SIZES:
+        graph = graph_from_data(random_map(size, seed=size))
+        router = EdgeRouter(graph)
+        keys = graph.edges_in_rect(0, 0, WINDOW, WINDOW)
+
+        start = time.perf_counter()
+        for key in keys:
+            router.route(key)
+        full = time.perf_counter() - start
+        curved = sum(1 for key in keys if len(router.route(key)) == 6)
+
+        rng = random.Random(0)
+        movable = list(graph.nodes_in_rect(0, 0, WINDOW, WINDOW))
+        rerouted = 0
+        start = time.perf_counter()
+        for _ in range(MOVES):
+            node_id = rng.choice(movable)
+            graph.move_node(node_id, rng.uniform(-20, 20), rng.uniform(-20, 20))
+            for key in router.node_changed(node_id):
+                router.route(key)
+                rerouted += 1
+        drag = (time.perf_counter() - start) / MOVES
+
+        print(
+            f"{size:>8}  {len(keys):>12}  {curved:>7}  {full * 1e3:>10.1f}  "
+            f"{drag * 1e3:>10.3f}  {rerouted / MOVES:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Search latency on a 100k-node map.
+
+Types a few words one key at a time, the way the search box queries the
+index on every key release, and reports the time per query by prefix
+length.  Also times building the index and one edit (node added and
+removed again) while searching.
+
+    python -m benchmarks.bench_search
+"""
+
+import random
+import sys
+import time
+
+from mindcraft.mapfile import graph_from_data
+
+from .synthetic import labelled_map
+
+NODE_COUNT = 100_000
+WORDS_TYPED = 200
+LIMIT = 50  # results the app asks for
+
+
+def main():
+    print(f"building a {NODE_COUNT}-node map...")
+    data = labelled_map(NODE_COUNT)
+    start = time.perf_counter()
+    graph = graph_from_data(data)
+    build = time.perf_counter() - start
+    index = graph.text_index
+    print(f"map built in {build:.2f}s, {len(index.postings)} distinct words indexed")
+
+    rng = random.Random(1)
+    texts = [node.text for node in graph.nodes.values()]
+    by_length = {}
+    for _ in range(WORDS_TYPED):
+        words = rng.choice(texts).split()
+        query = ""
+        for word in words[:2]:
+            query = f"{query} " if query else ""
+            for ch in word:
+                query += ch
+                start = time.perf_counter()
+                index.search(query, LIMIT)
+                by_length.setdefault(min(len(query), 8), []).append(
+                    time.perf_counter() - start
+                )
+
+    print(f"{'query length':>12}  {'queries':>7}  {'avg (ms)':>9}  {'max (ms)':>9}")
+    for length in sorted(by_length):
+        times = by_length[length]
+        label = f"{length}+" if length == 8 else str(length)
+        print(
+            f"{label:>12}  {len(times):>7}  {sum(times) / len(times) * 1e3:>9.3f}"
+            f"  {max(times) * 1e3:>9.3f}"
+        )
+
+    # an edit between two keystrokes
+    node_id = graph.max_node_id() + 1
+    start = time.perf_counter()
+    index.add(node_id, "Zyzzyva quarterly review")
+    found = index.search("zyzz", LIMIT)
+    index.remove(node_id)
+    print(f"add + search + remove: {(time.perf_counter() - start) * 1e3:.3f} ms"
+          f" (found: {found == [node_id]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Bandwidth and latency of a live session, and the cost of joining late.
+
+A SyncServer on localhost holds a 10k node map.  Several headless
+clients join it and each drags a node of its own at 60 frames per
+second, sending one batch per frame as the app does.  Latency is timed
+from the frame a batch is sent in to the frame another client applies
+it, so it includes waiting for that client's next frame.  Bandwidth
+leaves out the snapshot each client received when joining.  At the end
+every copy of the map is compared with the server's.
+
+Then a client joins a 100k node session; its snapshot is compared with
+the same map as JSON records.
+
+    python -m benchmarks.bench_sync
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+
+from mindcraft import sync
+from mindcraft.mapfile import graph_from_data
+from mindcraft.ops import apply_op, restore_op
+
+from .synthetic import labelled_map
+
+CLIENTS = (2, 4, 8)
+NODES = 10_000
+JOIN_NODES = 100_000
+SECONDS = 3.0
+FRAME = 1 / 60
+
+
+def start_server(graph):
+    server = sync.SyncServer(graph)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    port = asyncio.run_coroutine_threadsafe(server.start(port=0), loop).result()
+    return server, loop, port
+
+
+def stop_server(server, loop):
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def positions(graph):
+    return {node_id: (n.x, n.y) for node_id, n in graph.nodes.items()}
+
+
+def drag_session(count):
+    server, loop, port = start_server(graph_from_data(labelled_map(NODES, seed=count)))
+    clients = [sync.join(port=port) for _ in range(count)]
+    joined = [client.bytes_received for client, _ in clients]  # the snapshots
+    rng = random.Random(count)
+    sent_at = {}  # (client, seq) -> time the batch was sent
+    latencies = []
+
+    def apply_events(client, graph):
+        for event in client.poll():
+            _, ops, sender = event
+            for op in ops:
+                apply_op(graph, op)
+            latencies.append(time.perf_counter() - sent_at[sender])
+
+    frames = int(SECONDS / FRAME)
+    dragged = [rng.choice(list(graph.nodes)) for _, graph in clients]
+    start = time.perf_counter()
+    for i in range(frames):
+        for (client, graph), node_id in zip(clients, dragged):
+            node = graph.nodes[node_id]
+            op = {"op": "move", "id": node_id, "x": node.x + 3.0, "y": node.y + 1.0}
+            apply_op(graph, op)
+            client.send(op)
+            seq = client.flush()
+            sent_at[client.client_id, seq] = time.perf_counter()
+            apply_events(client, graph)
+        delay = start + (i + 1) * FRAME - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - start
+
+    # let the last batches arrive, then compare every copy
+    time.sleep(0.2)
+    for client, graph in clients:
+        apply_events(client, graph)
+    reference = positions(server.graph)
+    agreed = all(positions(graph) == reference for _, graph in clients)
+
+    up = sum(client.bytes_sent for client, _ in clients) / count / elapsed
+    down = (
+        sum(client.bytes_received for client, _ in clients) - sum(joined)
+    ) / count / elapsed
+    for client, _ in clients:
+        client.close()
+    stop_server(server, loop)
+    latencies.sort()
+    return {
+        "batches/s": server.batches / elapsed,
+        "up kB/s": up / 1e3,
+        "down kB/s": down / 1e3,
+        "p50 ms": statistics.median(latencies) * 1e3,
+        "p95 ms": latencies[int(len(latencies) * 0.95)] * 1e3,
+        "agreed": agreed,
+    }
+
+
+def late_join():
+    graph = graph_from_data(labelled_map(JOIN_NODES))
+    as_json = len(json.dumps(restore_op(graph), separators=(",", ":")))
+    server, loop, port = start_server(graph)
+    start = time.perf_counter()
+    client, copy = sync.join(port=port)
+    elapsed = time.perf_counter() - start
+    snapshot = client.bytes_received
+    agreed = positions(copy) == positions(graph) and set(copy.edges) == set(graph.edges)
+    client.close()
+    stop_server(server, loop)
+    return as_json, snapshot, elapsed, agreed
+
+
+def main():
+    print(f"{NODES} node map, one node dragged per client at 60 frames/s")
+    print(f"{'clients':>8}  {'batches/s':>10}  {'up kB/s':>8}  {'down kB/s':>10}  "
+          f"{'p50 ms':>7}  {'p95 ms':>7}  {'agreed':>6}")
+    for count in CLIENTS:
+        r = drag_session(count)
+        print(
+            f"{count:>8}  {r['batches/s']:>10.0f}  {r['up kB/s']:>8.1f}  "
+            f"{r['down kB/s']:>10.1f}  {r['p50 ms']:>7.1f}  {r['p95 ms']:>7.1f}  "
+            f"{str(r['agreed']):>6}"
+        )
+
+    as_json, snapshot, elapsed, agreed = late_join()
+    print(f"\nlate join, {JOIN_NODES} nodes: snapshot {snapshot / 1e6:.1f} MB "
+          f"(JSON records {as_json / 1e6:.1f} MB), {elapsed * 1e3:.0f} ms, "
+          f"agreed {agreed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Cost of sizing node labels, with the width and layout caches cold and warm.
+
+Sizes the labels of a 50k-node map drawn from a fixed vocabulary, the
+way real maps repeat words but rarely whole labels.  Only the text
+layout is timed, not the rest of building a graph.  For each backend
+that measures through a font engine, three runs:
+
+    uncached  every label measured as a whole, no cache (the baseline)
+    cold      fresh cache: each distinct word is measured once
+    warm      the same labels again: every label is a cache hit
+
+Backends are a stub that costs STUB_COST per measure call, about what a
+Tk font measure costs once the call has to cross into Tcl, and a real
+Tk font when a display is available.  The built-in estimate is not
+cached, so it gets a single run.
+
+    python -m benchmarks.bench_text
+"""
+
+import sys
+import time
+
+from mindcraft import textmetrics
+from mindcraft.textmetrics import node_size
+
+from .synthetic import labelled_map
+
+NODE_COUNT = 50_000  # every label fits in the layout cache
+STUB_COST = 20e-6  # seconds per stub measure call
+
+
+def stub_measure(font, text):
+    deadline = time.perf_counter() + STUB_COST
+    while time.perf_counter() < deadline:
+        pass
+    return textmetrics.estimate_width(font, text)
+
+
+def tk_backend():
+    """(measure, line_height) for a real Tk font, or None without a display."""
+    try:
+        import tkinter as tk
+        from tkinter import font as tkfont
+
+        root = tk.Tk()
+    except Exception:  # no tkinter or no display
+        return None
+    root.withdraw()
+    family, size = textmetrics.TEXT_FONT
+    tk_font = tkfont.Font(root=root, family=family, size=size)
+    return (
+        lambda font, text: tk_font.measure(text),
+        lambda font: tk_font.metrics("linespace"),
+    )
+
+
+def timed_sizes(labels):
+    start = time.perf_counter()
+    for text in labels:
+        node_size(text)
+    return time.perf_counter() - start
+
+
+def runs(measure, line_height, labels):
+    """(name, seconds, measure calls) for the uncached, cold and warm runs."""
+    calls = [0]
+
+    def counting(font, text):
+        calls[0] += 1
+        return measure(font, text)
+
+    # baseline: one whole-label measurement per node, nothing cached
+    uncached = textmetrics.TextMetrics(counting, line_height, capacity=0)
+    uncached.layout = lambda text: (uncached.width(text), textmetrics.NODE_HEIGHT, text)
+    textmetrics.install(uncached)
+    calls[0] = 0
+    rows = [("uncached", timed_sizes(labels), calls[0])]
+
+    textmetrics.install(textmetrics.TextMetrics(counting, line_height))
+    for name in ("cold", "warm"):
+        calls[0] = 0
+        rows.append((name, timed_sizes(labels), calls[0]))
+    return rows
+
+
+def main():
+    labels = [node["text"] for node in labelled_map(NODE_COUNT)["nodes"]]
+    backends = [("stub", stub_measure, textmetrics.estimate_line_height)]
+    tk = tk_backend()
+    if tk is not None:
+        backends.append(("Tk font", *tk))
+
+    print(f"{NODE_COUNT} labels")
+    print(f"{'backend':>9}  {'run':>9}  {'total (s)':>9}  {'per node (us)':>13}  "
+          f"{'measure calls':>13}")
+    textmetrics.install(textmetrics.TextMetrics())
+    rows = [("estimate", "uncached", timed_sizes(labels), "-")]
+    for backend, measure, line_height in backends:
+        rows.extend((backend, *row) for row in runs(measure, line_height, labels))
+    for backend, name, seconds, count in rows:
+        print(
+            f"{backend:>9}  {name:>9}  {seconds:>9.2f}  "
+            f"{seconds / NODE_COUNT * 1e6:>13.2f}  {count:>13}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
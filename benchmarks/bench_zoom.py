@@ -0,0 +1,82 @@
+"""Zoom frame time on a 50k-node map.
+
+Each wheel step transforms the existing canvas items with one
+canvas.scale and then syncs the viewport, drawing whatever came into
+view and hiding what left it.  A frame is timed from the zoom call until
+the sync has been fully applied, so this is the worst case; in the app
+the sync is spread over several event-loop turns.  The first slice of
+each frame (what blocks input) is reported separately.
+
+Needs a display, since it drives a real (hidden) Tk canvas.
+
+    python -m benchmarks.bench_zoom
+"""
+
+import sys
+import time
+import tkinter as tk
+
+from mindcraft.mapfile import graph_from_data
+from mindcraft.render import CanvasRenderer
+
+from .synthetic import tree_map
+
+NODE_COUNT = 50_000
+WIDTH, HEIGHT = 1100, 700
+STEPS = 12  # wheel notches in, then the same number out
+ZOOM_STEP = 1.15
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_frame(root, renderer, factor):
+    start = time.perf_counter()
+    renderer.zoom(WIDTH / 2, HEIGHT / 2, factor)
+    renderer.sync()
+    first_slice = time.perf_counter() - start
+    while renderer.busy:
+        renderer._drain()
+    root.update_idletasks()
+    return first_slice, time.perf_counter() - start
+
+
+def main():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"skipped: no display ({e})")
+        return 0
+    root.withdraw()
+    canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT)
+    canvas.pack()
+    root.update()
+
+    print(f"building a {NODE_COUNT}-node map...")
+    graph = graph_from_data(tree_map(NODE_COUNT))
+    renderer = CanvasRenderer(canvas, graph)
+    renderer.center_on(0, 0)
+    run_frame(root, renderer, 1.0)
+
+    first_slices = []
+    frames = []
+    for factor in [1 / ZOOM_STEP] * STEPS + [ZOOM_STEP] * STEPS:
+        first_slice, frame = run_frame(root, renderer, factor)
+        first_slices.append(first_slice)
+        frames.append(frame)
+
+    print(f"{'':>12}  {'avg (ms)':>9}  {'p95 (ms)':>9}  {'max (ms)':>9}")
+    for name, values in (("first slice", first_slices), ("full frame", frames)):
+        print(
+            f"{name:>12}  {sum(values) / len(values) * 1e3:>9.2f}"
+            f"  {percentile(values, 0.95) * 1e3:>9.2f}  {max(values) * 1e3:>9.2f}"
+        )
+    print(f"canvas items: {len(canvas.find_all())}")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Synthetic mind maps for benchmarks."""
+
+import random
+
+
+def tree_map(node_count, branching=4, spacing=160.0, seed=0):
+    """Return map data (the JSON layout) for a random tree of `node_count` nodes.
+
+    Children are placed around their parent, like a hand-drawn mind map.
+    """
+    rng = random.Random(seed)
+    nodes = []
+    connections = []
+    positions = {}
+    for node_id in range(1, node_count + 1):
+        if node_id == 1:
+            x = y = 0.0
+        else:
+            parent = rng.randint(max(1, (node_id - 1) // branching), node_id - 1)
+            px, py = positions[parent]
+            x = px + rng.uniform(-spacing, spacing)
+            y = py + rng.uniform(-spacing, spacing)
+            connections.append({"from": parent, "to": node_id})
+        positions[node_id] = (x, y)
+        nodes.append({
+            "id": node_id,
+            "x": x,
+            "y": y,
+            # repeated labels on purpose: the loader must not rely on them
+            "text": f"Idea {node_id % 97}",
+        })
+    return {"nodes": nodes, "connections": connections}
+
+
+def labelled_map(node_count, vocabulary=5_000, seed=0):
+    """Like tree_map, but labelled with 1-8 words from a random vocabulary.
+
+    Real maps repeat words far more often than whole labels.
+    """
+    rng = random.Random(seed)
+    words = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        for _ in range(vocabulary)
+    ]
+    data = tree_map(node_count, seed=seed)
+    for node in data["nodes"]:
+        count = rng.randint(1, 8)
+        node["text"] = " ".join(rng.choice(words) for _ in range(count)).capitalize()
+    return data
+
+
+def random_map(node_count, degree=4, extent=None, seed=0):
+    """Return map data for a random graph with about `degree` connections per node.
+
+    Nodes are scattered uniformly; each connection joins two random
+    nodes, so there is no tree structure and many cross links.
+    """
+    rng = random.Random(seed)
+    if extent is None:
+        extent = 160.0 * node_count ** 0.5  # about one node per 160x160 square
+    nodes = [
+        {
+            "id": node_id,
+            "x": rng.uniform(0, extent),
+            "y": rng.uniform(0, extent),
+            "text": f"Idea {node_id % 97}",
+        }
+        for node_id in range(1, node_count + 1)
+    ]
+    connections = []
+    seen = set()
+    target = min(node_count * degree // 2, node_count * (node_count - 1) // 2)
+    while len(connections) < target:
+        a = rng.randint(1, node_count)
+        b = rng.randint(1, node_count)
+        key = (a, b) if a <= b else (b, a)
+        if a != b and key not in seen:
+            seen.add(key)
+            connections.append({"from": a, "to": b})
+    return {"nodes": nodes, "connections": connections}
@@ -1,610 +1,1735 @@
-import json
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import customtkinter as ctk
-
-# ================== MindCraft – Minimal Mind Map Builder ================== #
-
-class MindCraftApp(ctk.CTk):
-
-    def __init__(self):
-        super().__init__()
-
-        # ----- Window Basic Setup -----
-        ctk.set_appearance_mode("light")
-        ctk.set_default_color_theme("blue")
-
-        self.title("MindCraft – Mind Map Builder")
-        self.geometry("1100x700")
-        self.minsize(900, 550)
-
-        # ----- Data Structures -----
-        self.nodes = {}  # node_id -> dict
-        self.connections = []  # list of dict {from, to, line_id}
-        self.node_counter = 0
-
-        self.item_to_node = {}  # canvas item id -> node_id
-        self.line_to_connection = {}  # line item id -> connection dict
-
-        self.dragging_node_id = None
-        self.drag_start_offset = (0, 0)
-
-        self.connect_mode = False
-        self.delete_mode = False
-        self.first_connect_node = None
-
-        # ----- UI Layout -----
-        self._build_ui()
-
-    # ---------------------------------------------------------------------
-    # UI
-    # ---------------------------------------------------------------------
-
-    def _build_ui(self):
-        # Top bar
-        top_bar = ctk.CTkFrame(self, height=50, corner_radius=0)
-        top_bar.pack(side="top", fill="x")
-
-        title_label = ctk.CTkLabel(
-            top_bar,
-            text="MindCraft",
-            font=ctk.CTkFont("SF Pro Display", 20, weight="bold"),
-        )
-        title_label.pack(side="left", padx=16, pady=10)
-
-        subtitle_label = ctk.CTkLabel(
-            top_bar,
-            text="Minimal Mind Map Builder",
-            font=ctk.CTkFont(size=13),
-            text_color="#6b7280",
-        )
-        subtitle_label.pack(side="left", pady=10)
-
-        # Main frame
-        main_frame = ctk.CTkFrame(self, corner_radius=0)
-        main_frame.pack(side="top", fill="both", expand=True)
-
-        # Left toolbar
-        left_frame = ctk.CTkFrame(main_frame, width=220, corner_radius=0)
-        left_frame.pack(side="left", fill="y")
-        left_frame.pack_propagate(False)
-
-        # Right canvas container
-        canvas_frame = ctk.CTkFrame(main_frame, corner_radius=10)
-        canvas_frame.pack(side="right", fill="both", expand=True, padx=8, pady=8)
-
-        # ------------- Left Panel Contents -------------
-
-        ctk.CTkLabel(
-            left_frame,
-            text="Tools",
-            font=ctk.CTkFont(size=16, weight="bold"),
-        ).pack(anchor="w", padx=15, pady=(15, 5))
-
-        ctk.CTkLabel(
-            left_frame,
-            text="Double-click on the canvas to create a node.\nDrag to move. Connect or delete using modes.",
-            font=ctk.CTkFont(size=11),
-            text_color="#6b7280",
-            justify="left",
-            wraplength=190,
-        ).pack(anchor="w", padx=15, pady=(0, 15))
-
-        # Connect mode toggle
-        self.connect_button = ctk.CTkButton(
-            left_frame,
-            text="Connect Mode: OFF",
-            command=self.toggle_connect_mode,
-            fg_color="#e5e7eb",
-            text_color="#111827",
-            hover_color="#d1d5db",
-        )
-        self.connect_button.pack(fill="x", padx=15, pady=4)
-
-        # Delete mode toggle
-        self.delete_button = ctk.CTkButton(
-            left_frame,
-            text="Delete Mode: OFF",
-            command=self.toggle_delete_mode,
-            fg_color="#fee2e2",
-            text_color="#991b1b",
-            hover_color="#fecaca",
-        )
-        self.delete_button.pack(fill="x", padx=15, pady=4)
-
-        # Separator
-        ctk.CTkLabel(
-            left_frame,
-            text="",
-            height=2,
-            fg_color="#e5e7eb",
-        ).pack(fill="x", padx=15, pady=(12, 8))
-
-        # Save/Load buttons
-        ctk.CTkLabel(
-            left_frame,
-            text="Mind Map",
-            font=ctk.CTkFont(size=14, weight="bold"),
-        ).pack(anchor="w", padx=15)
-
-        save_btn = ctk.CTkButton(
-            left_frame,
-            text="💾 Save Map",
-            command=self.save_map_dialog,
-        )
-        save_btn.pack(fill="x", padx=15, pady=(6, 4))
-
-        load_btn = ctk.CTkButton(
-            left_frame,
-            text="📂 Load Map",
-            command=self.load_map_dialog,
-        )
-        load_btn.pack(fill="x", padx=15, pady=4)
-
-        clear_btn = ctk.CTkButton(
-            left_frame,
-            text="🧹 Clear Canvas",
-            fg_color="#f97316",
-            hover_color="#ea580c",
-            command=self.clear_canvas,
-        )
-        clear_btn.pack(fill="x", padx=15, pady=(12, 4))
-
-        # Status
-        self.status_label = ctk.CTkLabel(
-            left_frame,
-            text="Ready",
-            font=ctk.CTkFont(size=11),
-            text_color="#6b7280",
-            wraplength=190,
-            justify="left",
-        )
-        self.status_label.pack(anchor="w", padx=15, pady=(18, 4))
-
-        ctk.CTkLabel(
-            left_frame,
-            text="Shortcuts:\n• Double-click: New node\n• Drag: Move node\n• Toggle modes on left",
-            font=ctk.CTkFont(size=10),
-            text_color="#9ca3af",
-            justify="left",
-            wraplength=190,
-        ).pack(anchor="w", padx=15, pady=(4, 16))
-
-        # ------------- Canvas -------------
-
-        # Canvas with white background for Apple-style flat look
-        self.canvas = tk.Canvas(
-            canvas_frame,
-            bg="#f9fafb",
-            highlightthickness=0,
-        )
-        self.canvas.pack(fill="both", expand=True, padx=8, pady=8)
-
-        # Canvas bindings
-        self.canvas.bind("<Double-Button-1>", self.on_canvas_double_click)
-        self.canvas.bind("<Button-1>", self.on_canvas_mouse_down)
-        self.canvas.bind("<B1-Motion>", self.on_canvas_mouse_drag)
-        self.canvas.bind("<ButtonRelease-1>", self.on_canvas_mouse_up)
-
-    # ---------------------------------------------------------------------
-    # Node Helpers
-    # ---------------------------------------------------------------------
-
-    def create_node(self, x, y, text):
-        """Create a flat, minimal node at position."""
-        self.node_counter += 1
-        node_id = self.node_counter
-
-        # Approx width based on text length
-        text_len = max(4, len(text))
-        width = min(220, 70 + text_len * 7)
-        height = 40
-
-        x1 = x - width / 2
-        y1 = y - height / 2
-        x2 = x + width / 2
-        y2 = y + height / 2
-
-        rect_id = self.canvas.create_rectangle(
-            x1,
-            y1,
-            x2,
-            y2,
-            fill="#ffffff",
-            outline="#d1d5db",
-            width=1,
-        )
-        text_id = self.canvas.create_text(
-            x,
-            y,
-            text=text,
-            font=("SF Pro Text", 11),
-            fill="#111827",
-        )
-
-        self.nodes[node_id] = {
-            "id": node_id,
-            "x": x,
-            "y": y,
-            "w": width,
-            "h": height,
-            "text": text,
-            "rect_id": rect_id,
-            "text_id": text_id,
-        }
-
-        self.item_to_node[rect_id] = node_id
-        self.item_to_node[text_id] = node_id
-
-        return node_id
-
-    def get_node_at(self, x, y):
-        """Return node_id at given canvas coords, or None."""
-        items = self.canvas.find_overlapping(x - 2, y - 2, x + 2, y + 2)
-        for item in items:
-            node_id = self.item_to_node.get(item)
-            if node_id is not None:
-                return node_id
-        return None
-
-    def get_connection_at(self, x, y):
-        """Return line_id at given point, or None."""
-        # Use find_closest and check if it's a line we know
-        items = self.canvas.find_overlapping(x - 2, y - 2, x + 2, y + 2)
-        for item in items:
-            if item in self.line_to_connection:
-                return item
-        return None
-
-    def move_node(self, node_id, dx, dy):
-        node = self.nodes[node_id]
-        node["x"] += dx
-        node["y"] += dy
-
-        self.canvas.move(node["rect_id"], dx, dy)
-        self.canvas.move(node["text_id"], dx, dy)
-
-        self.update_node_connections(node_id)
-
-    def update_node_connections(self, node_id):
-        """Update all lines attached to this node."""
-        node = self.nodes[node_id]
-        x, y = node["x"], node["y"]
-        for conn in self.connections:
-            if conn["from"] == node_id or conn["to"] == node_id:
-                other_id = conn["to"] if conn["from"] == node_id else conn["from"]
-                other = self.nodes.get(other_id)
-                if not other:
-                    continue
-                x2, y2 = other["x"], other["y"]
-                if conn["from"] == node_id:
-                    self.canvas.coords(conn["line_id"], x, y, x2, y2)
-                else:
-                    self.canvas.coords(conn["line_id"], x2, y2, x, y)
-
-    # ---------------------------------------------------------------------
-    # Modes
-    # ---------------------------------------------------------------------
-
-    def toggle_connect_mode(self):
-        self.connect_mode = not self.connect_mode
-        if self.connect_mode:
-            self.delete_mode = False
-            self.first_connect_node = None
-            self.connect_button.configure(
-                text="Connect Mode: ON",
-                fg_color="#dbeafe",
-                text_color="#1d4ed8",
-            )
-            self.delete_button.configure(
-                text="Delete Mode: OFF",
-                fg_color="#fee2e2",
-                text_color="#991b1b",
-            )
-            self.status_label.configure(
-                text="Connect Mode: Click first node, then second node to create a connection."
-            )
-        else:
-            self.first_connect_node = None
-            self.connect_button.configure(
-                text="Connect Mode: OFF",
-                fg_color="#e5e7eb",
-                text_color="#111827",
-            )
-            self.status_label.configure(text="Ready")
-
-    def toggle_delete_mode(self):
-        self.delete_mode = not self.delete_mode
-        if self.delete_mode:
-            self.connect_mode = False
-            self.first_connect_node = None
-            self.delete_button.configure(
-                text="Delete Mode: ON",
-                fg_color="#fecaca",
-                text_color="#7f1d1d",
-            )
-            self.connect_button.configure(
-                text="Connect Mode: OFF",
-                fg_color="#e5e7eb",
-                text_color="#111827",
-            )
-            self.status_label.configure(
-                text="Delete Mode: Click a node to delete it, or a line to remove connection."
-            )
-        else:
-            self.delete_button.configure(
-                text="Delete Mode: OFF",
-                fg_color="#fee2e2",
-                text_color="#991b1b",
-            )
-            self.status_label.configure(text="Ready")
-
-    # ---------------------------------------------------------------------
-    # Canvas Event Handlers
-    # ---------------------------------------------------------------------
-
-    def on_canvas_double_click(self, event):
-        # Try to avoid creating node on top of existing one
-        if self.get_node_at(event.x, event.y) is not None:
-            return
-
-        # Ask for text
-        dialog = ctk.CTkInputDialog(
-            text="Enter node text:", title="New Node"
-        )
-        text = dialog.get_input()
-        if text is None:
-            return
-        text = text.strip()
-        if not text:
-            return
-
-        self.create_node(event.x, event.y, text)
-
-    def on_canvas_mouse_down(self, event):
-        # For click, decide whether we are selecting a node or line
-        node_id = self.get_node_at(event.x, event.y)
-        conn_line_id = self.get_connection_at(event.x, event.y)
-
-        if self.delete_mode:
-            # Delete node or line
-            if node_id is not None:
-                self.delete_node(node_id)
-            elif conn_line_id is not None:
-                self.delete_connection_line(conn_line_id)
-            return
-
-        if self.connect_mode:
-            if node_id is not None:
-                self.handle_connect_click(node_id)
-            return
-
-        # Normal mode -> drag node if any
-        if node_id is not None:
-            self.dragging_node_id = node_id
-            node = self.nodes[node_id]
-            self.drag_start_offset = (event.x - node["x"], event.y - node["y"])
-        else:
-            self.dragging_node_id = None
-
-    def on_canvas_mouse_drag(self, event):
-        if self.dragging_node_id is None:
-            return
-        node = self.nodes[self.dragging_node_id]
-        new_x = event.x - self.drag_start_offset[0]
-        new_y = event.y - self.drag_start_offset[1]
-        dx = new_x - node["x"]
-        dy = new_y - node["y"]
-        self.move_node(self.dragging_node_id, dx, dy)
-
-    def on_canvas_mouse_up(self, event):
-        self.dragging_node_id = None
-
-    def handle_connect_click(self, node_id):
-        if self.first_connect_node is None:
-            self.first_connect_node = node_id
-            self.status_label.configure(
-                text="Connect Mode: Now click the second node to connect."
-            )
-            # Optional: highlight node
-            self.highlight_node(node_id, highlight=True)
-        else:
-            if node_id != self.first_connect_node:
-                self.create_connection(self.first_connect_node, node_id)
-            # remove highlight
-            self.highlight_node(self.first_connect_node, highlight=False)
-            self.first_connect_node = None
-            self.status_label.configure(
-                text="Connect Mode: Click first node, then second node."
-            )
-
-    def highlight_node(self, node_id, highlight=True):
-        node = self.nodes[node_id]
-        self.canvas.itemconfig(
-            node["rect_id"],
-            outline="#3b82f6" if highlight else "#d1d5db",
-            width=2 if highlight else 1,
-        )
-
-    # ---------------------------------------------------------------------
-    # Connections & Deletion
-    # ---------------------------------------------------------------------
-
-    def create_connection(self, from_id, to_id):
-        # Avoid duplicate connections
-        for c in self.connections:
-            if (c["from"] == from_id and c["to"] == to_id) or (
-                c["from"] == to_id and c["to"] == from_id
-            ):
-                return
-
-        n1 = self.nodes[from_id]
-        n2 = self.nodes[to_id]
-        line_id = self.canvas.create_line(
-            n1["x"],
-            n1["y"],
-            n2["x"],
-            n2["y"],
-            fill="#9ca3af",
-            width=2,
-        )
-        conn = {"from": from_id, "to": to_id, "line_id": line_id}
-        self.connections.append(conn)
-        self.line_to_connection[line_id] = conn
-
-    def delete_node(self, node_id):
-        node = self.nodes.pop(node_id, None)
-        if not node:
-            return
-
-        # delete canvas items
-        self.canvas.delete(node["rect_id"])
-        self.canvas.delete(node["text_id"])
-
-        self.item_to_node.pop(node["rect_id"], None)
-        self.item_to_node.pop(node["text_id"], None)
-
-        # delete any associated connections
-        for conn in self.connections[:]:
-            if conn["from"] == node_id or conn["to"] == node_id:
-                self.canvas.delete(conn["line_id"])
-                self.line_to_connection.pop(conn["line_id"], None)
-                self.connections.remove(conn)
-
-    def delete_connection_line(self, line_id):
-        conn = self.line_to_connection.pop(line_id, None)
-        if conn:
-            self.connections.remove(conn)
-            self.canvas.delete(line_id)
-
-    # ---------------------------------------------------------------------
-    # Save / Load / Clear
-    # ---------------------------------------------------------------------
-
-    def clear_canvas(self):
-        if not messagebox.askyesno(
-            "Clear Mind Map",
-            "This will remove all nodes and connections. Continue?",
-        ):
-            return
-        self.canvas.delete("all")
-        self.nodes.clear()
-        self.connections.clear()
-        self.item_to_node.clear()
-        self.line_to_connection.clear()
-        self.node_counter = 0
-        self.status_label.configure(text="Canvas cleared.")
-
-    def save_map_dialog(self):
-        path = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("Mind Map JSON", "*.json"), ("All Files", "*.*")],
-            title="Save Mind Map",
-        )
-        if not path:
-            return
-        self.save_map(path)
-
-    def load_map_dialog(self):
-        path = filedialog.askopenfilename(
-            defaultextension=".json",
-            filetypes=[("Mind Map JSON", "*.json"), ("All Files", "*.*")],
-            title="Load Mind Map",
-        )
-        if not path:
-            return
-        self.load_map(path)
-
-    def save_map(self, path):
-        data = {
-            "nodes": [
-                {
-                    "id": node_id,
-                    "x": n["x"],
-                    "y": n["y"],
-                    "text": n["text"],
-                }
-                for node_id, n in self.nodes.items()
-            ],
-            "connections": [
-                {"from": c["from"], "to": c["to"]} for c in self.connections
-            ],
-        }
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-            self.status_label.configure(text=f"Saved map to {path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save map:\n{e}")
-
-    def load_map(self, path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load map:\n{e}")
-            return
-
-        # clear existing
-        self.canvas.delete("all")
-        self.nodes.clear()
-        self.connections.clear()
-        self.item_to_node.clear()
-        self.line_to_connection.clear()
-
-        # recreate nodes
-        max_id = 0
-        for n in data.get("nodes", []):
-            nid = n["id"]
-            text = n.get("text", "")
-            x = n.get("x", WIDTH / 2)
-            y = n.get("y", HEIGHT / 2)
-            node_id = self.create_node(x, y, text)
-            # preserve original id mapping if we want
-            self.nodes[node_id]["id"] = nid
-            if nid > max_id:
-                max_id = nid
-
-        # fix node_counter to not clash
-        self.node_counter = max_id
-
-        # rebuild a mapping old_id -> new_id (in case order changed)
-        # here ids are kept in same order so we map by text+coords as fallback
-        # for simplicity: assume ids loaded sequentially (works if saved from this app)
-        id_map = {}
-        # match by text & nearest position
-        for saved in data.get("nodes", []):
-            sid = saved["id"]
-            sx, sy = saved["x"], saved["y"]
-            st = saved["text"]
-            best_id = None
-            best_dist = 1e9
-            for nid, nd in self.nodes.items():
-                if nd.get("_mapped"):
-                    continue
-                if nd["text"] == st:
-                    d = (nd["x"] - sx) ** 2 + (nd["y"] - sy) ** 2
-                    if d < best_dist:
-                        best_dist = d
-                        best_id = nid
-            if best_id is not None:
-                id_map[sid] = best_id
-                self.nodes[best_id]["_mapped"] = True
-
-        # cleanup helper field
-        for nd in self.nodes.values():
-            nd.pop("_mapped", None)
-
-        # recreate connections
-        for c in data.get("connections", []):
-            old_from = c["from"]
-            old_to = c["to"]
-            if old_from in id_map and old_to in id_map:
-                self.create_connection(id_map[old_from], id_map[old_to])
-
-        self.status_label.configure(text=f"Loaded map from {path}")
-
-
-if __name__ == "__main__":
-    app = MindCraftApp()
-    app.mainloop()
+import os
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox
+from tkinter import font as tkfont
+import customtkinter as ctk
+
+from mindcraft.graph import Graph, Node, edge_key, node_size
+from mindcraft import export, mapfile, merge, sync, textmetrics
+from mindcraft.history import Command, History
+from mindcraft.journal import Journal
+from mindcraft.layout import LAYOUTS, compute_layout
+from mindcraft.ops import apply_op, restore_op
+from mindcraft.perf import DragStats, Profiler, Timings
+from mindcraft.render import CanvasRenderer
+from mindcraft.spatial import point_in_polygon
+from mindcraft.tasks import BackgroundTask
+
+FRAME_MS = 16  # at most one drag redraw per display frame (~60 fps)
+SHIFT_MASK = 0x0001  # event.state bit set while Shift is held
+ZOOM_STEP = 1.15  # zoom factor per mouse-wheel notch
+LAYOUT_BATCH = 500  # nodes moved per frame while a layout is animated
+TASK_POLL_MS = 50  # how often background save/load progress is checked
+JOURNAL_FLUSH_MS = 1000  # how often recorded edits are written to the journal
+HISTORY_LIMIT = 32 << 20  # approximate bytes kept for undo/redo
+SEARCH_LIMIT = 50  # search results listed and highlighted
+HUD_REFRESH_MS = 250  # how often the performance HUD is redrawn
+HUD_FONT = ("Menlo", 10)
+ANALYTICS_REFRESH_MS = 500  # how often the analytics panel checks for edits
+ANALYTICS_ROWS = 3  # components and branches listed in the analytics panel
+
+# autosave location for a map that has not been saved yet
+UNTITLED_BASE = os.path.join(os.path.expanduser("~"), ".mindcraft", "untitled")
+
+MAP_FILETYPES = [
+    ("Mind Map JSON", "*.json"),
+    ("MindCraft Binary (compact)", "*.mcmap"),
+    ("All Files", "*.*"),
+]
+
+PROFILE_FILETYPES = [
+    ("cProfile Stats", "*.prof"),
+    ("Sampled Stacks (flame graph)", "*.txt"),
+]
+
+IMAGE_FILETYPES = [
+    ("SVG Image", "*.svg"),
+    ("PNG Image (no labels)", "*.png"),
+]
+
+
+def tk_text_metrics(root):
+    """TextMetrics measuring with Tk fonts, one Font object per font description."""
+    fonts = {}
+
+    def font_for(font):
+        tk_font = fonts.get(font)
+        if tk_font is None:
+            family, size = font
+            tk_font = fonts[font] = tkfont.Font(root=root, family=family, size=size)
+        return tk_font
+
+    return textmetrics.TextMetrics(
+        measure=lambda font, text: font_for(font).measure(text),
+        line_height=lambda font: font_for(font).metrics("linespace"),
+    )
+
+
+# ================== MindCraft – Minimal Mind Map Builder ================== #
+
+class MindCraftApp(ctk.CTk):
+
+    def __init__(self):
+        super().__init__()
+
+        # ----- Window Basic Setup -----
+        ctk.set_appearance_mode("light")
+        ctk.set_default_color_theme("blue")
+
+        self.title("MindCraft – Mind Map Builder")
+        self.geometry("1100x700")
+        self.minsize(900, 550)
+
+        # node sizes come from real text widths from here on
+        textmetrics.install(tk_text_metrics(self))
+
+        # ----- Data Structures -----
+        self.graph = Graph()  # nodes, connections and adjacency index
+        self.nodes = self.graph.nodes  # node_id -> dict
+        self.node_counter = 0
+
+        self.dragging_node_id = None
+        self.drag_start_offset = (0, 0)
+        self.drag_target = None  # latest pointer position not yet drawn
+        self.drag_flush_id = None
+        self.last_drag_flush = 0.0
+        self.drag_stats = DragStats()
+        self.timings = Timings()  # handler and save/load times, while the HUD is on
+        self.hud_item = None
+        self.hud_after_id = None
+        self.frame_after_id = None
+        self.last_frame = 0.0
+        self.profiler = None  # running profile, written out when its time is up
+        self.analytics_after_id = None
+        self.analytics_seen = None  # (graph, edit_count) the panel shows
+        self.analytics_actions = []  # per panel row: () -> (node ids, focus, text)
+        self.cycle_key = None  # connection of the cycle shown last
+        self.drag_serial = 0  # frames of one drag merge into one undo entry
+
+        self.selection = set()  # selected node ids
+        self.band_start = None  # rubber-band anchor (world coords)
+        self.band_end = None
+        self.band_item = None
+        self.lasso_points = None  # freehand lasso path (world coords)
+        self.lasso_item = None
+        self.group_drag = False  # dragging the whole selection
+        self.drag_origin = (0, 0)
+        self.group_applied = (0, 0)  # offset already drawn for the group
+        self.pan_last = None  # pointer position of the previous pan event
+
+        self.connect_mode = False
+        self.delete_mode = False
+        self.first_connect_node = None
+
+        self.task = None  # running background save/load
+        self.task_label = ""
+        self.task_done = None
+        self.task_discard = None
+
+        self.layout_moves = []  # (node_id, x, y) still to animate, last first
+        self.layout_undo = None
+
+        self.search_hits = []  # node ids listed for the search box, best first
+        self.seen_visibility = 0  # graph.visibility_changes already drawn
+
+        # every edit is appended to the journal of the current map
+        self.journal = Journal(UNTITLED_BASE)
+        self.edit_count = 0
+        self.history = History(HISTORY_LIMIT)
+        self.sync = None  # SyncClient while this window is in a live session
+
+        # ----- UI Layout -----
+        self._build_ui()
+
+        # Canvas items exist only for what is on screen
+        self.renderer = CanvasRenderer(self.canvas, self.graph)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(JOURNAL_FLUSH_MS, self.flush_journal)
+        self.after_idle(self.offer_recovery)
+
+    # ---------------------------------------------------------------------
+    # UI
+    # ---------------------------------------------------------------------
+
+    def _build_ui(self):
+        # Top bar
+        top_bar = ctk.CTkFrame(self, height=50, corner_radius=0)
+        top_bar.pack(side="top", fill="x")
+
+        title_label = ctk.CTkLabel(
+            top_bar,
+            text="MindCraft",
+            font=ctk.CTkFont("SF Pro Display", 20, weight="bold"),
+        )
+        title_label.pack(side="left", padx=16, pady=10)
+
+        subtitle_label = ctk.CTkLabel(
+            top_bar,
+            text="Minimal Mind Map Builder",
+            font=ctk.CTkFont(size=13),
+            text_color="#6b7280",
+        )
+        subtitle_label.pack(side="left", pady=10)
+
+        # Main frame
+        main_frame = ctk.CTkFrame(self, corner_radius=0)
+        main_frame.pack(side="top", fill="both", expand=True)
+
+        # Left toolbar
+        left_frame = ctk.CTkFrame(main_frame, width=220, corner_radius=0)
+        left_frame.pack(side="left", fill="y")
+        left_frame.pack_propagate(False)
+
+        # Right canvas container
+        canvas_frame = ctk.CTkFrame(main_frame, corner_radius=10)
+        canvas_frame.pack(side="right", fill="both", expand=True, padx=8, pady=8)
+
+        # ------------- Left Panel Contents -------------
+
+        ctk.CTkLabel(
+            left_frame,
+            text="Tools",
+            font=ctk.CTkFont(size=16, weight="bold"),
+        ).pack(anchor="w", padx=15, pady=(15, 5))
+
+        ctk.CTkLabel(
+            left_frame,
+            text="Double-click on the canvas to create a node.\nDrag to move. Connect or delete using modes.",
+            font=ctk.CTkFont(size=11),
+            text_color="#6b7280",
+            justify="left",
+            wraplength=190,
+        ).pack(anchor="w", padx=15, pady=(0, 15))
+
+        # Connect mode toggle
+        self.connect_button = ctk.CTkButton(
+            left_frame,
+            text="Connect Mode: OFF",
+            command=self.toggle_connect_mode,
+            fg_color="#e5e7eb",
+            text_color="#111827",
+            hover_color="#d1d5db",
+        )
+        self.connect_button.pack(fill="x", padx=15, pady=4)
+
+        # Delete mode toggle
+        self.delete_button = ctk.CTkButton(
+            left_frame,
+            text="Delete Mode: OFF",
+            command=self.toggle_delete_mode,
+            fg_color="#fee2e2",
+            text_color="#991b1b",
+            hover_color="#fecaca",
+        )
+        self.delete_button.pack(fill="x", padx=15, pady=4)
+
+        # Collapse / expand the selected nodes
+        ctk.CTkButton(
+            left_frame,
+            text="⊟ Collapse / Expand",
+            command=self.toggle_collapse_selection,
+            fg_color="#e5e7eb",
+            text_color="#111827",
+            hover_color="#d1d5db",
+        ).pack(fill="x", padx=15, pady=4)
+
+        # Undo / redo
+        history_row = ctk.CTkFrame(left_frame, fg_color="transparent")
+        history_row.pack(fill="x", padx=15, pady=4)
+        ctk.CTkButton(
+            history_row,
+            text="↶ Undo",
+            width=90,
+            command=self.undo,
+            fg_color="#e5e7eb",
+            text_color="#111827",
+            hover_color="#d1d5db",
+        ).pack(side="left", expand=True, fill="x", padx=(0, 2))
+        ctk.CTkButton(
+            history_row,
+            text="↷ Redo",
+            width=90,
+            command=self.redo,
+            fg_color="#e5e7eb",
+            text_color="#111827",
+            hover_color="#d1d5db",
+        ).pack(side="left", expand=True, fill="x", padx=(2, 0))
+
+        # Auto layout
+        self.layout_choice = ctk.StringVar(value=LAYOUTS[0].capitalize())
+        layout_row = ctk.CTkFrame(left_frame, fg_color="transparent")
+        layout_row.pack(fill="x", padx=15, pady=4)
+        ctk.CTkOptionMenu(
+            layout_row,
+            values=[name.capitalize() for name in LAYOUTS],
+            variable=self.layout_choice,
+            width=80,
+        ).pack(side="left", padx=(0, 2))
+        ctk.CTkButton(
+            layout_row,
+            text="✨ Auto Layout",
+            width=100,
+            command=self.auto_layout,
+        ).pack(side="left", expand=True, fill="x", padx=(2, 0))
+
+        # Search
+        self.search_entry = ctk.CTkEntry(
+            left_frame,
+            placeholder_text="🔍 Search nodes",
+        )
+        self.search_entry.pack(fill="x", padx=15, pady=(12, 4))
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", lambda event: self.jump_to_search_result(0))
+        self.search_entry.bind("<Escape>", lambda event: self.clear_search())
+
+        # Shown only while the search has results
+        self.search_results = tk.Listbox(
+            left_frame,
+            height=6,
+            activestyle="none",
+            borderwidth=0,
+            highlightthickness=0,
+            font=("SF Pro Text", 11),
+            bg="#f9fafb",
+            fg="#111827",
+            selectbackground="#3b82f6",
+            exportselection=False,
+        )
+        self.search_results.bind(
+            "<<ListboxSelect>>", lambda event: self.on_search_result_select()
+        )
+
+        # Separator
+        ctk.CTkLabel(
+            left_frame,
+            text="",
+            height=2,
+            fg_color="#e5e7eb",
+        ).pack(fill="x", padx=15, pady=(12, 8))
+
+        # Save/Load buttons
+        ctk.CTkLabel(
+            left_frame,
+            text="Mind Map",
+            font=ctk.CTkFont(size=14, weight="bold"),
+        ).pack(anchor="w", padx=15)
+
+        save_btn = ctk.CTkButton(
+            left_frame,
+            text="💾 Save Map",
+            command=self.save_map_dialog,
+        )
+        save_btn.pack(fill="x", padx=15, pady=(6, 4))
+
+        load_btn = ctk.CTkButton(
+            left_frame,
+            text="📂 Load Map",
+            command=self.load_map_dialog,
+        )
+        load_btn.pack(fill="x", padx=15, pady=4)
+
+        ctk.CTkButton(
+            left_frame,
+            text="📥 Import/Merge",
+            command=self.import_maps_dialog,
+        ).pack(fill="x", padx=15, pady=4)
+
+        self.session_button = ctk.CTkButton(
+            left_frame,
+            text="🤝 Join Session…",
+            command=self.toggle_session,
+        )
+        self.session_button.pack(fill="x", padx=15, pady=4)
+
+        ctk.CTkButton(
+            left_frame,
+            text="🖼 Export Image",
+            command=self.export_image_dialog,
+        ).pack(fill="x", padx=15, pady=4)
+
+        clear_btn = ctk.CTkButton(
+            left_frame,
+            text="🧹 Clear Canvas",
+            fg_color="#f97316",
+            hover_color="#ea580c",
+            command=self.clear_canvas,
+        )
+        clear_btn.pack(fill="x", padx=15, pady=(12, 4))
+
+        # Diagnostics
+        self.hud_switch = ctk.CTkSwitch(
+            left_frame,
+            text="Performance HUD",
+            command=self.toggle_hud,
+        )
+        self.hud_switch.pack(anchor="w", padx=15, pady=(12, 4))
+
+        self.analytics_switch = ctk.CTkSwitch(
+            left_frame,
+            text="Analytics",
+            command=self.toggle_analytics,
+        )
+        self.analytics_switch.pack(anchor="w", padx=15, pady=4)
+
+        # Shown only while the analytics switch is on
+        self.analytics_label = ctk.CTkLabel(
+            left_frame,
+            text="",
+            justify="left",
+            anchor="w",
+            font=ctk.CTkFont(size=11),
+        )
+        self.analytics_list = tk.Listbox(
+            left_frame,
+            height=9,
+            activestyle="none",
+            borderwidth=0,
+            highlightthickness=0,
+            font=("SF Pro Text", 11),
+            bg="#f9fafb",
+            fg="#111827",
+            selectbackground="#3b82f6",
+            exportselection=False,
+        )
+        self.analytics_list.bind(
+            "<<ListboxSelect>>", lambda event: self.on_analytics_select()
+        )
+
+        ctk.CTkButton(
+            left_frame,
+            text="⏱ Profile…",
+            fg_color="#e5e7eb",
+            text_color="#111827",
+            hover_color="#d1d5db",
+            command=self.profile_dialog,
+        ).pack(fill="x", padx=15, pady=4)
+
+        # Status
+        self.status_label = ctk.CTkLabel(
+            left_frame,
+            text="Ready",
+            font=ctk.CTkFont(size=11),
+            text_color="#6b7280",
+            wraplength=190,
+            justify="left",
+        )
+        self.status_label.pack(anchor="w", padx=15, pady=(18, 4))
+
+        # Shown only while a save or load runs in the background
+        self.cancel_button = ctk.CTkButton(
+            left_frame,
+            text="Cancel",
+            command=self.cancel_task,
+            height=24,
+            fg_color="#e5e7eb",
+            text_color="#111827",
+            hover_color="#d1d5db",
+        )
+
+        ctk.CTkLabel(
+            left_frame,
+            text="Shortcuts:\n• Double-click: New node\n• Drag: Move node\n• Drag empty space: Select\n• Shift-click / Shift-drag: Add to selection\n• Right-click: Collapse / expand node\n• Middle-drag: Pan\n• Mouse wheel: Zoom\n• Ctrl+Z / Ctrl+Y: Undo / Redo\n• Enter in search: Jump to best match\n• F3: Performance HUD\n• Toggle modes on left",
+            font=ctk.CTkFont(size=10),
+            text_color="#9ca3af",
+            justify="left",
+            wraplength=190,
+        ).pack(anchor="w", padx=15, pady=(4, 16))
+
+        # ------------- Canvas -------------
+
+        # Canvas with white background for Apple-style flat look
+        self.canvas = tk.Canvas(
+            canvas_frame,
+            bg="#f9fafb",
+            highlightthickness=0,
+        )
+        self.canvas.pack(fill="both", expand=True, padx=8, pady=8)
+
+        # Canvas bindings
+        # the handlers worth watching are timed while the HUD is on
+        timed = self.timings.wrap
+        self.canvas.bind(
+            "<Double-Button-1>", timed("double_click", self.on_canvas_double_click)
+        )
+        self.canvas.bind("<Button-1>", timed("mouse_down", self.on_canvas_mouse_down))
+        self.canvas.bind("<B1-Motion>", timed("drag", self.on_canvas_mouse_drag))
+        self.canvas.bind("<ButtonRelease-1>", self.on_canvas_mouse_up)
+        self.canvas.bind("<Button-2>", self.on_canvas_pan_start)
+        self.canvas.bind("<Button-3>", self.on_canvas_right_click)
+        self.canvas.bind("<B2-Motion>", self.on_canvas_pan)
+        self.canvas.bind("<MouseWheel>", self.on_canvas_wheel)
+        self.canvas.bind("<Button-4>", self.on_canvas_wheel)  # X11 wheel up
+        self.canvas.bind("<Button-5>", self.on_canvas_wheel)  # X11 wheel down
+        self.canvas.bind("<Configure>", lambda event: self.renderer.request_sync())
+
+        self.bind("<Control-z>", lambda event: self.undo())
+        self.bind("<Control-y>", lambda event: self.redo())
+        self.bind("<Control-Z>", lambda event: self.redo())  # Ctrl+Shift+Z
+        self.bind("<F3>", lambda event: self.hud_switch.toggle())
+
+    # ---------------------------------------------------------------------
+    # Node Helpers
+    # ---------------------------------------------------------------------
+
+    def create_node(self, x, y, text):
+        """Create a flat, minimal node at position."""
+        if self.sync is not None:
+            # from this window's block, so other windows never reuse it
+            node_id = self.sync.new_id(self.nodes)
+        else:
+            self.node_counter += 1
+            node_id = self.node_counter
+
+        # measured label width, wrapped if it is long
+        width, height = node_size(text)
+
+        node = self.graph.add_node(Node(node_id, x, y, width, height, text))
+        self.renderer.add_node(node_id)
+        op = {"op": "create", "id": node_id, "x": x, "y": y, "text": text}
+        self.record_op(op)
+        self.history.record(Command("create node", [op], [{"op": "delete", "id": node_id}]))
+        self.update_search()
+
+        return node_id
+
+    def get_node_at(self, x, y):
+        """Return node_id at given canvas coords, or None."""
+        # Answered by the model's spatial index, so culled nodes count too
+        return self.graph.node_at(x, y)
+
+    def get_connection_at(self, x, y):
+        """Return the edge key of the connection at given point, or None."""
+        # four pixels on screen, whatever the zoom
+        return self.renderer.router.edge_at(x, y, tolerance=4 / self.renderer.scale)
+
+    def move_node(self, node_id, dx, dy):
+        self.graph.move_node(node_id, dx, dy)
+        self.renderer.move_node(node_id)
+        node = self.nodes[node_id]
+        self.record_op({"op": "move", "id": node_id, "x": node.x, "y": node.y})
+
+    # ---------------------------------------------------------------------
+    # Modes
+    # ---------------------------------------------------------------------
+
+    def toggle_connect_mode(self):
+        self.connect_mode = not self.connect_mode
+        if self.connect_mode:
+            self.delete_mode = False
+            self.first_connect_node = None
+            self.set_selection(set())
+            self.connect_button.configure(
+                text="Connect Mode: ON",
+                fg_color="#dbeafe",
+                text_color="#1d4ed8",
+            )
+            self.delete_button.configure(
+                text="Delete Mode: OFF",
+                fg_color="#fee2e2",
+                text_color="#991b1b",
+            )
+            self.status_label.configure(
+                text="Connect Mode: Click first node, then second node to create a connection."
+            )
+        else:
+            self.first_connect_node = None
+            self.connect_button.configure(
+                text="Connect Mode: OFF",
+                fg_color="#e5e7eb",
+                text_color="#111827",
+            )
+            self.status_label.configure(text="Ready")
+
+    def toggle_delete_mode(self):
+        self.delete_mode = not self.delete_mode
+        if self.delete_mode:
+            self.connect_mode = False
+            self.first_connect_node = None
+            self.set_selection(set())
+            self.delete_button.configure(
+                text="Delete Mode: ON",
+                fg_color="#fecaca",
+                text_color="#7f1d1d",
+            )
+            self.connect_button.configure(
+                text="Connect Mode: OFF",
+                fg_color="#e5e7eb",
+                text_color="#111827",
+            )
+            self.status_label.configure(
+                text="Delete Mode: Click a node to delete it, or a line to remove connection."
+            )
+        else:
+            self.delete_button.configure(
+                text="Delete Mode: OFF",
+                fg_color="#fee2e2",
+                text_color="#991b1b",
+            )
+            self.status_label.configure(text="Ready")
+
+    # ---------------------------------------------------------------------
+    # Canvas Event Handlers
+    # ---------------------------------------------------------------------
+
+    def canvas_point(self, event):
+        """Convert event (window) coordinates to world coordinates."""
+        return self.renderer.camera.to_world(event.x, event.y)
+
+    def on_canvas_double_click(self, event):
+        x, y = self.canvas_point(event)
+        # Try to avoid creating node on top of existing one
+        if self.get_node_at(x, y) is not None:
+            return
+
+        # Ask for text
+        dialog = ctk.CTkInputDialog(
+            text="Enter node text:", title="New Node"
+        )
+        text = dialog.get_input()
+        if text is None:
+            return
+        text = text.strip()
+        if not text:
+            return
+
+        self.create_node(x, y, text)
+
+    def on_canvas_mouse_down(self, event):
+        # For click, decide whether we are selecting a node or line
+        x, y = self.canvas_point(event)
+        node_id = self.get_node_at(x, y)
+        conn_key = self.get_connection_at(x, y)
+
+        if self.delete_mode:
+            # Delete node or line
+            if node_id is not None:
+                self.delete_node(node_id)
+            elif conn_key is not None:
+                self.delete_connection_line(conn_key)
+            return
+
+        if self.connect_mode:
+            if node_id is not None:
+                self.handle_connect_click(node_id)
+            return
+
+        # Normal mode -> drag node (or the selection), else start a
+        # rubber band; Shift toggles a node or draws a lasso instead
+        shift = event.state & SHIFT_MASK
+        self.dragging_node_id = None
+        if node_id is None:
+            if shift:
+                self.lasso_points = [(x, y)]
+            else:
+                self.band_start = (x, y)
+            return
+        if shift:
+            self.set_selection(self.selection ^ {node_id})
+            return
+
+        self.drag_stats.reset()
+        self.drag_serial += 1
+        self.dragging_node_id = node_id
+        if node_id in self.selection and len(self.selection) > 1:
+            self.group_drag = True
+            self.drag_origin = (x, y)
+            self.group_applied = (0, 0)
+            self.renderer.begin_group_move()
+        else:
+            if node_id not in self.selection:
+                self.set_selection(set())
+            node = self.nodes[node_id]
+            self.drag_start_offset = (x - node.x, y - node.y)
+
+    def on_canvas_mouse_drag(self, event):
+        if self.band_start is not None:
+            self.update_rubber_band(*self.canvas_point(event))
+            return
+        if self.lasso_points is not None:
+            self.update_lasso(*self.canvas_point(event))
+            return
+        if self.dragging_node_id is None:
+            return
+        # Only remember where the pointer is; the redraw happens at most
+        # once per frame in flush_drag, however fast the mouse reports.
+        self.drag_target = self.canvas_point(event)
+        self.drag_stats.event()
+        if self.drag_flush_id is None:
+            wait_ms = FRAME_MS - (time.perf_counter() - self.last_drag_flush) * 1000
+            if wait_ms > 0:
+                self.drag_flush_id = self.after(int(wait_ms) + 1, self.flush_drag)
+            else:
+                self.drag_flush_id = self.after_idle(self.flush_drag)
+
+    def flush_drag(self):
+        """Apply the accumulated drag motion in one batched redraw."""
+        self.drag_flush_id = None
+        if self.drag_target is None or self.dragging_node_id is None:
+            return
+        x, y = self.drag_target
+        self.drag_target = None
+        if self.group_drag:
+            # one canvas.move on the "selected" tag; the model catches up
+            # when the drag ends
+            total_x = x - self.drag_origin[0]
+            total_y = y - self.drag_origin[1]
+            self.renderer.group_move(
+                total_x - self.group_applied[0], total_y - self.group_applied[1]
+            )
+            self.group_applied = (total_x, total_y)
+            if self.sync is not None:
+                # the other windows see the group move every frame too
+                nodes = self.nodes
+                self.sync.send({"op": "move_many", "moves": [
+                    [node_id, nodes[node_id].x + total_x, nodes[node_id].y + total_y]
+                    for node_id in self.selection
+                ]})
+        else:
+            node_id = self.dragging_node_id
+            node = self.nodes.get(node_id)
+            if node is None:
+                # deleted from another window of the session
+                self.dragging_node_id = None
+                return
+            old_x, old_y = node.x, node.y
+            new_x = x - self.drag_start_offset[0]
+            new_y = y - self.drag_start_offset[1]
+            self.move_node(node_id, new_x - old_x, new_y - old_y)
+            self.history.record(Command(
+                "move node",
+                [{"op": "move", "id": node_id, "x": node.x, "y": node.y}],
+                [{"op": "move", "id": node_id, "x": old_x, "y": old_y}],
+                merge_key=("drag", self.drag_serial),
+            ))
+        self.last_drag_flush = time.perf_counter()
+        self.drag_stats.flush()
+
+    def on_canvas_mouse_up(self, event):
+        if self.drag_flush_id is not None:
+            self.after_cancel(self.drag_flush_id)
+            self.drag_flush_id = None
+        if self.dragging_node_id is not None:
+            # draw the final position right away
+            self.flush_drag()
+            if self.group_drag:
+                self.finish_group_drag()
+            if self.drag_stats.flushes:
+                self.status_label.configure(text=self.drag_stats.summary())
+        self.dragging_node_id = None
+        if self.band_start is not None:
+            self.finish_rubber_band()
+        if self.lasso_points is not None:
+            self.finish_lasso()
+
+    def on_canvas_pan_start(self, event):
+        self.pan_last = (event.x, event.y)
+
+    def on_canvas_pan(self, event):
+        if self.pan_last is None:
+            return
+        last_x, last_y = self.pan_last
+        self.pan_last = (event.x, event.y)
+        self.renderer.pan(event.x - last_x, event.y - last_y)
+
+    def on_canvas_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            factor = ZOOM_STEP
+        elif event.num == 5 or event.delta < 0:
+            factor = 1 / ZOOM_STEP
+        else:
+            return
+        self.renderer.zoom(event.x, event.y, factor)
+        self.status_label.configure(text=f"Zoom {self.renderer.scale:.0%}")
+
+    def handle_connect_click(self, node_id):
+        if self.first_connect_node is None:
+            self.first_connect_node = node_id
+            self.status_label.configure(
+                text="Connect Mode: Now click the second node to connect."
+            )
+            # Optional: highlight node
+            self.highlight_node(node_id, highlight=True)
+        else:
+            if node_id != self.first_connect_node:
+                self.create_connection(self.first_connect_node, node_id)
+            # remove highlight
+            self.highlight_node(self.first_connect_node, highlight=False)
+            self.first_connect_node = None
+            self.status_label.configure(
+                text="Connect Mode: Click first node, then second node."
+            )
+
+    def highlight_node(self, node_id, highlight=True):
+        self.renderer.set_highlight(node_id, highlight)
+
+    # ---------------------------------------------------------------------
+    # Selection
+    # ---------------------------------------------------------------------
+
+    def set_selection(self, node_ids):
+        search_hits = set(self.search_hits)
+        for node_id in self.selection - node_ids:
+            if node_id not in search_hits:
+                self.highlight_node(node_id, highlight=False)
+            self.renderer.set_selected(node_id, False)
+        for node_id in node_ids - self.selection:
+            self.highlight_node(node_id, highlight=True)
+            self.renderer.set_selected(node_id, True)
+        self.selection = node_ids
+        if node_ids:
+            self.status_label.configure(text=f"{len(node_ids)} node(s) selected.")
+
+    def update_rubber_band(self, x, y):
+        self.band_end = (x, y)
+        camera = self.renderer.camera
+        coords = (*camera.to_screen(*self.band_start), *camera.to_screen(x, y))
+        if self.band_item is None:
+            self.band_item = self.canvas.create_rectangle(
+                *coords, outline="#3b82f6", dash=(4, 2), width=1
+            )
+        else:
+            self.canvas.coords(self.band_item, *coords)
+
+    def finish_rubber_band(self):
+        """Select the nodes inside the rubber band (a plain click clears)."""
+        selected = set()
+        if self.band_item is not None:
+            self.canvas.delete(self.band_item)
+            (x1, y1), (x2, y2) = self.band_start, self.band_end
+            selected = self.graph.nodes_in_rect(
+                min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+            )
+        self.band_start = None
+        self.band_end = None
+        self.band_item = None
+        self.set_selection(selected)
+
+    def update_lasso(self, x, y):
+        self.lasso_points.append((x, y))
+        to_screen = self.renderer.camera.to_screen
+        flat = [v for point in self.lasso_points for v in to_screen(*point)]
+        if self.lasso_item is None:
+            self.lasso_item = self.canvas.create_line(
+                *flat, *flat, fill="#3b82f6", dash=(4, 2), width=1
+            )
+        else:
+            self.canvas.coords(self.lasso_item, *flat)
+
+    def finish_lasso(self):
+        """Add the nodes whose centres lie inside the lasso to the selection."""
+        points = self.lasso_points
+        self.lasso_points = None
+        if self.lasso_item is not None:
+            self.canvas.delete(self.lasso_item)
+            self.lasso_item = None
+        if len(points) < 3:
+            return
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        found = {
+            node_id
+            for node_id in self.graph.nodes_in_rect(min(xs), min(ys), max(xs), max(ys))
+            if point_in_polygon(self.nodes[node_id].x, self.nodes[node_id].y, points)
+        }
+        self.set_selection(self.selection | found)
+
+    def finish_group_drag(self):
+        """Commit a group drag to the model in one batch."""
+        dx, dy = self.renderer.end_group_move()
+        self.group_drag = False
+        if dx or dy:
+            self.graph.move_nodes(self.selection, dx, dy)
+            self.renderer.nodes_moved(self.selection)
+            moves = [
+                [node_id, self.nodes[node_id].x, self.nodes[node_id].y]
+                for node_id in self.selection
+            ]
+            op = {"op": "move_many", "moves": moves}
+            self.record_op(op)
+            self.history.record(Command(
+                "move nodes",
+                [op],
+                [{"op": "move_many", "moves": [[i, x - dx, y - dy] for i, x, y in moves]}],
+            ))
+        self.renderer.sync()
+
+    # ---------------------------------------------------------------------
+    # Connections & Deletion
+    # ---------------------------------------------------------------------
+
+    def create_connection(self, from_id, to_id):
+        # Avoid duplicate connections (either direction)
+        conn = self.graph.add_edge(from_id, to_id)
+        if conn is None:
+            return
+        self.renderer.add_edge(edge_key(from_id, to_id))
+        op = {"op": "connect", "from": from_id, "to": to_id}
+        self.record_op(op)
+        self.history.record(Command(
+            "connect", [op], [{"op": "disconnect", "from": from_id, "to": to_id}]
+        ))
+        self.sync_visibility()
+
+    def delete_node(self, node_id):
+        node, removed = self.graph.remove_node(node_id)
+        if not node:
+            return
+        self.selection.discard(node_id)
+
+        # release its canvas items and those of its connections
+        self.renderer.remove_node(
+            node_id, [edge_key(c.from_id, c.to_id) for c in removed]
+        )
+        op = {"op": "delete", "id": node_id}
+        self.record_op(op)
+        # undo recreates the node, then its connections in their directions
+        undo = [{
+            "op": "create",
+            "id": node_id,
+            "x": node.x,
+            "y": node.y,
+            "text": node.text,
+        }]
+        undo.extend(
+            {"op": "connect", "from": c.from_id, "to": c.to_id} for c in removed
+        )
+        self.history.record(Command("delete node", [op], undo))
+        self.sync_visibility()
+        self.update_search()
+
+    def delete_connection_line(self, key):
+        """Delete the connection identified by its edge key."""
+        conn = self.graph.remove_edge(*key)
+        if conn is None:
+            return
+        self.renderer.remove_edge(key)
+        op = {"op": "disconnect", "from": key[0], "to": key[1]}
+        self.record_op(op)
+        self.history.record(Command(
+            "delete connection",
+            [op],
+            [{"op": "connect", "from": conn.from_id, "to": conn.to_id}],
+        ))
+        self.sync_visibility()
+
+    # ---------------------------------------------------------------------
+    # Save / Load / Clear
+    # ---------------------------------------------------------------------
+
+    def clear_canvas(self):
+        if not messagebox.askyesno(
+            "Clear Mind Map",
+            "This will remove all nodes and connections. Continue?",
+        ):
+            return
+        # the old graph is kept as it is for undo instead of being copied
+        old_graph = self.graph
+        self.swap_graph(Graph())
+        self.node_counter = 0
+        op = {"op": "clear"}
+        self.record_op(op)
+        self.history.record(Command("clear", [op], [{"op": "restore", "graph": old_graph}]))
+        self.status_label.configure(text="Canvas cleared.")
+
+    def save_map_dialog(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=MAP_FILETYPES,
+            title="Save Mind Map",
+        )
+        if not path:
+            return
+        self.save_map(path)
+
+    def load_map_dialog(self):
+        path = filedialog.askopenfilename(
+            defaultextension=".json",
+            filetypes=MAP_FILETYPES,
+            title="Load Mind Map",
+        )
+        if not path:
+            return
+        self.load_map(path)
+
+    def import_maps_dialog(self):
+        paths = filedialog.askopenfilenames(
+            filetypes=MAP_FILETYPES,
+            title="Import Mind Maps",
+        )
+        if not paths:
+            return
+        self.import_maps(list(paths))
+
+    def export_image_dialog(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".svg",
+            filetypes=IMAGE_FILETYPES,
+            title="Export Image",
+        )
+        if not path:
+            return
+        if os.path.splitext(path)[1].lower() == ".png":
+            fn = export.save_png
+        else:
+            fn = export.save_svg
+
+        def on_done(result):
+            self.status_label.configure(text=f"Exported image to {path}")
+
+        # drawn from a snapshot of the model, so it does not matter what is on screen
+        self.start_task("export", on_done, fn, self.graph.snapshot(), path)
+
+    def save_map(self, path):
+        # Serialize a snapshot on a worker thread; edits made meanwhile
+        # cannot resize the dicts it is reading.
+        edits_at_start = self.edit_count
+
+        def on_done(result):
+            self.switch_journal(Journal(path))
+            if self.edit_count != edits_at_start:
+                # edits made during the save are not in the file yet
+                self.journal.compact(self.graph.snapshot())
+            self.status_label.configure(text=f"Saved map to {path}")
+
+        self.start_task("save", on_done, mapfile.save_map, self.graph.snapshot(), path)
+
+    def load_map(self, path):
+        journal = Journal(path)
+        if journal.has_recovery() and messagebox.askyesno(
+            "Recover Mind Map",
+            "This map has unsaved changes from an earlier session. Recover them?",
+        ):
+            self.recover_map(journal)
+            return
+
+        # Nodes without saved coordinates go to the middle of the view
+        default_pos = self.renderer.camera.to_world(
+            self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2
+        )
+
+        def on_done(graph):
+            journal.discard()
+            self.switch_journal(journal)
+            self.install_graph(graph, path)
+
+        self.start_task("load", on_done, mapfile.load_map, path, default_pos)
+
+    def import_maps(self, paths):
+        """Merge the maps at `paths` into the current one, as one undo step."""
+        edits_at_start = self.edit_count
+        old_graph = self.graph
+
+        def on_done(merged):
+            if self.edit_count != edits_at_start or self.graph is not old_graph:
+                self.status_label.configure(
+                    text="Import cancelled: the map was edited meanwhile."
+                )
+                return
+            self.apply_ops([{"op": "restore", "graph": merged}])
+            self.history.record(
+                Command(
+                    "import maps",
+                    [{"op": "restore", "graph": merged}],
+                    [{"op": "restore", "graph": old_graph}],
+                )
+            )
+            self.status_label.configure(
+                text=f"Merged {len(paths)} map(s): {len(merged.nodes)} nodes, "
+                f"{len(merged.edges)} connections"
+            )
+
+        # files are parsed in worker processes and merged into a snapshot
+        # of this map, which keeps its place, ids and collapsed nodes
+        self.start_task(
+            "import",
+            on_done,
+            merge.import_maps,
+            paths,
+            self.graph.snapshot(),
+            set(self.graph.tree.collapsed),
+        )
+
+    def install_graph(self, graph, path):
+        """Replace the current map with one loaded from `path`."""
+        self.swap_graph(graph)
+        self.history.clear()
+
+        # saved ids are kept, so new nodes continue after the largest one
+        self.node_counter = graph.max_node_id()
+        if self.sync is not None:
+            # the loaded map replaces the session's for every window
+            self.sync.send(restore_op(graph))
+
+        self.status_label.configure(text=f"Loaded map from {path}")
+
+    def swap_graph(self, graph):
+        """Show `graph` in place of the current one."""
+        self.canvas.delete("all")
+        tracking = self.graph.analytics is not None
+        # a map kept for undo need not be tracked; it is rebuilt if it returns
+        self.graph.analytics = None
+        self.graph = graph
+        if tracking:
+            graph.track_analytics()
+        self.nodes = graph.nodes
+        self.selection.clear()
+        self.first_connect_node = None
+        self.layout_moves = []
+        self.layout_undo = None
+
+        # canvas items are created for the visible part only
+        self.renderer.reset(graph)
+        self.seen_visibility = graph.visibility_changes
+        self.search_hits = []
+        self.update_search()
+
+    # ---------------------------------------------------------------------
+    # Undo / Redo
+    # ---------------------------------------------------------------------
+
+    def undo(self):
+        if self.dragging_node_id is not None or self.task is not None or self.layout_moves:
+            return
+        command = self.history.undo()
+        if command is None:
+            self.status_label.configure(text="Nothing to undo.")
+            return
+        self.apply_ops(command.undo)
+        self.status_label.configure(text=f"Undid {command.label}.")
+
+    def redo(self):
+        if self.dragging_node_id is not None or self.task is not None or self.layout_moves:
+            return
+        command = self.history.redo()
+        if command is None:
+            self.status_label.configure(text="Nothing to redo.")
+            return
+        self.apply_ops(command.do)
+        self.status_label.configure(text=f"Redid {command.label}.")
+
+    def apply_ops(self, ops):
+        """Apply operation records to the model, the canvas and the journal."""
+        self.set_selection(set())
+        for op in ops:
+            record = self._apply_op(op)
+            if record is not None:
+                self.record_op(record)
+        self.sync_visibility()
+        self.update_search()
+
+    def apply_remote_ops(self, ops):
+        """Apply edits from other windows of the session.
+
+        They are journaled like local edits, but not sent back and not
+        added to the undo history.
+        """
+        for op in ops:
+            record = self._apply_op(op)
+            if record is not None:
+                self.record_op(record, send=False)
+        self.sync_visibility()
+        if any(op["op"] not in ("move", "move_many") for op in ops):
+            self.update_search()
+
+    def _apply_op(self, op):
+        """Apply one record to the model and the canvas.
+
+        Returns the record as the journal should store it, or None if it
+        changed nothing.
+        """
+        kind = op["op"]
+        if kind == "clear":
+            self.swap_graph(Graph())
+            return op
+        if kind == "restore":
+            graph = op.get("graph")
+            if graph is None:
+                # a record from the session rather than the undo history
+                graph = Graph()
+                apply_op(graph, op)
+            else:
+                op = restore_op(graph)
+            self.swap_graph(graph)
+            self.node_counter = max(self.node_counter, graph.max_node_id())
+            return op
+
+        graph = self.graph
+        if kind == "delete":
+            if op["id"] not in self.nodes:
+                return None
+            keys = list(graph.incident[op["id"]])
+        elif kind in ("connect", "disconnect"):
+            had_edge = graph.has_edge(op["from"], op["to"])
+        elif kind == "create":
+            existed = op["id"] in self.nodes
+        apply_op(graph, op)
+
+        if kind == "create":
+            if existed:
+                self.renderer.move_node(op["id"])
+            else:
+                self.renderer.add_node(op["id"])
+            self.node_counter = max(self.node_counter, op["id"])
+        elif kind == "move":
+            if op["id"] in self.nodes:
+                self.renderer.move_node(op["id"])
+        elif kind == "move_many":
+            for node_id, _, _ in op["moves"]:
+                if node_id in self.nodes:
+                    self.renderer.move_node(node_id)
+        elif kind == "connect" and not had_edge and graph.has_edge(op["from"], op["to"]):
+            self.renderer.add_edge(edge_key(op["from"], op["to"]))
+        elif kind == "disconnect" and had_edge:
+            self.renderer.remove_edge(edge_key(op["from"], op["to"]))
+        elif kind == "delete":
+            self.renderer.remove_node(op["id"], keys)
+            self.selection.discard(op["id"])
+            if self.first_connect_node == op["id"]:
+                self.first_connect_node = None
+        return op
+
+    # ---------------------------------------------------------------------
+    # Collapse / Expand
+    # ---------------------------------------------------------------------
+
+    def on_canvas_right_click(self, event):
+        node_id = self.get_node_at(*self.canvas_point(event))
+        if node_id is not None:
+            self.toggle_collapse(node_id)
+
+    def toggle_collapse_selection(self):
+        if not self.selection:
+            self.status_label.configure(text="Select a node to collapse or expand it.")
+            return
+        for node_id in sorted(self.selection):
+            if node_id not in self.graph.tree.hidden:
+                self.toggle_collapse(node_id)
+
+    def toggle_collapse(self, node_id):
+        tree = self.graph.tree
+        if node_id in tree.collapsed:
+            shown = self.graph.expand(node_id)
+            self.renderer.update_badge(node_id)
+            self.renderer.sync()
+            self.update_search()  # re-highlight hits that came back
+            self.status_label.configure(text=f"Expanded {len(shown)} node(s).")
+        elif node_id in tree.children:
+            hidden = self.graph.collapse(node_id)
+            self.set_selection(self.selection - tree.hidden)
+            if self.first_connect_node in tree.hidden:
+                self.first_connect_node = None
+            # items go right away rather than on the next sync
+            self.renderer.hide_nodes(hidden)
+            self.renderer.update_badge(node_id)
+            self.status_label.configure(
+                text=f"Collapsed {tree.descendant_count(node_id)} node(s)."
+            )
+        else:
+            self.status_label.configure(text="That node has nothing to collapse.")
+        self.seen_visibility = self.graph.visibility_changes
+
+    def reveal_node(self, node_id):
+        """Expand every collapsed node above `node_id`."""
+        ancestors = self.graph.tree.collapsed_ancestors(node_id)
+        self.graph.reveal(node_id)
+        for ancestor in ancestors:
+            self.renderer.update_badge(ancestor)
+        self.renderer.sync()
+        self.seen_visibility = self.graph.visibility_changes
+
+    def sync_visibility(self):
+        """Catch up after an edit changed subtree sizes or hid or showed nodes."""
+        graph = self.graph
+        self.renderer.refresh_badges()
+        if graph.visibility_changes == self.seen_visibility:
+            return
+        self.seen_visibility = graph.visibility_changes
+        hidden = graph.tree.hidden
+        self.set_selection(self.selection - hidden)
+        if self.first_connect_node in hidden:
+            self.first_connect_node = None
+        self.renderer.sync()
+
+    # ---------------------------------------------------------------------
+    # Search
+    # ---------------------------------------------------------------------
+
+    def on_search_key(self, event):
+        if event.keysym in ("Return", "Escape"):
+            return
+        self.update_search()
+        if self.search_entry.get().strip():
+            count = len(self.search_hits)
+            more = "+" if count == SEARCH_LIMIT else ""
+            self.status_label.configure(text=f"{count}{more} matching node(s).")
+
+    def update_search(self):
+        """Re-run the search box query against the map and show the hits."""
+        hits = self.graph.text_index.search(self.search_entry.get(), SEARCH_LIMIT)
+        nodes = self.nodes
+        old_hits = set(self.search_hits) - self.selection - {self.first_connect_node}
+        for node_id in old_hits.difference(hits):
+            self.highlight_node(node_id, highlight=False)
+        for node_id in hits:
+            self.highlight_node(node_id, highlight=True)
+        self.search_hits = hits
+
+        results = self.search_results
+        results.delete(0, "end")
+        for node_id in hits:
+            results.insert("end", " ".join(nodes[node_id].text.split()))
+        if hits:
+            results.configure(height=min(len(hits), 6))
+            results.pack(after=self.search_entry, fill="x", padx=15, pady=(0, 4))
+        else:
+            results.pack_forget()
+
+    def clear_search(self):
+        self.search_entry.delete(0, "end")
+        self.update_search()
+
+    def on_search_result_select(self):
+        selected = self.search_results.curselection()
+        if selected:
+            self.jump_to_search_result(selected[0])
+
+    def jump_to_search_result(self, index):
+        """Select a search hit and center the view on it."""
+        if index >= len(self.search_hits):
+            return
+        node_id = self.search_hits[index]
+        node = self.nodes[node_id]
+        if node_id in self.graph.tree.hidden:
+            self.reveal_node(node_id)
+        self.set_selection({node_id})
+        self.renderer.center_on(node.x, node.y)
+        self.status_label.configure(text=f"Showing “{node.text}”.")
+
+    # ---------------------------------------------------------------------
+    # Auto Layout
+    # ---------------------------------------------------------------------
+
+    def auto_layout(self):
+        if not self.nodes or self.layout_moves:
+            return
+        kind = self.layout_choice.get().lower()
+        # computed on a worker thread from a snapshot, like a save
+        self.start_task(
+            "lay out", self.animate_layout, compute_layout, self.graph.snapshot(), kind
+        )
+
+    def animate_layout(self, positions):
+        """Move the nodes to their computed places, one batch per frame."""
+        nodes = self.nodes
+        self.set_selection(set())
+        moves = [
+            (node_id, x, y) for node_id, (x, y) in positions.items() if node_id in nodes
+        ]
+        self.layout_undo = [
+            [node_id, nodes[node_id].x, nodes[node_id].y] for node_id, _, _ in moves
+        ]
+        moves.reverse()
+        self.layout_moves = moves
+        self.status_label.configure(text="Applying layout…")
+        self.after_idle(self.step_layout)
+
+    def step_layout(self):
+        if self.layout_undo is None:
+            return  # the map was replaced meanwhile
+        moves = self.layout_moves
+        nodes = self.nodes
+        for _ in range(min(LAYOUT_BATCH, len(moves))):
+            node_id, x, y = moves.pop()
+            if node_id in nodes:
+                self.graph.set_position(node_id, x, y)
+                self.renderer.move_node(node_id)
+        if moves:
+            self.after(FRAME_MS, self.step_layout)
+            return
+
+        # one journal record and one undo entry for the whole layout
+        undo = [move for move in self.layout_undo if move[0] in nodes]
+        self.layout_undo = None
+        op = {
+            "op": "move_many",
+            "moves": [
+                [node_id, nodes[node_id].x, nodes[node_id].y] for node_id, _, _ in undo
+            ],
+        }
+        self.record_op(op)
+        self.history.record(Command("auto layout", [op], [{"op": "move_many", "moves": undo}]))
+        self.renderer.sync()
+        self.status_label.configure(text="Layout applied.")
+
+    # ---------------------------------------------------------------------
+    # Autosave
+    # ---------------------------------------------------------------------
+
+    def record_op(self, op, send=True):
+        """Queue an edit for the journal; it reaches disk on the next flush.
+
+        In a live session it is also queued for the other windows, unless
+        `send` is false.
+        """
+        self.journal.append(op)
+        self.edit_count += 1
+        if send and self.sync is not None:
+            self.sync.send(op)
+
+    def flush_journal(self):
+        self.journal.flush()
+        if self.journal.needs_compaction:
+            self.journal.compact(self.graph.snapshot())
+        self.after(JOURNAL_FLUSH_MS, self.flush_journal)
+
+    def switch_journal(self, journal):
+        """Start journaling to `journal`; the old autosave is no longer needed."""
+        if journal is not self.journal:
+            self.journal.discard()
+        self.journal = journal
+
+    def offer_recovery(self):
+        if not self.journal.has_recovery():
+            return
+        if messagebox.askyesno(
+            "Recover Mind Map",
+            "MindCraft found unsaved changes from an earlier session. Recover them?",
+        ):
+            self.recover_map(self.journal)
+        else:
+            self.journal.discard()
+
+    def recover_map(self, journal):
+        """Rebuild a map from its autosave and keep journaling to it."""
+
+        def on_done(graph):
+            self.switch_journal(journal)
+            self.install_graph(graph, journal.base)
+            self.status_label.configure(text="Recovered unsaved changes.")
+
+        self.start_task("recover", on_done, journal.recover)
+
+    def on_close(self):
+        if self.sync is not None:
+            self.sync.close()
+        # unsaved edits stay on disk and are offered again next time
+        self.journal.close()
+        self.destroy()
+
+    # ---------------------------------------------------------------------
+    # Live Session
+    # ---------------------------------------------------------------------
+
+    def toggle_session(self):
+        if self.sync is not None:
+            self.leave_session("Left the session.")
+            return
+        dialog = ctk.CTkInputDialog(
+            text=f"Session address (host:port, default {sync.HOST}:{sync.PORT}):",
+            title="Join Session",
+        )
+        address = dialog.get_input()
+        if address is None:
+            return
+        host, _, port = address.strip().rpartition(":")
+        if not host:
+            host, port = port, ""
+        try:
+            port = int(port) if port else sync.PORT
+        except ValueError:
+            self.status_label.configure(text=f"Not a port number: {port}")
+            return
+        self.join_session(host or sync.HOST, port)
+
+    def join_session(self, host, port):
+        """Replace the map with a live session's and keep it in step."""
+
+        def on_done(result):
+            client, graph = result
+            self.swap_graph(graph)
+            self.history.clear()
+            # journaled before joining, so it is not sent back
+            self.record_op(restore_op(graph))
+            self.sync = client
+            self.session_button.configure(text="Leave Session")
+            self.status_label.configure(
+                text=f"Joined the session at {host}:{port} as window {client.client_id}."
+            )
+            self.after(FRAME_MS, self.poll_sync, client)
+
+        # the snapshot can be large, so it is received off the UI thread
+        self.start_task(
+            "join", on_done, sync.join, host, port,
+            # joined just as the user cancelled: leave again
+            discard=lambda result: result[0].close(),
+        )
+
+    def leave_session(self, message):
+        self.sync.close()
+        self.sync = None
+        # the map stays; new nodes continue after every id on it
+        self.node_counter = max(self.node_counter, self.graph.max_node_id())
+        self.session_button.configure(text="🤝 Join Session…")
+        self.status_label.configure(text=message)
+
+    def poll_sync(self, client):
+        """Send this frame's edits as one batch and apply what arrived."""
+        if client is not self.sync:
+            return  # left that session
+        client.flush()
+        # during a group drag the model lags the canvas, so edits from
+        # other windows wait until it has caught up
+        if not self.group_drag:
+            for event in client.poll():
+                if event[0] == "ops":
+                    self.apply_remote_ops(event[1])
+                else:
+                    self.leave_session(f"Session ended: {event[1]}")
+                    return
+        self.after(FRAME_MS, self.poll_sync, client)
+
+    # ---------------------------------------------------------------------
+    # Background Tasks
+    # ---------------------------------------------------------------------
+
+    def start_task(self, verb, on_done, fn, *args, discard=None):
+        """Run fn(*args) on a worker thread, then on_done(result) on the UI thread.
+
+        If the task was cancelled but finished anyway, its result goes to
+        `discard` instead, when one is given.
+        """
+        if self.task is not None:
+            self.status_label.configure(
+                text="Please wait for the current save/load to finish."
+            )
+            return
+        # timed on the worker, so the HUD shows the work, not the polling
+        self.task = BackgroundTask(self.timings.wrap(verb, fn), *args).start()
+        self.task_label = verb
+        self.task_done = on_done
+        self.task_discard = discard
+        self.cancel_button.pack(after=self.status_label, anchor="w", padx=15, pady=(0, 4))
+        self.after(TASK_POLL_MS, self.poll_task)
+
+    def poll_task(self):
+        for message in self.task.poll():
+            kind = message[0]
+            if kind == "progress":
+                _, stage, done, total = message
+                percent = done * 100 // total if total else 0
+                self.status_label.configure(text=f"{stage.capitalize()}… {percent}%")
+                continue
+
+            task, verb, on_done = self.task, self.task_label, self.task_done
+            discard = self.task_discard
+            self.task = None
+            self.task_done = self.task_discard = None
+            self.cancel_button.pack_forget()
+            if kind == "done" and task.cancelled and discard is not None:
+                discard(message[1])
+                kind = "cancelled"
+            if kind == "done":
+                on_done(message[1])
+            elif kind == "error":
+                self.status_label.configure(text="Ready")
+                messagebox.showerror("Error", f"Failed to {verb} map:\n{message[1]}")
+            else:
+                self.status_label.configure(text=f"Cancelled {verb}.")
+            return
+        self.after(TASK_POLL_MS, self.poll_task)
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.status_label.configure(text="Cancelling…")
+
+    # ---------------------------------------------------------------------
+    # Diagnostics
+    # ---------------------------------------------------------------------
+
+    def toggle_hud(self):
+        enabled = bool(self.hud_switch.get())
+        self.timings.enabled = enabled
+        if enabled:
+            self.last_frame = time.perf_counter()
+            self.frame_after_id = self.after(FRAME_MS, self.tick_frame)
+            self.refresh_hud()
+            return
+        self.after_cancel(self.frame_after_id)
+        self.after_cancel(self.hud_after_id)
+        self.canvas.delete(self.hud_item)
+        self.hud_item = None
+        self.timings.clear()
+
+    def tick_frame(self):
+        """Measure how late the event loop runs a callback asked for every frame."""
+        now = time.perf_counter()
+        self.timings.record("frame", now - self.last_frame)
+        self.last_frame = now
+        self.frame_after_id = self.after(FRAME_MS, self.tick_frame)
+
+    def refresh_hud(self):
+        lines = self.timings.lines()
+        lines.append(
+            f"canvas items {len(self.canvas.find_all())}  nodes {len(self.graph.nodes)}"
+            f"  connections {len(self.graph.edges)}"
+        )
+        # recreated each time: panning, zooming and loading move or delete it
+        if self.hud_item is not None:
+            self.canvas.delete(self.hud_item)
+        self.hud_item = self.canvas.create_text(
+            8, 8, text="\n".join(lines), anchor="nw", font=HUD_FONT, fill="#111827",
+        )
+        self.hud_after_id = self.after(HUD_REFRESH_MS, self.refresh_hud)
+
+    def profile_dialog(self):
+        if self.profiler is not None:
+            self.status_label.configure(text="A profile is already being recorded.")
+            return
+        dialog = ctk.CTkInputDialog(text="Seconds to profile:", title="Profile")
+        try:
+            seconds = float(dialog.get_input())
+        except (TypeError, ValueError):
+            return
+        if seconds <= 0:
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".prof",
+            filetypes=PROFILE_FILETYPES,
+            title="Save Profile",
+        )
+        if not path:
+            return
+        kind = "sample" if path.lower().endswith(".txt") else "cprofile"
+        self.profiler = Profiler(kind).start()
+        self.status_label.configure(text=f"Profiling for {seconds:g} s…")
+        self.after(int(seconds * 1000), self.finish_profile, path)
+
+    def finish_profile(self, path):
+        profiler, self.profiler = self.profiler, None
+        try:
+            profiler.stop(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save profile:\n{e}")
+            return
+        self.status_label.configure(text=f"Saved profile to {path}")
+
+    # ---------------------------------------------------------------------
+    # Analytics
+    # ---------------------------------------------------------------------
+
+    def toggle_analytics(self):
+        if self.analytics_switch.get():
+            self.graph.track_analytics()
+            self.analytics_label.pack(after=self.analytics_switch, fill="x", padx=15)
+            self.analytics_list.pack(
+                after=self.analytics_label, fill="x", padx=15, pady=(0, 4)
+            )
+            self.analytics_seen = None
+            self.refresh_analytics()
+            return
+        self.after_cancel(self.analytics_after_id)
+        self.analytics_label.pack_forget()
+        self.analytics_list.pack_forget()
+        self.graph.analytics = None
+        self.analytics_actions = []
+        self.cycle_key = None
+
+    def refresh_analytics(self):
+        """Show the map's shape in the panel, if it changed since last time."""
+        self.analytics_after_id = self.after(ANALYTICS_REFRESH_MS, self.refresh_analytics)
+        graph = self.graph
+        if (graph, self.edit_count) == self.analytics_seen:
+            return
+        self.analytics_seen = (graph, self.edit_count)
+        analytics = graph.analytics
+        degrees = analytics.degrees
+        max_degree = analytics.max_degree()
+        histogram = "  ".join(
+            f"{degree}:{degrees.get(degree, 0)}" for degree in range(6)
+        )
+        many = sum(count for degree, count in degrees.items() if degree >= 6)
+        self.analytics_label.configure(
+            text=(
+                f"{len(graph.nodes)} nodes, {len(graph.edges)} connections\n"
+                f"{analytics.component_count} components, "
+                f"{analytics.cycle_count} independent cycles\n"
+                f"Degrees {histogram}  6+:{many}"
+            )
+        )
+
+        rows = [(f"Orphans: {len(analytics.orphans)}", self.show_orphans)]
+        for node_id, size in analytics.largest_components(ANALYTICS_ROWS):
+            rows.append(
+                (f"Component: {size} nodes",
+                 lambda node_id=node_id: self.show_component(node_id))
+            )
+        for root, size in analytics.largest_trees(ANALYTICS_ROWS):
+            text = " ".join(graph.nodes[root].text.split())
+            rows.append(
+                (f"Branch “{text}”: {size} nodes",
+                 lambda root=root: self.show_branch(root))
+            )
+        if max_degree:
+            rows.append((f"Most connected: degree {max_degree}", self.show_most_connected))
+        if analytics.cycle_count:
+            rows.append((f"Cycles: {analytics.cycle_count} — show one", self.show_cycle))
+
+        listbox = self.analytics_list
+        listbox.delete(0, "end")
+        for text, _ in rows:
+            listbox.insert("end", text)
+        listbox.configure(height=len(rows))
+        self.analytics_actions = [action for _, action in rows]
+
+    def on_analytics_select(self):
+        selected = self.analytics_list.curselection()
+        if selected and selected[0] < len(self.analytics_actions):
+            self.analytics_actions[selected[0]]()
+            self.analytics_list.selection_clear(0, "end")
+
+    def show_nodes(self, node_ids, what, focus=None):
+        """Select `node_ids` and center the view on `focus`, or any of them."""
+        node_ids = set(node_ids) & self.nodes.keys()
+        if not node_ids:
+            self.status_label.configure(text="Nothing to show.")
+            return
+        if focus not in node_ids:
+            focus = next(iter(node_ids))
+        if focus in self.graph.tree.hidden:
+            self.reveal_node(focus)
+        self.set_selection(node_ids - self.graph.tree.hidden)
+        node = self.nodes[focus]
+        self.renderer.center_on(node.x, node.y)
+        self.status_label.configure(
+            text=f"{what.capitalize()}: {len(node_ids)} node(s) selected."
+        )
+
+    def show_orphans(self):
+        self.show_nodes(self.graph.analytics.orphans, "orphans")
+
+    def show_component(self, node_id):
+        self.show_nodes(self.graph.analytics.component_of(node_id), "component")
+
+    def show_branch(self, root):
+        self.show_nodes(self.graph.tree.subtree(root), "branch", focus=root)
+
+    def show_most_connected(self):
+        analytics = self.graph.analytics
+        nodes = analytics.nodes_of_degree(analytics.max_degree())
+        self.show_nodes(nodes, "most connected", focus=nodes[0] if nodes else None)
+
+    def show_cycle(self):
+        found = self.graph.analytics.find_cycle(after=self.cycle_key)
+        if found is None:
+            self.status_label.configure(text="The map has no cycles.")
+            return
+        self.cycle_key, path = found
+        self.show_nodes(path, "cycle", focus=path[0])
+
+
+if __name__ == "__main__":
+    app = MindCraftApp()
+    app.mainloop()
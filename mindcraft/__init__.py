@@ -0,0 +1,6 @@
+"""MindCraft core: the mind map model, independent of the Tk user interface."""
+
+from .graph import Connection, Graph, Node, edge_key
+from .mapfile import load_map, save_map
+
+__all__ = ["Connection", "Graph", "Node", "edge_key", "load_map", "save_map"]
@@ -0,0 +1,530 @@
+"""Shape of a map, kept up to date as it is edited.
+
+Components are built from the trees of the graph's TreeIndex, which
+already keeps every node's parent and every subtree's size.  Only tree
+roots carry a component label: a node's component is its root's, O(depth)
+away, and the connections outside the trees (cross links) are what join
+several trees into one component.  Joining two components relabels the
+roots of the smaller one.  Cutting a tree connection makes a new root,
+and whether its tree is still joined to the rest is settled from the
+component's cross links alone, without visiting its nodes, so a tree map
+is kept up to date in O(depth) per edit.
+
+Alongside, the number of nodes of each degree and the set of orphans
+(nodes with no connections) change by a few counts per edit, and heaps of
+component and tree sizes answer "largest" queries without a scan.  Nodes
+without connections carry no label; each one is a component on its own.
+"""
+
+from collections import deque
+from heapq import heapify, heappop, heappush
+
+CROSS_SCAN_LIMIT = 256  # cross links to check before searching nodes instead
+
+
+class Analytics:
+    """Components, degrees and orphans of a Graph.
+
+    Built in one pass over the graph, then told about every change by
+    the Graph itself (see Graph.track_analytics), once its TreeIndex is
+    up to date.  An edit costs O(depth), plus the roots and cross links of
+    the smaller component when it joins two, plus a look at every cross
+    link of a component it may split.  Components with more than
+    CROSS_SCAN_LIMIT cross links are split by searching their nodes
+    instead, which stops as soon as only one part is left unexplored.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.label = {}  # tree root -> component label, for connected roots
+        self.roots = {}  # label -> roots of the trees in the component
+        self.sizes = {}  # label -> number of nodes in the component
+        self.cross = {}  # label -> keys of the cross links in the component
+        self.orphans = set()  # nodes with no connections
+        self.degrees = {}  # degree -> number of nodes with it
+        self._next_label = 0
+        self._component_heap = []  # (-size, label), out-of-date entries skipped
+        self._tree_heap = []  # (-size, root), out-of-date entries skipped
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute everything from the graph."""
+        for table in (self.label, self.roots, self.sizes, self.cross, self.orphans,
+                      self.degrees):
+            table.clear()
+        self._component_heap = []
+        degrees = self.degrees
+        incident = self.graph.incident
+        for node_id, keys in incident.items():
+            degree = len(keys)
+            degrees[degree] = degrees.get(degree, 0) + 1
+            if not degree:
+                self.orphans.add(node_id)
+        parent = self.graph.tree.parent
+        label = self.label
+        is_cross = self._is_cross
+        for node_id, keys in incident.items():
+            if keys and node_id not in parent and node_id not in label:
+                nodes = self._reach(node_id)
+                self._new_component(
+                    {other for other in nodes if other not in parent},
+                    len(nodes),
+                    {key for other in nodes for key in incident[other] if is_cross(key)},
+                )
+        self._rebuild_tree_heap()
+
+    # ---------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------
+
+    @property
+    def component_count(self):
+        return len(self.sizes) + len(self.orphans)
+
+    @property
+    def cycle_count(self):
+        """Independent cycles: connections beyond a spanning forest."""
+        graph = self.graph
+        return len(graph.edges) - len(graph.nodes) + self.component_count
+
+    def component_of(self, node_id):
+        """The ids of the nodes connected to `node_id`, itself included."""
+        tree = self.graph.tree
+        label = self.label.get(tree.root(node_id))
+        if label is None:
+            return {node_id}
+        found = set()
+        for root in self.roots[label]:
+            found.update(tree.subtree(root))
+        return found
+
+    def largest_components(self, count):
+        """The `count` largest components with connections, as (node, size)
+        pairs naming one node of each."""
+        sizes = self.sizes
+        found = self._largest(
+            self._component_heap, count, lambda label, size: sizes.get(label) == size
+        )
+        roots = self.roots
+        return [(next(iter(roots[label])), size) for label, size in found]
+
+    def largest_trees(self, count):
+        """Roots of the `count` largest trees, as (root, size) pairs."""
+        label = self.label
+        tree_size = self.graph.tree.size
+        return self._largest(
+            self._tree_heap, count,
+            lambda root, size: root in label and tree_size.get(root) == size,
+        )
+
+    def max_degree(self):
+        return max(self.degrees, default=0)
+
+    def nodes_of_degree(self, degree):
+        return [
+            node_id for node_id, keys in self.graph.incident.items() if len(keys) == degree
+        ]
+
+    def find_cycle(self, after=None):
+        """A cycle of the map as (edge key, node ids), or None.
+
+        Tries the connections outside the tree in turn, starting after
+        the edge key `after`, and returns the shortest way round through
+        the first one with another path between its ends.
+        """
+        graph = self.graph
+        keys = list(graph.edges)
+        start = keys.index(after) + 1 if after in graph.edges else 0
+        for key in keys[start:] + keys[:start]:
+            if not self._is_cross(key):
+                continue
+            conn = graph.edges[key]
+            path = self._path(conn.from_id, conn.to_id, key)
+            if path is not None:
+                return key, path
+        return None
+
+    # ---------------------------------------------------------------------
+    # Updates, called by the Graph after it changed
+    # ---------------------------------------------------------------------
+
+    def node_added(self, node_id):
+        self._count_degree(0, 1)
+        self.orphans.add(node_id)
+
+    def node_removed(self, node_id, neighbours):
+        """A node went, taking its connections to `neighbours` with it."""
+        self._count_degree(len(neighbours), -1)
+        self.orphans.discard(node_id)
+        others = [other for other in neighbours if other != node_id]
+        root = self.graph.tree.root
+        roots = [root(other) for other in others]
+        label = self.label
+        component = label.pop(node_id, None)
+        if component is not None:
+            self.roots[component].discard(node_id)
+        elif roots:
+            # its parent's tree kept its root, and with it the label
+            component = next(label[top] for top in roots if top in label)
+        else:
+            return  # an orphan
+        self.sizes[component] -= 1
+        cross = self.cross[component]
+        for other in neighbours:
+            cross.discard((node_id, other) if node_id <= other else (other, node_id))
+        self._settle(component, others, roots)
+        for other in others:
+            self._lost_connection(other)
+        # gone already if all its neighbours became orphans, empty if it
+        # only had a loop to itself
+        if component in self.sizes and self._kept(component):
+            orphans = self.orphans
+            self._split(component, {
+                top for other, top in zip(others, roots) if other not in orphans
+            })
+            self._sized(component)
+
+    def edge_added(self, a, b):
+        self._gained_connection(a)
+        if a != b:
+            self._gained_connection(b)
+        tree = self.graph.tree
+        label = self.label
+        top = tree.root(a)
+        component = label.get(top)
+        if component is None:
+            component = self._new_component({top}, 1, set())  # a was an orphan
+        if tree.parent.get(b) == a:
+            # b was a root, and its tree now hangs under a
+            other = label.pop(b, None)
+            if other is None:
+                self.sizes[component] += 1  # b was an orphan
+            else:
+                self.roots[other].discard(b)
+                if other != component:
+                    component = self._join(component, other)
+            self._tree_sized(top)
+        else:
+            bottom = tree.root(b)
+            other = label.get(bottom)
+            if other is None:
+                other = self._new_component({bottom}, 1, set())
+            if other != component:
+                component = self._join(component, other)
+            self.cross[component].add((a, b) if a <= b else (b, a))
+        self._sized(component)
+
+    def edge_removed(self, a, b):
+        root = self.graph.tree.root
+        top = root(a)
+        bottom = root(b)
+        component = self.label[top]
+        self.cross[component].discard((a, b) if a <= b else (b, a))
+        self._settle(component, (a, b), (top, bottom))
+        self._lost_connection(a)
+        if a != b:
+            self._lost_connection(b)
+        if component in self.sizes:
+            if a not in self.orphans and b not in self.orphans:
+                self._split(component, {top, bottom})
+            self._sized(component)
+
+    # ---------------------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------------------
+
+    def _count_degree(self, degree, delta):
+        degrees = self.degrees
+        count = degrees.get(degree, 0) + delta
+        if count:
+            degrees[degree] = count
+        else:
+            del degrees[degree]
+
+    def _gained_connection(self, node_id):
+        degree = len(self.graph.incident[node_id])
+        self._count_degree(degree - 1, -1)
+        self._count_degree(degree, 1)
+        if degree == 1:
+            self.orphans.discard(node_id)
+
+    def _lost_connection(self, node_id):
+        degree = len(self.graph.incident[node_id])
+        self._count_degree(degree + 1, -1)
+        self._count_degree(degree, 1)
+        if degree:
+            return
+        # with no connections left it is a root on its own
+        self.orphans.add(node_id)
+        component = self.label.pop(node_id, None)
+        if component is not None:
+            self.roots[component].discard(node_id)
+            self.sizes[component] -= 1
+            self._kept(component)
+
+    def _kept(self, component):
+        """Forget `component` if it has no nodes left; True if it has some."""
+        if self.sizes[component]:
+            return True
+        del self.roots[component], self.sizes[component], self.cross[component]
+        return False
+
+    def _is_cross(self, key):
+        """True if the connection `key` is not a tree connection."""
+        conn = self.graph.edges[key]
+        return self.graph.tree.parent.get(conn.to_id) != conn.from_id
+
+    def _settle(self, component, nodes, roots):
+        """Bring the trees of `nodes` into `component` after their parents changed.
+
+        `roots` are the current roots of `nodes`.  A node cut from its
+        parent is a new root; one that found another parent did so through
+        a connection that was a cross link until now.
+        """
+        label = self.label
+        parent = self.graph.tree.parent
+        cross = self.cross[component]
+        for node_id, root in zip(nodes, roots):
+            if root not in label:
+                label[root] = component
+                self.roots[component].add(root)
+            up = parent.get(node_id)
+            if up is not None:
+                cross.discard((up, node_id) if up <= node_id else (node_id, up))
+        for root in set(roots):
+            self._tree_sized(root)
+
+    def _new_component(self, roots, size, cross):
+        label = self._next_label
+        self._next_label += 1
+        for root in roots:
+            self.label[root] = label
+        self.roots[label] = roots
+        self.sizes[label] = size
+        self.cross[label] = cross
+        self._sized(label)
+        return label
+
+    def _join(self, a, b):
+        """Merge components `a` and `b`; returns the label kept."""
+        roots = self.roots
+        cross = self.cross
+        if len(roots[a]) + len(cross[a]) < len(roots[b]) + len(cross[b]):
+            a, b = b, a
+        label = self.label
+        for root in roots[b]:
+            label[root] = a
+        roots[a] |= roots.pop(b)
+        cross[a] |= cross.pop(b)
+        self.sizes[a] += self.sizes.pop(b)
+        return a
+
+    def _carve(self, component, roots, size, cross):
+        """Move the trees `roots` out of `component` into a new one."""
+        self.roots[component] -= roots
+        self.sizes[component] -= size
+        self.cross[component] -= cross
+        self._new_component(roots, size, cross)
+
+    def _split(self, component, starts):
+        """Give new labels to the parts of `component` no longer connected.
+
+        `starts` are roots of trees that were in the component before a
+        connection or node went.  Every part holds at least one of them,
+        and a tree is connected through itself, so one start settles it.
+        """
+        if len(starts) < 2:
+            return
+        if len(self.cross[component]) <= CROSS_SCAN_LIMIT:
+            self._regroup(component)
+        else:
+            self._search(component, list(starts))
+
+    def _regroup(self, component):
+        """Split `component` into the groups of trees its cross links join.
+
+        A union-find over the component's roots, one union per cross
+        link; the largest group keeps the label.
+        """
+        roots = self.roots[component]
+        if len(roots) < 2:
+            return
+        group = {root: root for root in roots}
+
+        def find(root):
+            while group[root] != root:
+                group[root] = root = group[group[root]]
+            return root
+
+        tree_root = self.graph.tree.root
+        cross_roots = {}
+        for key in self.cross[component]:
+            a = cross_roots[key] = tree_root(key[0])
+            a = find(a)
+            b = find(tree_root(key[1]))
+            if a != b:
+                group[a] = b
+        parts = {}
+        for root in roots:
+            parts.setdefault(find(root), set()).add(root)
+        if len(parts) == 1:
+            return
+        tree_size = self.graph.tree.size
+        sized = sorted(
+            ((sum(tree_size[root] for root in part), leader, part)
+             for leader, part in parts.items()),
+            key=lambda entry: entry[0],
+        )
+        cross = {leader: set() for leader in parts}
+        for key, root in cross_roots.items():
+            cross[find(root)].add(key)
+        for size, leader, part in sized[:-1]:
+            self._carve(component, part, size, cross[leader])
+
+    def _search(self, component, starts):
+        """Split `component` by searching its nodes from `starts`.
+
+        A search runs from each start, one node at a time in turn, and
+        searches that meet are merged.  A search that runs out of nodes
+        has found a part cut off from the rest and gets a new label.
+        Once a single search is left, it is exploring what keeps the old
+        label and can stop, so the cost is about the size of the parts
+        cut off.
+        """
+        owner = {}  # node_id -> index of the search that reached it
+        merged_into = list(range(len(starts)))
+        seen = []
+        frontier = []
+        for i, start in enumerate(starts):
+            owner[start] = i
+            seen.append({start})
+            frontier.append(deque([start]))
+
+        def find(i):
+            while merged_into[i] != i:
+                i = merged_into[i]
+            return i
+
+        neighbours = self._neighbours
+        running = set(range(len(starts)))
+        while len(running) > 1:
+            for i in list(running):
+                if i not in running:
+                    continue  # merged earlier in this round
+                if not frontier[i]:
+                    running.discard(i)
+                    self._carve_nodes(component, seen[i])
+                    if len(running) == 1:
+                        break
+                    continue
+                node_id = frontier[i].popleft()
+                for other in neighbours(node_id):
+                    j = owner.get(other)
+                    if j is None:
+                        owner[other] = i
+                        seen[i].add(other)
+                        frontier[i].append(other)
+                        continue
+                    j = find(j)
+                    if j == i:
+                        continue
+                    # the two searches met: keep the larger one
+                    if len(seen[i]) < len(seen[j]):
+                        i, j = j, i
+                    merged_into[j] = i
+                    seen[i] |= seen[j]
+                    frontier[i].extend(frontier[j])
+                    running.discard(j)
+                    seen[j] = frontier[j] = None
+
+    def _carve_nodes(self, component, nodes):
+        """Move the part of `component` made of `nodes` into a new one."""
+        parent = self.graph.tree.parent
+        incident = self.graph.incident
+        cross = self.cross[component]
+        self._carve(
+            component,
+            {node_id for node_id in nodes if node_id not in parent},
+            len(nodes),
+            {key for node_id in nodes for key in incident[node_id] if key in cross},
+        )
+
+    def _sized(self, label):
+        """Note the current size of component `label` for largest_components."""
+        heap = self._component_heap
+        heappush(heap, (-self.sizes[label], label))
+        if len(heap) > 2 * len(self.sizes) + 64:
+            self._component_heap = [(-size, key) for key, size in self.sizes.items()]
+            heapify(self._component_heap)
+
+    def _tree_sized(self, root):
+        """Note the current size of the tree under `root` for largest_trees."""
+        size = self.graph.tree.size[root]
+        if size > 1:
+            heappush(self._tree_heap, (-size, root))
+            if len(self._tree_heap) > 2 * len(self.label) + 64:
+                self._rebuild_tree_heap()
+
+    def _rebuild_tree_heap(self):
+        tree_size = self.graph.tree.size
+        self._tree_heap = [
+            (-tree_size[root], root) for root in self.label if tree_size[root] > 1
+        ]
+        heapify(self._tree_heap)
+
+    @staticmethod
+    def _largest(heap, count, current):
+        """The `count` largest (key, size) entries of `heap` that are `current`.
+
+        Entries that are out of date are dropped on the way down; the
+        ones returned are pushed back.
+        """
+        found = []
+        keys = set()
+        while heap and len(found) < count:
+            size, key = heappop(heap)
+            size = -size
+            if key not in keys and current(key, size):
+                keys.add(key)
+                found.append((key, size))
+        for key, size in found:
+            heappush(heap, (-size, key))
+        return found
+
+    def _neighbours(self, node_id):
+        for a, b in self.graph.incident[node_id]:
+            yield b if a == node_id else a
+
+    def _reach(self, start):
+        """Every node connected to `start`."""
+        seen = {start}
+        stack = [start]
+        neighbours = self._neighbours
+        while stack:
+            for other in neighbours(stack.pop()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    def _path(self, a, b, skip):
+        """Shortest path from a to b that does not use connection `skip`."""
+        previous = {a: None}
+        queue = deque([a])
+        incident = self.graph.incident
+        while queue:
+            node_id = queue.popleft()
+            for key in incident[node_id]:
+                if key == skip:
+                    continue
+                other = key[1] if key[0] == node_id else key[0]
+                if other in previous:
+                    continue
+                previous[other] = node_id
+                if other == b:
+                    path = [b]
+                    while previous[path[-1]] is not None:
+                        path.append(previous[path[-1]])
+                    return path
+                queue.append(other)
+        return None
@@ -0,0 +1,276 @@
+"""Compact binary map format (.mcmap).
+
+Layout (little-endian, every section starts on an 8-byte boundary):
+
+    header          magic, version, node/edge/string counts, string bytes
+    ids             int64[node_count]
+    xs, ys          float64[node_count]
+    labels          uint32[node_count]   index into the string table
+    edges           int64[2 * edge_count] (from, to) pairs
+    string offsets  uint64[string_count + 1]
+    string data     UTF-8 bytes of every distinct label
+
+The writer streams each column in fixed-size chunks and the reader maps
+the file and views the columns in place, so neither side builds the
+intermediate dictionaries JSON needs.
+"""
+
+import io
+import mmap
+import struct
+import sys
+from array import array
+
+from .graph import Graph, Node, node_size
+
+MAGIC = b"MCMAP\0"
+VERSION = 1
+HEADER = struct.Struct("<6sHQQQQ")
+CHUNK = 65536  # elements written per chunk
+PROGRESS_EVERY = 5000  # nodes/edges between progress reports
+
+_NATIVE_LITTLE = sys.byteorder == "little"
+
+
+def is_binary_map(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _pad(f, written):
+    """Pad the file so the next section starts on an 8-byte boundary."""
+    extra = -written % 8
+    if extra:
+        f.write(b"\0" * extra)
+    return written + extra
+
+
+def _no_progress(stage, done, total):
+    pass
+
+
+def _write_column(f, typecode, values, progress=None):
+    """Write an iterable of numbers as a packed column; return bytes written.
+
+    `progress(count)`, if given, is called after each chunk with the
+    number of values written so far.
+    """
+    written = 0
+    count = 0
+    chunk = array(typecode)
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= CHUNK:
+            written += _write_array(f, chunk)
+            count += len(chunk)
+            if progress is not None:
+                progress(count)
+            chunk = array(typecode)
+    if chunk:
+        written += _write_array(f, chunk)
+    return written
+
+
+def _write_array(f, values):
+    if not _NATIVE_LITTLE:
+        values.byteswap()
+    f.write(values.tobytes())
+    return len(values) * values.itemsize
+
+
+def save_binary(graph, path, progress=_no_progress):
+    with open(path, "wb") as f:
+        _write(graph, f, progress)
+
+
+def dump_binary(graph):
+    """The .mcmap encoding of a map as bytes, e.g. to send it elsewhere."""
+    f = io.BytesIO()
+    _write(graph, f, _no_progress)
+    return f.getvalue()
+
+
+def _write(graph, f, progress):
+    nodes = graph.nodes
+    strings = {}  # label -> index in the string table
+    total = 4 * len(nodes) + 2 * len(graph.edges)
+    done = [0]
+
+    def column_progress(count):
+        progress("saving", done[0] + count, total)
+
+    def finish_column(count):
+        done[0] += count
+        progress("saving", done[0], total)
+
+    def label_indexes():
+        for node in nodes.values():
+            text = node.text
+            index = strings.get(text)
+            if index is None:
+                index = strings[text] = len(strings)
+            yield index
+
+    # counts for the string table are only known at the end
+    f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0))
+    progress("saving", 0, total)
+    _write_column(f, "q", nodes, column_progress)
+    finish_column(len(nodes))
+    _write_column(f, "d", (n.x for n in nodes.values()), column_progress)
+    finish_column(len(nodes))
+    _write_column(f, "d", (n.y for n in nodes.values()), column_progress)
+    finish_column(len(nodes))
+    _pad(f, _write_column(f, "I", label_indexes(), column_progress))
+    finish_column(len(nodes))
+    _write_column(
+        f,
+        "q",
+        (v for c in graph.edges.values() for v in (c.from_id, c.to_id)),
+        column_progress,
+    )
+    finish_column(2 * len(graph.edges))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    _write_column(f, "Q", offsets)
+    for data in encoded:
+        f.write(data)
+
+    f.seek(0)
+    f.write(
+        HEADER.pack(
+            MAGIC, VERSION, len(nodes), len(graph.edges), len(encoded), offsets[-1]
+        )
+    )
+
+
+def _column(buf, offset, typecode, count, views):
+    """View `count` packed values at `offset`; return (values, next_offset).
+
+    Views into the map are appended to `views` so they can be released
+    before the map is closed, even when reading fails half way.
+    """
+    size = array(typecode).itemsize * count
+    end = offset + size
+    if end > len(buf):
+        raise ValueError("truncated map file")
+    raw = buf[offset:end]
+    views.append(raw)
+    if _NATIVE_LITTLE:
+        values = raw.cast(typecode)
+        views.append(values)
+    else:
+        values = array(typecode, raw)
+        values.byteswap()
+    return values, end + (-size % 8)
+
+
+def _read_file(path, read, progress):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buf = memoryview(mapped)
+            views = []
+            try:
+                return read(buf, views, progress)
+            finally:
+                for view in views:
+                    view.release()
+                buf.release()
+
+
+def load_binary(path, progress=_no_progress):
+    """Build a Graph from a .mcmap file through a memory map."""
+    return _read_file(path, _read, progress)
+
+
+def load_binary_records(path):
+    """Read a .mcmap file as (id, x, y, text) node and (from, to)
+    connection records, without building a Graph or sizing labels."""
+    return _read_file(path, _read_records, _no_progress)
+
+
+def load_binary_bytes(data, progress=_no_progress):
+    """Build a Graph from bytes dump_binary returned."""
+    buf = memoryview(data)
+    views = []
+    try:
+        return _read(buf, views, progress)
+    finally:
+        for view in views:
+            view.release()
+        buf.release()
+
+
+def _columns(buf, views):
+    """The columns of a map as (ids, xs, ys, labels, edge ends, texts)."""
+    if len(buf) < HEADER.size:
+        raise ValueError("not a MindCraft binary map")
+    magic, version, node_count, edge_count, string_count, string_bytes = (
+        HEADER.unpack_from(buf)
+    )
+    if magic != MAGIC:
+        raise ValueError("not a MindCraft binary map")
+    if version != VERSION:
+        raise ValueError(f"unsupported binary map version {version}")
+
+    offset = HEADER.size
+    ids, offset = _column(buf, offset, "q", node_count, views)
+    xs, offset = _column(buf, offset, "d", node_count, views)
+    ys, offset = _column(buf, offset, "d", node_count, views)
+    labels, offset = _column(buf, offset, "I", node_count, views)
+    ends, offset = _column(buf, offset, "q", 2 * edge_count, views)
+    string_offsets, offset = _column(buf, offset, "Q", string_count + 1, views)
+    if offset + string_bytes > len(buf):
+        raise ValueError("truncated map file")
+    if max(labels, default=-1) >= string_count or string_offsets[-1] > string_bytes:
+        raise ValueError("corrupt map file")
+
+    # each distinct label is decoded once
+    texts = []
+    strings = buf[offset:offset + string_bytes]
+    views.append(strings)
+    try:
+        for i in range(string_count):
+            texts.append(str(strings[string_offsets[i]:string_offsets[i + 1]], "utf-8"))
+    except UnicodeDecodeError:
+        raise ValueError("corrupt map file") from None
+    return ids, xs, ys, labels, ends, texts
+
+
+def _valid_connections(ends, known):
+    return [
+        (from_id, to_id)
+        for from_id, to_id in zip(ends[0::2], ends[1::2])
+        if from_id != to_id and from_id in known and to_id in known
+    ]
+
+
+def _read_records(buf, views, progress):
+    ids, xs, ys, labels, ends, texts = _columns(buf, views)
+    nodes = [
+        (node_id, x, y, texts[label]) for node_id, x, y, label in zip(ids, xs, ys, labels)
+    ]
+    return nodes, _valid_connections(ends, set(ids))
+
+
+def _read(buf, views, progress):
+    ids, xs, ys, labels, ends, texts = _columns(buf, views)
+    node_count = len(ids)
+    sizes = [node_size(text) for text in texts]
+
+    # records straight from the columns, then every index built in one batch
+    total = node_count + len(ends) // 2
+    nodes = []
+    for start in range(0, node_count, PROGRESS_EVERY):
+        progress("building", start, total)
+        stop = min(start + PROGRESS_EVERY, node_count)
+        chunk = [column[start:stop] for column in (ids, xs, ys, labels)]
+        views.extend(chunk)
+        nodes.extend(
+            Node(node_id, x, y, *sizes[label], texts[label])
+            for node_id, x, y, label in zip(*chunk)
+        )
+    progress("building", node_count, total)
+    return Graph().load(nodes, _valid_connections(ends, {node.id for node in nodes}))
@@ -0,0 +1,75 @@
+"""World-to-screen transform for viewing a map.
+
+Node positions are world coordinates.  The camera maps them to canvas
+pixels as `screen = world * scale + offset`, so panning changes only the
+offset and zooming about a point changes both.
+"""
+
+from math import floor, log2
+
+MIN_SCALE = 0.02
+MAX_SCALE = 8.0
+FONT_BUCKETS = 4  # font sizes per doubling of the zoom
+
+
+class Camera:
+    def __init__(self, scale=1.0, offset_x=0.0, offset_y=0.0):
+        self.scale = scale
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+    def to_screen(self, x, y):
+        return x * self.scale + self.offset_x, y * self.scale + self.offset_y
+
+    def to_world(self, sx, sy):
+        return (sx - self.offset_x) / self.scale, (sy - self.offset_y) / self.scale
+
+    def box_to_screen(self, box):
+        s = self.scale
+        ox = self.offset_x
+        oy = self.offset_y
+        x1, y1, x2, y2 = box
+        return x1 * s + ox, y1 * s + oy, x2 * s + ox, y2 * s + oy
+
+    def points_to_screen(self, points):
+        """Transform a flat (x1, y1, x2, y2, ...) sequence of world points."""
+        s = self.scale
+        ox = self.offset_x
+        oy = self.offset_y
+        return [v * s + (oy if i & 1 else ox) for i, v in enumerate(points)]
+
+    def view_rect(self, width, height, margin=0.0):
+        """World rectangle covered by a `width` x `height` screen area.
+
+        `margin` is in screen pixels and is added on every side.
+        """
+        x1, y1 = self.to_world(-margin, -margin)
+        x2, y2 = self.to_world(width + margin, height + margin)
+        return x1, y1, x2, y2
+
+    def pan(self, dx, dy):
+        """Shift the view by (dx, dy) screen pixels."""
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def zoom_at(self, sx, sy, factor):
+        """Zoom about the screen point (sx, sy), keeping it fixed.
+
+        The scale is clamped to [MIN_SCALE, MAX_SCALE]; returns the factor
+        actually applied (1.0 if already at the limit).
+        """
+        new_scale = min(MAX_SCALE, max(MIN_SCALE, self.scale * factor))
+        factor = new_scale / self.scale
+        self.offset_x = sx - (sx - self.offset_x) * factor
+        self.offset_y = sy - (sy - self.offset_y) * factor
+        self.scale = new_scale
+        return factor
+
+    def center_on(self, x, y, width, height):
+        """Pan so the world point (x, y) is in the middle of the screen."""
+        self.offset_x = width / 2 - x * self.scale
+        self.offset_y = height / 2 - y * self.scale
+
+    def font_bucket(self):
+        """Quantized zoom level; text is re-fonted only when this changes."""
+        return floor(log2(self.scale) * FONT_BUCKETS + 0.5)
@@ -0,0 +1,264 @@
+"""Command-line tool for working with map files without the app.
+
+    python -m mindcraft convert maps/ -o out/ --to mcmap
+    python -m mindcraft validate maps/ --jobs 8
+    python -m mindcraft merge team/ -o merged.json --dedupe
+    python -m mindcraft stats big.mcmap --json
+    python -m mindcraft render map.json -o map.svg
+    python -m mindcraft render big.mcmap --format tiles -o tiles/
+    python -m mindcraft serve map.json --port 8765 -o shared.json
+
+Inputs may be files or directories; a directory stands for every .json
+and .mcmap map directly inside it.  With several inputs the work is
+spread over a process pool.  The exit status is 1 if any input failed
+or (for validate) had problems.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from .export import save_png, save_svg, save_tiles
+from .graph import Graph
+from .mapfile import BINARY_EXTENSION, load_map, save_map
+from .merge import MERGE_GAP, merge_maps, read_maps
+from .stats import map_stats
+from .sync import HOST, PORT, serve
+from .tasks import run_in_processes
+from .validate import check_map
+
+MAP_EXTENSIONS = (".json", BINARY_EXTENSION)
+FORMATS = {"json": ".json", "mcmap": BINARY_EXTENSION}
+
+
+def expand_inputs(paths):
+    """Files named directly, plus the maps inside any named directory."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if os.path.splitext(name)[1].lower() in MAP_EXTENSIONS
+            )
+        else:
+            found.append(path)
+    return found
+
+
+def output_is_directory(output, single):
+    return not single or os.path.isdir(output) or output.endswith(("/", os.sep))
+
+
+def make_output_directory(output, single):
+    """Create `output` if it is a directory for the results, not a file."""
+    if output and output_is_directory(output, single):
+        os.makedirs(output, exist_ok=True)
+
+
+def output_path(path, output, single, extension):
+    """Where the result for `path` goes: `output` itself for a single
+    input, otherwise a file named after the input inside `output`."""
+    if output and not output_is_directory(output, single):
+        return output
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output or os.path.dirname(path), stem + extension)
+
+
+# Workers run in pool processes: they take and return plain values and
+# report errors instead of raising, so one bad file does not stop a batch.
+
+def _convert(path, target):
+    """(ok, message) for one conversion."""
+    try:
+        save_map(load_map(path), target)
+    except Exception as e:
+        return False, f"{path}: {e}"
+    return True, f"{path} -> {target}"
+
+
+def _validate(path):
+    try:
+        return path, check_map(path)
+    except Exception as e:
+        return path, [f"cannot be checked: {e}"]
+
+
+def _stats(path):
+    try:
+        return path, map_stats(load_map(path)), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _render(path, target, kind, scale):
+    """(ok, message) for one map drawn."""
+    try:
+        graph = load_map(path)
+        if kind == "svg":
+            save_svg(graph, target)
+        elif kind == "png":
+            save_png(graph, target, scale)
+        else:
+            save_tiles(graph, target, scale)
+    except Exception as e:
+        return False, f"{path}: {e}"
+    return True, f"{path} -> {target}"
+
+
+def cmd_convert(args):
+    paths = expand_inputs(args.inputs)
+    extension = FORMATS[args.to]
+    single = len(paths) == 1
+    make_output_directory(args.output, single)
+    targets = [output_path(p, args.output, single, extension) for p in paths]
+    failed = False
+    for ok, message in run_in_processes(args.jobs, _convert, paths, targets):
+        failed |= not ok
+        print(message)
+    return failed
+
+
+def cmd_validate(args):
+    failed = False
+    for path, problems in run_in_processes(args.jobs, _validate, expand_inputs(args.inputs)):
+        if problems:
+            failed = True
+            print(f"{path}: {len(problems)} problem(s)")
+            for problem in problems:
+                print(f"  {problem}")
+        elif not args.quiet:
+            print(f"{path}: ok")
+    return failed
+
+
+def cmd_stats(args):
+    results = run_in_processes(args.jobs, _stats, expand_inputs(args.inputs))
+    failed = any(error for _, _, error in results)
+    if args.json:
+        json.dump(
+            {path: stats if error is None else {"error": error}
+             for path, stats, error in results},
+            sys.stdout,
+            indent=2,
+        )
+        print()
+        return failed
+    for path, stats, error in results:
+        if error is not None:
+            print(f"{path}: {error}")
+            continue
+        print(path)
+        for name, value in stats.items():
+            print(f"  {name.replace('_', ' '):<18} {value}")
+    return failed
+
+
+def cmd_merge(args):
+    # parse the inputs in parallel, then merge in the order given
+    paths = expand_inputs(args.inputs)
+    merged = merge_maps(read_maps(paths, args.jobs), args.gap, args.dedupe)
+    save_map(merged, args.output)
+    print(
+        f"merged {len(paths)} map(s) into {args.output}:"
+        f" {len(merged.nodes)} nodes, {len(merged.edges)} connections"
+    )
+    return False
+
+
+def cmd_render(args):
+    paths = expand_inputs(args.inputs)
+    count = len(paths)
+    if args.format == "tiles" and not (count == 1 and args.output):
+        # a directory of tiles per map, next to it or inside -o
+        targets = [output_path(p, args.output, False, "_tiles") for p in paths]
+    else:
+        make_output_directory(args.output, count == 1)
+        targets = [output_path(p, args.output, count == 1, "." + args.format) for p in paths]
+    kinds = [args.format] * count
+    scales = [args.scale] * count
+    failed = False
+    for ok, message in run_in_processes(args.jobs, _render, paths, targets, kinds, scales):
+        failed |= not ok
+        print(message)
+    return failed
+
+
+def cmd_serve(args):
+    graph = load_map(args.map) if args.map else Graph()
+
+    def ready(port):
+        print(f"serving {args.map or 'an empty map'} on {args.host}:{port}; Ctrl+C stops", flush=True)
+
+    graph = serve(graph, args.host, args.port, ready)
+    if args.output:
+        save_map(graph, args.output)
+        print(f"saved the session's map to {args.output}")
+    return False
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m mindcraft", description="Batch processing of MindCraft maps."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, func, help, output=None):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("inputs", nargs="+", help="map files or directories of maps")
+        sub.add_argument(
+            "-j", "--jobs", type=int, default=0,
+            help="worker processes (default: one per CPU; 1 runs in-process)",
+        )
+        if output:
+            sub.add_argument("-o", "--output", required=output == "required", help=(
+                "output file" if output == "required"
+                else "output file for one input, or directory for several"
+            ))
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = command("convert", cmd_convert, "convert maps between JSON and binary", "optional")
+    sub.add_argument("--to", choices=sorted(FORMATS), required=True)
+
+    sub = command("validate", cmd_validate, "check maps for damaged or inconsistent data")
+    sub.add_argument("-q", "--quiet", action="store_true", help="only list maps with problems")
+
+    sub = command("merge", cmd_merge, "combine maps into one, each in a region of its own", "required")
+    sub.add_argument(
+        "--gap", type=float, default=MERGE_GAP, help="space between merged maps"
+    )
+    sub.add_argument(
+        "--dedupe", action="store_true",
+        help="merge nodes whose label already appeared in an earlier map",
+    )
+
+    sub = command("stats", cmd_stats, "print size and shape statistics")
+    sub.add_argument("--json", action="store_true", help="print the statistics as JSON")
+
+    sub = command("render", cmd_render, "draw maps as SVG or PNG images or PNG tiles", "optional")
+    sub.add_argument("--format", choices=("svg", "png", "tiles"), default="svg")
+    sub.add_argument(
+        "--scale", type=float, default=1.0,
+        help="PNG: pixels per map unit; tiles: scale of the most detailed zoom level",
+    )
+
+    # one map shared by live windows, not a batch of inputs
+    sub = commands.add_parser("serve", help="host a live session that app windows can join")
+    sub.add_argument("map", nargs="?", help="map to start from (default: an empty map)")
+    sub.add_argument("--host", default=HOST, help=f"address to listen on (default: {HOST})")
+    sub.add_argument("--port", type=int, default=PORT, help=f"port (default: {PORT})")
+    sub.add_argument("-o", "--output", help="save the map here when the server stops")
+    sub.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        failed = args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 1 if failed else 0
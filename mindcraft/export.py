@@ -0,0 +1,428 @@
+"""Image export of a whole map, drawn from the model without a canvas.
+
+Every function here takes anything with `nodes` and `edges` dicts, so a
+GraphSnapshot can be exported on a worker thread.  Collapsed subtrees
+are exported like any other part of the map, as they are when saving.
+
+SVG is written one element at a time.  PNG is rasterized in bands of
+TILE_SIZE rows and compressed as each band is finished, so the whole
+bitmap is never in memory; the tile pyramid renders one tile at a time.
+The rasterizer is plain Python and draws boxes and connections only:
+labels need a font rasterizer, which the standard library lacks, so
+they appear in SVG output alone (like the canvas when zoomed far out).
+
+Connections follow the same routes as on the canvas, bent around the
+nodes in their way by an EdgeRouter.  Nothing is collapsed in an
+export, so they avoid every node of the map.
+"""
+
+import json
+import os
+import struct
+import zlib
+from math import ceil, log2
+from xml.sax.saxutils import escape
+
+from .graph import node_box
+from .merge import bounds
+from .render import LINE_FILL, LINE_WIDTH, NODE_FILL, NODE_OUTLINE, TEXT_FILL
+from .routing import EdgeRouter, polyline
+from .spatial import SpatialGrid, clip_segment
+from .textmetrics import TEXT_FONT, node_label, text_metrics
+
+EXPORT_MARGIN = 40  # world units of empty border around the map
+PROGRESS_EVERY = 5000  # nodes/edges between progress reports
+TILE_SIZE = 256  # pixels; PNG band height and pyramid tile side
+BACKGROUND = "#ffffff"
+PNG_LEVEL = 6  # zlib compression level
+
+
+def _no_progress(stage, done, total):
+    pass
+
+
+def _rgb(color):
+    return bytes.fromhex(color[1:])
+
+
+def _area(graph):
+    """World rectangle exported: the map's bounds plus the margin."""
+    box = bounds(graph) or (0, 0, 0, 0)
+    return (
+        box[0] - EXPORT_MARGIN,
+        box[1] - EXPORT_MARGIN,
+        box[2] + EXPORT_MARGIN,
+        box[3] + EXPORT_MARGIN,
+    )
+
+
+class _RoutingGraph:
+    """The parts of a Graph an EdgeRouter reads, for anything with
+    `nodes` and `edges` dicts."""
+
+    visibility_changes = 0
+
+    def __init__(self, graph):
+        self.nodes = graph.nodes
+        self.edges = graph.edges
+        self.incident = {}
+        self.node_index = SpatialGrid()
+        self.node_index.insert_many(
+            (node_id, node_box(n)) for node_id, n in graph.nodes.items()
+        )
+
+
+def _routes(graph, progress):
+    """Return (edge key -> route, node index) for every connection.
+
+    Routes are as EdgeRouter returns them: (x1, y1, x2, y2) for a
+    straight line, (x1, y1, cx, cy, x2, y2) for a quadratic curve.
+    """
+    routing = _RoutingGraph(graph)
+    router = EdgeRouter(routing)
+    route = router.route
+    total = len(graph.edges)
+    for i, key in enumerate(graph.edges):
+        if i % PROGRESS_EVERY == 0:
+            progress("routing", i, total)
+        route(key)
+    return router.routes, routing.node_index
+
+
+# ---------------------------------------------------------------------------
+# SVG
+# ---------------------------------------------------------------------------
+
+def write_svg(graph, f, progress=_no_progress):
+    """Stream the map as SVG, one element per line.
+
+    Connections come first so nodes are drawn over them, as on the
+    canvas.  Coordinates are world units; the view box shifts them so
+    the map starts at the margin.
+    """
+    x1, y1, x2, y2 = _area(graph)
+    width = x2 - x1
+    height = y2 - y1
+    family, size = TEXT_FONT
+    line_height = text_metrics().line_height
+
+    f.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.1f}" height="{height:.1f}"'
+        f' viewBox="{x1:.1f} {y1:.1f} {width:.1f} {height:.1f}">\n'
+        f'<rect x="{x1:.1f}" y="{y1:.1f}" width="{width:.1f}" height="{height:.1f}"'
+        f' fill="{BACKGROUND}"/>\n'
+    )
+    routes, _ = _routes(graph, progress)
+    total = len(graph.nodes) + len(graph.edges)
+    done = 0
+
+    f.write(f'<g stroke="{LINE_FILL}" stroke-width="{LINE_WIDTH}" fill="none">\n')
+    for route in routes.values():
+        if done % PROGRESS_EVERY == 0:
+            progress("exporting", done, total)
+        done += 1
+        if len(route) == 4:
+            ax, ay, bx, by = route
+            f.write(f'<line x1="{ax:.1f}" y1="{ay:.1f}" x2="{bx:.1f}" y2="{by:.1f}"/>\n')
+        else:
+            ax, ay, cx, cy, bx, by = route
+            f.write(
+                f'<path d="M{ax:.1f} {ay:.1f}Q{cx:.1f} {cy:.1f} {bx:.1f} {by:.1f}"/>\n'
+            )
+    f.write("</g>\n")
+
+    f.write(
+        f'<g font-family="{escape(family)}" font-size="{size}pt"'
+        ' text-anchor="middle" dominant-baseline="central">\n'
+    )
+    for n in graph.nodes.values():
+        if done % PROGRESS_EVERY == 0:
+            progress("exporting", done, total)
+        done += 1
+        x = n.x
+        y = n.y
+        w = n.w
+        h = n.h
+        f.write(
+            f'<rect x="{x - w / 2:.1f}" y="{y - h / 2:.1f}" width="{w:.1f}" height="{h:.1f}"'
+            f' fill="{NODE_FILL}" stroke="{NODE_OUTLINE}"/>'
+        )
+        lines = node_label(n.text).split("\n")
+        if lines != [""]:
+            top = y - (len(lines) - 1) * line_height / 2
+            f.write(f'<text x="{x:.1f}" y="{top:.1f}" fill="{TEXT_FILL}">')
+            for i, line in enumerate(lines):
+                dy = f' dy="{line_height:.1f}"' if i else ""
+                f.write(f'<tspan x="{x:.1f}"{dy}>{escape(line)}</tspan>')
+            f.write("</text>")
+        f.write("\n")
+    f.write("</g>\n</svg>\n")
+
+
+def save_svg(graph, path, progress=_no_progress):
+    with open(path, "w", encoding="utf-8") as f:
+        write_svg(graph, f, progress)
+
+
+# ---------------------------------------------------------------------------
+# Rasterizing
+# ---------------------------------------------------------------------------
+
+class Raster:
+    """An RGB pixel buffer with the two shapes a map needs."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(_rgb(BACKGROUND) * (width * height))
+
+    def fill_rect(self, x1, y1, x2, y2, color):
+        """Fill pixels x1 <= x < x2, y1 <= y < y2 (clipped), color as bytes."""
+        x1 = max(int(x1), 0)
+        x2 = min(int(x2), self.width)
+        if x1 >= x2:
+            return
+        pixels = self.pixels
+        row = color * (x2 - x1)
+        stride = self.width * 3
+        start = x1 * 3
+        end = x2 * 3
+        for y in range(max(int(y1), 0), min(int(y2), self.height)):
+            offset = y * stride
+            pixels[offset + start:offset + end] = row
+
+    def box(self, x1, y1, x2, y2, fill, outline):
+        x1 = round(x1)
+        y1 = round(y1)
+        x2 = max(round(x2), x1 + 1)
+        y2 = max(round(y2), y1 + 1)
+        self.fill_rect(x1, y1, x2, y2, fill)
+        if x2 - x1 > 2 and y2 - y1 > 2:
+            self.fill_rect(x1, y1, x2, y1 + 1, outline)
+            self.fill_rect(x1, y2 - 1, x2, y2, outline)
+            self.fill_rect(x1, y1, x1 + 1, y2, outline)
+            self.fill_rect(x2 - 1, y1, x2, y2, outline)
+
+    def line(self, x1, y1, x2, y2, width, color):
+        """Draw a segment `width` pixels thick, one horizontal span per row.
+
+        Each row gets the stretch of the segment that passes through it,
+        at least `width` pixels wide, trimmed to the segment's own extent.
+        """
+        half = width / 2
+        clipped = clip_segment(
+            x1, y1, x2, y2, -half, -half, self.width + half, self.height + half
+        )
+        if clipped is None:
+            return
+        x1, y1, x2, y2 = clipped
+        if y1 > y2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        rows = range(max(int(y1 - half), 0), min(ceil(y2 + half), self.height))
+        left = max(round(min(x1, x2) - half), 0)
+        right = min(round(max(x1, x2) + half), self.width)
+        pixels = self.pixels
+        stride = self.width * 3
+        if y2 - y1 < 0.5:
+            span = color * (right - left)
+            for y in rows:
+                offset = y * stride
+                pixels[offset + left * 3:offset + right * 3] = span
+            return
+        slope = (x2 - x1) / (y2 - y1)
+        reach = max(abs(slope) * half, half)  # half the span of one row
+        for y in rows:
+            x = x1 + (y + 0.5 - y1) * slope
+            a = round(x - reach)
+            b = round(x + reach)
+            if a < left:
+                a = left
+            if b > right:
+                b = right
+            if a < b:
+                offset = y * stride
+                pixels[offset + a * 3:offset + b * 3] = color * (b - a)
+
+
+class _Painter:
+    """Draws any window of a map into a Raster.
+
+    Routes every connection and builds its own spatial indexes once, so
+    every band or tile only touches the nodes and connections that reach
+    into it.  A curve is indexed by the box around its end and control
+    points, which holds the whole curve.
+    """
+
+    def __init__(self, graph, progress=_no_progress):
+        self.graph = graph
+        self.routes, self.node_index = _routes(graph, progress)
+        self.edge_index = SpatialGrid()
+        self.edge_index.insert_segments(
+            (key, *route) for key, route in self.routes.items() if len(route) == 4
+        )
+        self.edge_index.insert_many(
+            (key, (min(route[0::2]), min(route[1::2]), max(route[0::2]), max(route[1::2])))
+            for key, route in self.routes.items()
+            if len(route) == 6
+        )
+        self.node_fill = _rgb(NODE_FILL)
+        self.node_outline = _rgb(NODE_OUTLINE)
+        self.line_fill = _rgb(LINE_FILL)
+
+    def paint(self, raster, left, top, scale):
+        """Draw the world window whose top left corner is (left, top).
+
+        Returns False if nothing reaches into it.
+        """
+        right = left + raster.width / scale
+        bottom = top + raster.height / scale
+        margin = LINE_WIDTH / scale
+        graph = self.graph
+        keys = self.edge_index.query_rect(
+            left - margin, top - margin, right + margin, bottom + margin
+        )
+        routes = self.routes
+        for key in keys:
+            points = polyline(routes[key])
+            for i in range(0, len(points) - 2, 2):
+                ax, ay, bx, by = points[i:i + 4]
+                raster.line(
+                    (ax - left) * scale, (ay - top) * scale,
+                    (bx - left) * scale, (by - top) * scale,
+                    LINE_WIDTH, self.line_fill,
+                )
+        node_ids = self.node_index.query_rect(left, top, right, bottom)
+        for node_id in sorted(node_ids):  # later nodes on top, as on the canvas
+            n = graph.nodes[node_id]
+            x = (n.x - left) * scale
+            y = (n.y - top) * scale
+            half_w = n.w * scale / 2
+            half_h = n.h * scale / 2
+            raster.box(
+                x - half_w, y - half_h, x + half_w, y + half_h,
+                self.node_fill, self.node_outline,
+            )
+        return bool(keys or node_ids)
+
+
+# ---------------------------------------------------------------------------
+# PNG
+# ---------------------------------------------------------------------------
+
+def _png_chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+
+class PNGWriter:
+    """Writes an RGB PNG one band of rows at a time."""
+
+    def __init__(self, f, width, height):
+        self.f = f
+        self.width = width
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        self._compress = zlib.compressobj(PNG_LEVEL)
+
+    def write_rows(self, raster):
+        stride = self.width * 3
+        pixels = raster.pixels
+        compress = self._compress.compress
+        data = b"".join(
+            compress(b"\x00" + pixels[y * stride:(y + 1) * stride])
+            for y in range(raster.height)
+        )
+        if data:
+            _png_chunk(self.f, b"IDAT", data)
+
+    def close(self):
+        _png_chunk(self.f, b"IDAT", self._compress.flush())
+        _png_chunk(self.f, b"IEND", b"")
+
+
+def write_png(graph, f, scale=1.0, progress=_no_progress):
+    """Rasterize the map at `scale` pixels per world unit as a PNG."""
+    left, top, right, bottom = _area(graph)
+    width = max(ceil((right - left) * scale), 1)
+    height = max(ceil((bottom - top) * scale), 1)
+    painter = _Painter(graph, progress)
+    writer = PNGWriter(f, width, height)
+    bands = ceil(height / TILE_SIZE)
+    for band in range(bands):
+        progress("exporting", band, bands)
+        raster = Raster(width, min(TILE_SIZE, height - band * TILE_SIZE))
+        painter.paint(raster, left, top + band * TILE_SIZE / scale, scale)
+        writer.write_rows(raster)
+    writer.close()
+
+
+def save_png(graph, path, scale=1.0, progress=_no_progress):
+    with open(path, "wb") as f:
+        write_png(graph, f, scale, progress)
+
+
+def _save_raster(raster, path):
+    with open(path, "wb") as f:
+        writer = PNGWriter(f, raster.width, raster.height)
+        writer.write_rows(raster)
+        writer.close()
+
+
+# ---------------------------------------------------------------------------
+# Tile pyramid
+# ---------------------------------------------------------------------------
+
+def save_tiles(graph, directory, max_scale=1.0, progress=_no_progress):
+    """Write the map as a pyramid of PNG tiles, `directory`/zoom/x/y.png.
+
+    Zoom 0 fits the whole map in one TILE_SIZE tile and each level
+    doubles the scale, up to the one closest to `max_scale` pixels per
+    world unit.  Tiles with nothing on them are not written; viewers
+    show the background for missing tiles.  `tiles.json` describes the
+    pyramid for a viewer: tile size, zoom range and the world rectangle
+    the tiles cover.
+    """
+    left, top, right, bottom = _area(graph)
+    base = TILE_SIZE / max(right - left, bottom - top)
+    max_zoom = max(round(log2(max_scale / base)), 0)
+    painter = _Painter(graph, progress)
+
+    levels = []
+    total = 0
+    for zoom in range(max_zoom + 1):
+        scale = base * 2 ** zoom
+        cols = ceil((right - left) * scale / TILE_SIZE)
+        rows = ceil((bottom - top) * scale / TILE_SIZE)
+        levels.append((zoom, scale, cols, rows))
+        total += cols * rows
+
+    os.makedirs(directory, exist_ok=True)
+    done = 0
+    for zoom, scale, cols, rows in levels:
+        world_tile = TILE_SIZE / scale
+        for col in range(cols):
+            column_dir = os.path.join(directory, str(zoom), str(col))
+            for row in range(rows):
+                if done % 16 == 0:
+                    progress("exporting", done, total)
+                done += 1
+                raster = Raster(TILE_SIZE, TILE_SIZE)
+                if painter.paint(raster, left + col * world_tile, top + row * world_tile, scale):
+                    os.makedirs(column_dir, exist_ok=True)
+                    _save_raster(raster, os.path.join(column_dir, f"{row}.png"))
+
+    with open(os.path.join(directory, "tiles.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "tile_size": TILE_SIZE,
+                "min_zoom": 0,
+                "max_zoom": max_zoom,
+                "bounds": [left, top, right, bottom],
+                "scales": [scale for _, scale, _, _ in levels],
+            },
+            f,
+            indent=2,
+        )
@@ -0,0 +1,455 @@
+"""Graph model for MindCraft maps: nodes, connections and their indexes."""
+
+import gc
+import sys
+from contextlib import contextmanager
+from math import inf, isfinite
+
+from .analytics import Analytics
+from .search import TextIndex
+from .spatial import SpatialGrid, point_segment_distance
+from .tree import TreeIndex
+from .textmetrics import node_size
+
+
+class Node:
+    """One idea on the map: its centre, box size and label.
+
+    Slots instead of a dict per node: a map holds one of these for every
+    node, and each dict costs several times the size of its values.
+    Labels are interned, so nodes with the same text share one string
+    however they were loaded.
+    """
+
+    __slots__ = ("id", "x", "y", "w", "h", "text")
+
+    def __init__(self, node_id, x, y, w, h, text):
+        self.id = node_id
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.text = sys.intern(text)
+
+    def __repr__(self):
+        return f"Node({self.id}, {self.x!r}, {self.y!r}, {self.text!r})"
+
+
+class Connection:
+    """A link between two nodes, remembering the direction it was made in."""
+
+    __slots__ = ("from_id", "to_id")
+
+    def __init__(self, from_id, to_id):
+        self.from_id = from_id
+        self.to_id = to_id
+
+    def __repr__(self):
+        return f"Connection({self.from_id}, {self.to_id})"
+
+
+@contextmanager
+def paused_gc():
+    """Pause cyclic garbage collection while a map is being built.
+
+    Everything allocated then lives as long as the map, so collection
+    passes would only walk it again and again and find nothing to free.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def check_position(node_id, x, y):
+    """Raise ValueError unless (x, y) is a finite position for a node."""
+    if not (isfinite(x) and isfinite(y)):
+        raise ValueError(f"node {node_id} has a non-finite position ({x}, {y})")
+
+
+def node_box(node):
+    """Return the (x1, y1, x2, y2) bounding box of a node."""
+    half_w = node.w / 2
+    half_h = node.h / 2
+    return (
+        node.x - half_w,
+        node.y - half_h,
+        node.x + half_w,
+        node.y + half_h,
+    )
+
+
+def edge_key(a, b):
+    """Return the undirected key identifying a connection between two nodes."""
+    return (a, b) if a <= b else (b, a)
+
+
+class GraphSnapshot:
+    """Frozen membership of a graph for readers on another thread.
+
+    Copies only the two top-level dicts; node and connection records are
+    shared, so taking a snapshot is cheap even for large maps.
+    """
+
+    __slots__ = ("nodes", "edges")
+
+    def __init__(self, nodes, edges):
+        self.nodes = nodes
+        self.edges = edges
+
+
+class Graph:
+    """Nodes and connections with adjacency and spatial indexes.
+
+    Connections are undirected for duplicate checks (A-B and B-A are the
+    same edge) but each one remembers the direction it was created with
+    in its `from_id` / `to_id` fields.  Node boxes and connection segments are
+    kept in grid indexes so hit tests and viewport queries never have to
+    ask the canvas, and labels in a text index for search.
+
+    `tree` holds the parent/child structure the connections form.  Nodes
+    under a collapsed node are taken out of both spatial indexes, along
+    with their connections, so they are never drawn or hit; they stay in
+    `nodes` and `edges` and are saved like any other.
+    """
+
+    def __init__(self):
+        self.nodes = {}  # node_id -> Node
+        self.edges = {}  # edge key -> Connection
+        self.incident = {}  # node_id -> set of edge keys
+        self.node_index = SpatialGrid()  # node bounding boxes
+        self.edge_index = SpatialGrid()  # connection segments
+        self.text_index = TextIndex()  # label words
+        self.tree = TreeIndex()  # parents, subtree sizes, collapsed nodes
+        self.visibility_changes = 0  # bumped whenever nodes are hidden or shown
+        self.analytics = None  # kept up to date once track_analytics() is called
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def max_node_id(self):
+        return max(self.nodes, default=0)
+
+    def track_analytics(self):
+        """Return the graph's Analytics, built now if it is not kept yet."""
+        if self.analytics is None:
+            self.analytics = Analytics(self)
+        return self.analytics
+
+    def snapshot(self):
+        """Return a GraphSnapshot that later edits cannot resize under a reader."""
+        return GraphSnapshot(dict(self.nodes), dict(self.edges))
+
+    # ---------------------------------------------------------------------
+    # Nodes
+    # ---------------------------------------------------------------------
+
+    def add_node(self, node):
+        """Insert a Node and return it."""
+        node_id = node.id
+        check_position(node_id, node.x, node.y)
+        self.nodes[node_id] = node
+        self.incident.setdefault(node_id, set())
+        self.tree.add_node(node_id)
+        if node_id not in self.tree.hidden:
+            self.node_index.insert(node_id, node_box(node))
+        self.text_index.add(node_id, node.text)
+        if self.analytics is not None:
+            self.analytics.node_added(node_id)
+        return node
+
+    def load(self, nodes, connections):
+        """Fill an empty graph with Nodes and (from, to) connection pairs.
+
+        Gives the same graph as add_node for each node followed by
+        add_edge for each pair, including which pairs are dropped as
+        duplicates, but builds every index in one batch.  Both ends of
+        each pair must be among `nodes`.
+        """
+        with paused_gc():
+            self._load(nodes, connections)
+        if self.analytics is not None:
+            self.analytics.rebuild()
+        return self
+
+    def _load(self, nodes, connections):
+        node_map = self.nodes
+        for node in nodes:
+            if not (isfinite(node.x) and isfinite(node.y)):
+                check_position(node.id, node.x, node.y)  # raises
+            node_map[node.id] = node
+        incident = self.incident
+        for node_id in node_map:
+            incident[node_id] = set()
+        edges = self.edges
+        for from_id, to_id in connections:
+            key = (from_id, to_id) if from_id <= to_id else (to_id, from_id)
+            if key in edges:
+                continue
+            edges[key] = Connection(from_id, to_id)
+            incident[from_id].add(key)
+            incident[to_id].add(key)
+
+        # nothing is collapsed yet, so every node and connection is indexed
+        self.tree.load(node_map, ((c.to_id, c.from_id) for c in edges.values()))
+        self.node_index.insert_many(
+            (node_id, node_box(n)) for node_id, n in node_map.items()
+        )
+        segments = []
+        for key, conn in edges.items():
+            n1 = node_map[conn.from_id]
+            n2 = node_map[conn.to_id]
+            segments.append((key, n1.x, n1.y, n2.x, n2.y))
+        self.edge_index.insert_segments(segments)
+        self.text_index.add_many((node_id, n.text) for node_id, n in node_map.items())
+
+    def move_node(self, node_id, dx, dy):
+        node = self.nodes[node_id]
+        return self.set_position(node_id, node.x + dx, node.y + dy)
+
+    def set_position(self, node_id, x, y):
+        check_position(node_id, x, y)
+        node = self.nodes[node_id]
+        node.x = x
+        node.y = y
+        if node_id in self.node_index:
+            self.node_index.update(node_id, node_box(node))
+            for key in self.incident[node_id]:
+                if key in self.edge_index:
+                    self.edge_index.update_segment(key, *self.edge_segment(key))
+        return node
+
+    def move_nodes(self, node_ids, dx, dy):
+        """Move several nodes by the same offset, re-indexing each edge once."""
+        nodes = self.nodes
+        incident = self.incident
+        node_index = self.node_index
+        edge_index = self.edge_index
+        touched = set()
+        for node_id in node_ids:
+            node = nodes[node_id]
+            node.x += dx
+            node.y += dy
+            if node_id in node_index:
+                node_index.update(node_id, node_box(node))
+                touched.update(incident[node_id])
+        for key in touched:
+            if key in edge_index:
+                edge_index.update_segment(key, *self.edge_segment(key))
+
+    def remove_node(self, node_id):
+        """Remove a node and its connections.
+
+        Returns (node, removed_connections), or (None, []) if unknown.
+        """
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return None, []
+        self.node_index.remove(node_id)
+        self.text_index.remove(node_id)
+        removed = []
+        neighbours = []
+        for key in self.incident.pop(node_id, ()):
+            conn = self.edges.pop(key)
+            self.edge_index.remove(key)
+            other = conn.to_id if conn.from_id == node_id else conn.from_id
+            other_keys = self.incident.get(other)
+            if other_keys is not None:
+                other_keys.discard(key)
+            removed.append(conn)
+            neighbours.append(other)
+
+        tree = self.tree
+        for child in list(tree.children_of(node_id)):
+            self._apply_visibility(tree.detach(child))
+            self._reattach(child)
+        tree.detach(node_id)  # only this node can change, and it is gone
+        tree.remove_node(node_id)
+        if self.analytics is not None:
+            self.analytics.node_removed(node_id, neighbours)
+        return node, removed
+
+    # ---------------------------------------------------------------------
+    # Connections
+    # ---------------------------------------------------------------------
+
+    def has_edge(self, a, b):
+        return edge_key(a, b) in self.edges
+
+    def get_edge(self, a, b):
+        return self.edges.get(edge_key(a, b))
+
+    def add_edge(self, from_id, to_id):
+        """Connect two existing nodes.
+
+        Returns the new Connection, or None if the nodes are already
+        connected in either direction.
+        """
+        key = edge_key(from_id, to_id)
+        if key in self.edges:
+            return None
+        conn = Connection(from_id, to_id)
+        self.edges[key] = conn
+        self.incident[from_id].add(key)
+        self.incident[to_id].add(key)
+        tree = self.tree
+        changes = tree.attach(to_id, from_id)
+        if changes is not None and (changes[0] or changes[1]):
+            self._apply_visibility(changes)
+        if self.analytics is not None:
+            self.analytics.edge_added(from_id, to_id)
+        if tree.hidden and (from_id in tree.hidden or to_id in tree.hidden):
+            return conn
+        self.edge_index.insert_segment(key, *self.edge_segment(key))
+        return conn
+
+    def remove_edge(self, a, b):
+        """Remove the connection between two nodes and return it (or None)."""
+        key = edge_key(a, b)
+        conn = self.edges.pop(key, None)
+        if conn is None:
+            return None
+        self.edge_index.remove(key)
+        self.incident[conn.from_id].discard(key)
+        self.incident[conn.to_id].discard(key)
+        child = conn.to_id
+        if self.tree.parent.get(child) == conn.from_id:
+            self._apply_visibility(self.tree.detach(child))
+            self._reattach(child)
+        if self.analytics is not None:
+            self.analytics.edge_removed(conn.from_id, conn.to_id)
+        return conn
+
+    def edges_of(self, node_id):
+        """Return the connections touching a node; O(degree)."""
+        edges = self.edges
+        return [edges[key] for key in self.incident.get(node_id, ())]
+
+    def degree(self, node_id):
+        return len(self.incident.get(node_id, ()))
+
+    def clear(self):
+        self.nodes.clear()
+        self.edges.clear()
+        self.incident.clear()
+        self.node_index.clear()
+        self.edge_index.clear()
+        self.text_index.clear()
+        self.tree.clear()
+        if self.analytics is not None:
+            self.analytics.rebuild()
+
+    # ---------------------------------------------------------------------
+    # Collapsing
+    # ---------------------------------------------------------------------
+
+    def collapse(self, node_id):
+        """Hide everything below a node; returns the ids that were hidden."""
+        hidden = self.tree.collapse(node_id)
+        self._apply_visibility((hidden, []))
+        return hidden
+
+    def expand(self, node_id):
+        """Undo collapse(); returns the ids shown again."""
+        shown = self.tree.expand(node_id)
+        self._apply_visibility(([], shown))
+        return shown
+
+    def reveal(self, node_id):
+        """Expand whatever hides a node; returns the ids shown again."""
+        shown = []
+        for ancestor in self.tree.collapsed_ancestors(node_id):
+            shown += self.expand(ancestor)
+        return shown
+
+    def _reattach(self, child):
+        """Give a node that lost its parent another one, if a connection offers it."""
+        edges = self.edges
+        for key in self.incident[child]:
+            conn = edges[key]
+            if conn.to_id == child:
+                changes = self.tree.attach(child, conn.from_id)
+                if changes is not None:
+                    self._apply_visibility(changes)
+                    return
+
+    def _apply_visibility(self, changes):
+        """Take newly hidden nodes out of the spatial indexes and put shown ones back."""
+        hidden, shown = changes
+        if hidden or shown:
+            self.visibility_changes += 1
+        nodes = self.nodes
+        incident = self.incident
+        node_index = self.node_index
+        edge_index = self.edge_index
+        for node_id in hidden:
+            node_index.remove(node_id)
+            for key in incident[node_id]:
+                edge_index.remove(key)
+        for node_id in shown:
+            node_index.insert(node_id, node_box(nodes[node_id]))
+        tree_hidden = self.tree.hidden
+        for node_id in shown:
+            for key in incident[node_id]:
+                if key not in edge_index and key[0] not in tree_hidden and key[1] not in tree_hidden:
+                    edge_index.insert_segment(key, *self.edge_segment(key))
+
+    # ---------------------------------------------------------------------
+    # Spatial queries
+    # ---------------------------------------------------------------------
+
+    def edge_segment(self, key):
+        """Return the (x1, y1, x2, y2) segment drawn for a connection."""
+        conn = self.edges[key]
+        n1 = self.nodes[conn.from_id]
+        n2 = self.nodes[conn.to_id]
+        return n1.x, n1.y, n2.x, n2.y
+
+    def node_at(self, x, y):
+        """Return the ID of the node under a point, or None.
+
+        If boxes overlap, the node whose centre is closest wins.
+        """
+        nodes = self.nodes
+        best_id = None
+        best_dist = inf
+        for node_id in self.node_index.query_point(x, y):
+            node = nodes[node_id]
+            d = (node.x - x) ** 2 + (node.y - y) ** 2
+            if d < best_dist:
+                best_dist = d
+                best_id = node_id
+        return best_id
+
+    def edge_at(self, x, y, tolerance=4.0):
+        """Return the key of the connection nearest to a point, or None.
+
+        Only connections within `tolerance` of the point are considered.
+        """
+        best_key = None
+        best_dist = tolerance
+        candidates = self.edge_index.query_rect(
+            x - tolerance, y - tolerance, x + tolerance, y + tolerance
+        )
+        for key in candidates:
+            d = point_segment_distance(x, y, *self.edge_segment(key))
+            if d <= best_dist:
+                best_dist = d
+                best_key = key
+        return best_key
+
+    def nodes_in_rect(self, x1, y1, x2, y2):
+        """Return the IDs of nodes whose boxes intersect the rectangle."""
+        return self.node_index.query_rect(x1, y1, x2, y2)
+
+    def edges_in_rect(self, x1, y1, x2, y2):
+        """Return keys of connections that may cross the rectangle.
+
+        The answer is conservative: a diagonal segment is included when it
+        passes through a grid cell and its bounding box meets the
+        rectangle, which is what culling needs.
+        """
+        return self.edge_index.query_rect(x1, y1, x2, y2)
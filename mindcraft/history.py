@@ -0,0 +1,111 @@
+"""Undo/redo history built from edit operations.
+
+Each entry stores the operations that perform an edit and the ones that
+reverse it (see ops), never a copy of the map.  Deleting a node keeps
+just that node and its connections; clearing the map keeps a reference
+to the old Graph object, which nothing else holds any more, so even
+undoing a clear of a huge map does not duplicate the model.
+
+The history has an approximate memory budget.  When it is exceeded the
+oldest entries are dropped first.
+"""
+
+from collections import deque
+
+RECORD_BYTES = 200  # rough cost of one operation record
+ELEMENT_BYTES = 200  # rough cost of a node or connection kept by reference
+DEFAULT_LIMIT = 32 << 20
+
+
+def op_size(op):
+    """Estimate the memory an operation record keeps alive."""
+    kind = op["op"]
+    if kind == "move_many":
+        return RECORD_BYTES + 60 * len(op["moves"])
+    if kind == "restore":
+        graph = op["graph"]
+        return RECORD_BYTES + ELEMENT_BYTES * (len(graph.nodes) + len(graph.edges))
+    return RECORD_BYTES
+
+
+class Command:
+    """One undoable edit: `do` and `undo` are lists of operation records.
+
+    Commands with the same non-None `merge_key` that are recorded one
+    after another collapse into a single entry, e.g. the frames of one
+    drag.
+    """
+
+    __slots__ = ("label", "do", "undo", "merge_key", "size")
+
+    def __init__(self, label, do, undo, merge_key=None):
+        self.label = label
+        self.do = do
+        self.undo = undo
+        self.merge_key = merge_key
+        self.size = sum(map(op_size, do)) + sum(map(op_size, undo))
+
+
+class History:
+    """Linear undo/redo stacks with oldest-first eviction."""
+
+    def __init__(self, limit=DEFAULT_LIMIT):
+        self.limit = limit  # approximate bytes
+        self.size = 0
+        self._undo = deque()
+        self._redo = []
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, command):
+        """Add a command that has just been applied."""
+        self._drop_redo()
+        undo = self._undo
+        if undo and command.merge_key is not None and undo[-1].merge_key == command.merge_key:
+            # keep the first undo and the latest do
+            top = undo[-1]
+            self.size -= top.size
+            command.undo = top.undo
+            command.size = sum(map(op_size, command.do)) + sum(map(op_size, command.undo))
+            undo[-1] = command
+        else:
+            undo.append(command)
+        self.size += command.size
+        while self.size > self.limit and len(undo) > 1:
+            self.size -= undo.popleft().size
+
+    def undo(self):
+        """Pop the last command; the caller applies its `undo` operations."""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        command.merge_key = None  # a redone drag must not absorb the next one
+        self._redo.append(command)
+        return command
+
+    def redo(self):
+        """Pop the last undone command; the caller applies its `do` operations."""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._undo.append(command)
+        return command
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.size = 0
+
+    def _drop_redo(self):
+        for command in self._redo:
+            self.size -= command.size
+        self._redo.clear()
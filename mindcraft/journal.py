@@ -0,0 +1,176 @@
+"""Crash-safe autosave: an append-only journal of edits plus snapshots.
+
+For a map saved at `base` the autosave files live next to it:
+
+    base.autosave.mcmap          last compacted snapshot (binary format)
+    base.autosave.journal        edits since that snapshot, one JSON per line
+    base.autosave.journal.prev   edits being folded into a new snapshot
+
+Appending an edit costs a few bytes; the file is flushed and fsynced in
+batches by `flush()`, which the UI calls from a timer.  Once enough
+records pile up, `compact()` rotates the journal and writes a fresh
+snapshot on a worker thread.  Recovery loads the snapshot (or the saved
+map itself when there is none) and replays both journals; because every
+operation is idempotent, replaying edits the snapshot already contains
+is harmless.
+"""
+
+import json
+import os
+import threading
+
+from . import mapfile
+from .binmap import load_binary
+from .graph import Graph
+from .ops import apply_op
+
+COMPACT_EVERY = 5000  # journal records before a new snapshot is written
+
+
+class Journal:
+    """Append-only edit log for one map."""
+
+    def __init__(self, base):
+        self.base = base
+        self.snapshot_path = base + ".autosave.mcmap"
+        self.journal_path = base + ".autosave.journal"
+        self.prev_path = self.journal_path + ".prev"
+        self.records = 0  # records written since the last snapshot
+        self._buffer = []  # records not yet written
+        self._moves = {}  # node_id -> index in _buffer of its pending move
+        self._file = None
+        self._compacting = None  # worker thread writing a snapshot
+
+    # ---------------------------------------------------------------------
+    # Writing
+    # ---------------------------------------------------------------------
+
+    def append(self, op):
+        """Queue a record; a run of moves keeps only the last per node."""
+        if op["op"] == "move":
+            index = self._moves.get(op["id"])
+            if index is not None:
+                self._buffer[index] = op
+                return
+            self._moves[op["id"]] = len(self._buffer)
+        else:
+            # moves on either side of another edit must stay in order
+            self._moves.clear()
+        self._buffer.append(op)
+
+    def flush(self):
+        """Write queued records and fsync them; return how many were written."""
+        if not self._buffer:
+            return 0
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+        lines = [json.dumps(op, separators=(",", ":")) + "\n" for op in self._buffer]
+        self._file.write("".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records += len(lines)
+        self._buffer.clear()
+        self._moves.clear()
+        return len(lines)
+
+    @property
+    def needs_compaction(self):
+        return self.records >= COMPACT_EVERY and self._compacting is None
+
+    def compact(self, snapshot):
+        """Fold the journal into a new snapshot of `snapshot` (a GraphSnapshot).
+
+        Must be called on the thread that appends.  The current journal is
+        rotated to .prev right away and new edits go to a fresh file; the
+        snapshot is written on a worker thread, after which .prev is
+        deleted.
+        """
+        if self._compacting is not None:
+            return
+        self.flush()
+        self._close_file()
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.prev_path):
+                # an earlier compaction did not finish; keep its edits too
+                with open(self.prev_path, "a", encoding="utf-8") as prev, open(
+                    self.journal_path, "r", encoding="utf-8"
+                ) as current:
+                    prev.write(current.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.prev_path)
+        self.records = 0
+        self._compacting = threading.Thread(
+            target=self._write_snapshot, args=(snapshot,), daemon=True
+        )
+        self._compacting.start()
+
+    def _write_snapshot(self, snapshot):
+        try:
+            mapfile.save_map(snapshot, self.snapshot_path)
+            os.remove(self.prev_path)
+        except OSError:
+            pass  # keep .prev; recovery replays it over the old snapshot
+        finally:
+            self._compacting = None
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self.flush()
+        self._close_file()
+        if self._compacting is not None:
+            self._compacting.join()
+
+    def discard(self):
+        """Drop all autosave data, e.g. after the map was saved explicitly."""
+        self._buffer.clear()
+        self._moves.clear()
+        self._close_file()
+        if self._compacting is not None:
+            self._compacting.join()
+        for path in (self.snapshot_path, self.journal_path, self.prev_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.records = 0
+
+    # ---------------------------------------------------------------------
+    # Recovery
+    # ---------------------------------------------------------------------
+
+    def has_recovery(self):
+        """True if unsaved edits from an earlier session are on disk."""
+        if os.path.exists(self.snapshot_path) or os.path.exists(self.prev_path):
+            return True
+        return os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0
+
+    def recover(self, progress=mapfile.no_progress):
+        """Rebuild the map from the snapshot and the journals."""
+        if os.path.exists(self.snapshot_path):
+            graph = load_binary(self.snapshot_path, progress)
+        elif os.path.exists(self.base):
+            graph = mapfile.load_map(self.base, progress=progress)
+        else:
+            graph = Graph()
+        for path in (self.prev_path, self.journal_path):
+            if os.path.exists(path):
+                replay(graph, path, progress)
+        return graph
+
+
+def replay(graph, path, progress=mapfile.no_progress):
+    """Apply every complete record of a journal file to `graph`."""
+    total = os.path.getsize(path)
+    done = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if i % mapfile.PROGRESS_EVERY == 0:
+                progress("replaying", done, total)
+            done += len(line.encode("utf-8"))
+            if not line.endswith("\n"):
+                break  # torn final write from a crash
+            apply_op(graph, json.loads(line))
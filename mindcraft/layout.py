@@ -0,0 +1,397 @@
+"""Automatic layouts: tree, radial and force-directed.
+
+Every layout takes a graph (or a GraphSnapshot) and returns a dict
+node_id -> (x, y).  They only read the graph, so they can run on a
+worker thread while the UI keeps the real one; the caller applies the
+positions afterwards.
+
+The force-directed solver approximates node-node repulsion with a grid:
+each node is pushed away from the centre of mass of every other grid
+cell and only by the nodes of its own cell one by one, which is about
+O(nodes * cells) per step rather than O(nodes^2).  It uses NumPy when
+it is installed and falls back to a slower pure-Python loop (with a
+coarser grid) otherwise.
+"""
+
+import random
+from math import cos, pi, sin, sqrt
+
+try:
+    import numpy
+except ImportError:  # optional
+    numpy = None
+
+LEVEL_SPACING = 120.0  # tree: vertical distance between depths
+SIBLING_SPACING = 240.0  # tree: horizontal distance between leaves
+RING_SPACING = 220.0  # radial: distance between rings
+FORCE_DISTANCE = 200.0  # force: ideal connection length
+FORCE_ITERATIONS = 60
+REPULSION = 1.0  # force: repulsion relative to the classic k^2 / d
+NODES_PER_CELL = 8  # force: target grid occupancy
+MAX_GRID_SIDE = 48  # NumPy solver
+MAX_GRID_SIDE_PYTHON = 12  # pure-Python solver
+CHUNK = 1024  # NumPy solver: nodes per vectorized block
+PAIR_LIMIT = 4_000_000  # NumPy solver: most same-cell pairs handled exactly
+LAYOUTS = ("tree", "radial", "force")
+
+
+def _no_progress(stage, done, total):
+    pass
+
+
+def compute_layout(graph, kind, progress=_no_progress):
+    """Run the layout named `kind`, centred where the map already is."""
+    if kind == "tree":
+        positions = tree_layout(graph, progress)
+    elif kind == "radial":
+        positions = radial_layout(graph, progress)
+    elif kind == "force":
+        positions = force_layout(graph, progress=progress)
+    else:
+        raise ValueError(f"unknown layout {kind!r}")
+    if not positions:
+        return positions
+
+    # keep the map's centre so the result appears where the user is looking
+    nodes = graph.nodes
+    count = len(positions)
+    old_x = sum(nodes[i].x for i in positions) / count
+    old_y = sum(nodes[i].y for i in positions) / count
+    new_x = sum(p[0] for p in positions.values()) / count
+    new_y = sum(p[1] for p in positions.values()) / count
+    dx = old_x - new_x
+    dy = old_y - new_y
+    return {i: (x + dx, y + dy) for i, (x, y) in positions.items()}
+
+
+# -------------------------------------------------------------------------
+# Hierarchies
+# -------------------------------------------------------------------------
+
+
+def spanning_forest(graph):
+    """Pick a tree out of the map for hierarchical layouts.
+
+    Roots are the nodes no connection points to (in id order), then the
+    smallest id of any component without one.  Each node's parent is
+    whichever node reached it first in a breadth-first walk over the
+    connections; connections that would close a cycle are ignored.
+
+    Returns (roots, children, order) where `order` lists every node with
+    parents before children.
+    """
+    neighbours = {node_id: [] for node_id in graph.nodes}
+    has_parent = set()
+    for conn in graph.edges.values():
+        a, b = conn.from_id, conn.to_id
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+        has_parent.add(b)
+    for adjacent in neighbours.values():
+        adjacent.sort()
+
+    candidates = [i for i in sorted(neighbours) if i not in has_parent]
+    candidates += sorted(has_parent)
+    children = {node_id: [] for node_id in neighbours}
+    roots = []
+    order = []
+    seen = set()
+    for root in candidates:
+        if root in seen:
+            continue
+        roots.append(root)
+        seen.add(root)
+        start = len(order)
+        order.append(root)
+        while start < len(order):
+            node_id = order[start]
+            start += 1
+            for other in neighbours[node_id]:
+                if other not in seen:
+                    seen.add(other)
+                    children[node_id].append(other)
+                    order.append(other)
+    return roots, children, order
+
+
+def _leaf_counts(children, order):
+    leaves = {}
+    for node_id in reversed(order):
+        kids = children[node_id]
+        leaves[node_id] = sum(leaves[k] for k in kids) if kids else 1
+    return leaves
+
+
+def tree_layout(graph, progress=_no_progress):
+    """Top-down tree: depth sets y, each subtree gets a band of x."""
+    progress("laying out", 0, 2)
+    roots, children, order = spanning_forest(graph)
+    leaves = _leaf_counts(children, order)
+    progress("laying out", 1, 2)
+
+    positions = {}
+    start = {}  # node_id -> first leaf slot of its band
+    depth = {}
+    slot = 0
+    for root in roots:
+        start[root] = slot
+        depth[root] = 0
+        slot += leaves[root]
+    for node_id in order:
+        first = start[node_id]
+        positions[node_id] = (
+            (first + leaves[node_id] / 2) * SIBLING_SPACING,
+            depth[node_id] * LEVEL_SPACING,
+        )
+        for child in children[node_id]:
+            start[child] = first
+            depth[child] = depth[node_id] + 1
+            first += leaves[child]
+    return positions
+
+
+def radial_layout(graph, progress=_no_progress):
+    """Rings around the root; each subtree gets an angle share by leaf count."""
+    progress("laying out", 0, 2)
+    roots, children, order = spanning_forest(graph)
+    leaves = _leaf_counts(children, order)
+    progress("laying out", 1, 2)
+    total = sum(leaves[r] for r in roots)
+
+    # one root sits in the middle; several share the first ring
+    positions = {}
+    span = {}  # node_id -> (start angle, angle width)
+    ring = {}
+    angle = 0.0
+    for root in roots:
+        width = 2 * pi * leaves[root] / total
+        span[root] = (angle, width)
+        ring[root] = 0 if len(roots) == 1 else 1
+        angle += width
+    for node_id in order:
+        first, width = span[node_id]
+        radius = ring[node_id] * RING_SPACING
+        middle = first + width / 2
+        positions[node_id] = (radius * cos(middle), radius * sin(middle))
+        kids = children[node_id]
+        if not kids:
+            continue
+        unit = width / leaves[node_id]
+        for child in kids:
+            share = unit * leaves[child]
+            span[child] = (first, share)
+            ring[child] = ring[node_id] + 1
+            first += share
+    return positions
+
+
+# -------------------------------------------------------------------------
+# Force-directed
+# -------------------------------------------------------------------------
+
+
+def force_layout(graph, iterations=FORCE_ITERATIONS, progress=_no_progress):
+    """Fruchterman-Reingold layout with grid-approximated repulsion."""
+    ids = list(graph.nodes)
+    if not ids:
+        return {}
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    rng = random.Random(0)
+    # a little jitter separates nodes that were placed on the same spot
+    xs = [graph.nodes[i].x + rng.uniform(-1, 1) for i in ids]
+    ys = [graph.nodes[i].y + rng.uniform(-1, 1) for i in ids]
+    src = [index[c.from_id] for c in graph.edges.values()]
+    dst = [index[c.to_id] for c in graph.edges.values()]
+    if numpy is not None:
+        xs, ys = _force_numpy(xs, ys, src, dst, iterations, progress)
+    else:
+        xs, ys = _force_python(xs, ys, src, dst, iterations, progress)
+    return {node_id: (xs[i], ys[i]) for i, node_id in enumerate(ids)}
+
+
+def _grid_side(count, limit):
+    return max(1, min(limit, int(sqrt(count / NODES_PER_CELL))))
+
+
+def _force_numpy(xs, ys, src, dst, iterations, progress):
+    np = numpy
+    x = np.array(xs, dtype=float)
+    y = np.array(ys, dtype=float)
+    src = np.array(src, dtype=np.intp)
+    dst = np.array(dst, dtype=np.intp)
+    count = len(x)
+    k = FORCE_DISTANCE
+    strength = REPULSION * k * k
+    side = _grid_side(count, MAX_GRID_SIDE)
+    temperature = max(k, k * sqrt(count) / 10)  # about a tenth of the map's width
+    cooling = temperature / iterations
+
+    for step in range(iterations):
+        progress("laying out", step, iterations)
+
+        # bin the nodes and reduce every occupied cell to its mass centre
+        low_x = x.min()
+        low_y = y.min()
+        size = max(x.max() - low_x, y.max() - low_y, 1.0) / side
+        cx = np.minimum(((x - low_x) // size).astype(np.intp), side - 1)
+        cy = np.minimum(((y - low_y) // size).astype(np.intp), side - 1)
+        cell = cx * side + cy
+        mass = np.bincount(cell, minlength=side * side)
+        occupied = np.nonzero(mass)[0]
+        slot = np.zeros(side * side, dtype=np.intp)
+        slot[occupied] = np.arange(len(occupied))
+        own = slot[cell]
+        cell_mass = mass[occupied].astype(float)
+        centre_x = np.bincount(cell, weights=x, minlength=side * side)[occupied] / cell_mass
+        centre_y = np.bincount(cell, weights=y, minlength=side * side)[occupied] / cell_mass
+
+        # repulsion from every cell, in blocks to bound memory
+        disp_x = np.empty(count)
+        disp_y = np.empty(count)
+        for begin in range(0, count, CHUNK):
+            bx = x[begin:begin + CHUNK, None]
+            by = y[begin:begin + CHUNK, None]
+            dx = bx - centre_x
+            dy = by - centre_y
+            factor = cell_mass / np.maximum(dx * dx + dy * dy, 1.0)
+            disp_x[begin:begin + CHUNK] = (dx * factor).sum(axis=1)
+            disp_y[begin:begin + CHUNK] = (dy * factor).sum(axis=1)
+
+        # inside its own cell a node is pushed by each neighbour exactly:
+        # drop the cell's mass-centre term and add the pairwise ones
+        own_mass = cell_mass[own]
+        dx = x - centre_x[own]
+        dy = y - centre_y[own]
+        factor = own_mass / np.maximum(dx * dx + dy * dy, 1.0)
+        disp_x -= dx * factor
+        disp_y -= dy * factor
+        if int((mass * mass).sum()) <= PAIR_LIMIT:
+            first, second = _cell_pairs(cell, mass)
+            dx = x[first] - x[second]
+            dy = y[first] - y[second]
+            factor = 1.0 / np.maximum(dx * dx + dy * dy, 1.0)
+            disp_x += np.bincount(first, weights=dx * factor, minlength=count)
+            disp_y += np.bincount(first, weights=dy * factor, minlength=count)
+        else:
+            # a few crowded cells: push from the centre of the other nodes
+            others = own_mass - 1
+            lonely = others == 0
+            others[lonely] = 1
+            dx = x - (centre_x[own] * own_mass - x) / others
+            dy = y - (centre_y[own] * own_mass - y) / others
+            factor = np.where(lonely, 0.0, others / np.maximum(dx * dx + dy * dy, 1.0))
+            disp_x += dx * factor
+            disp_y += dy * factor
+        disp_x *= strength
+        disp_y *= strength
+
+        # attraction along connections
+        if len(src):
+            dx = x[dst] - x[src]
+            dy = y[dst] - y[src]
+            factor = np.sqrt(dx * dx + dy * dy) / k
+            disp_x += np.bincount(src, weights=dx * factor, minlength=count)
+            disp_y += np.bincount(src, weights=dy * factor, minlength=count)
+            disp_x -= np.bincount(dst, weights=dx * factor, minlength=count)
+            disp_y -= np.bincount(dst, weights=dy * factor, minlength=count)
+
+        length = np.maximum(np.sqrt(disp_x * disp_x + disp_y * disp_y), 1e-9)
+        scale = np.minimum(length, temperature) / length
+        x += disp_x * scale
+        y += disp_y * scale
+        temperature -= cooling
+    progress("laying out", iterations, iterations)
+    return x.tolist(), y.tolist()
+
+
+def _cell_pairs(cell, mass):
+    """Index arrays (i, j) of every ordered pair of distinct nodes sharing a cell."""
+    np = numpy
+    order = np.argsort(cell, kind="stable")
+    sizes = mass[cell[order]]
+    starts = np.cumsum(mass) - mass  # first sorted position of each cell
+    group_start = starts[cell[order]]
+    total = int(sizes.sum())
+    first = np.repeat(order, sizes)
+    offsets = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    second = order[np.repeat(group_start, sizes) + offsets]
+    distinct = first != second
+    return first[distinct], second[distinct]
+
+
+def _force_python(xs, ys, src, dst, iterations, progress):
+    count = len(xs)
+    k = FORCE_DISTANCE
+    strength = REPULSION * k * k
+    side = _grid_side(count, MAX_GRID_SIDE_PYTHON)
+    temperature = max(k, k * sqrt(count) / 10)  # about a tenth of the map's width
+    cooling = temperature / iterations
+
+    for step in range(iterations):
+        progress("laying out", step, iterations)
+        low_x = min(xs)
+        low_y = min(ys)
+        size = max(max(xs) - low_x, max(ys) - low_y, 1.0) / side
+        members = {}  # cell -> node indexes
+        node_cell = []
+        for i in range(count):
+            cell = (
+                min(int((xs[i] - low_x) // size), side - 1),
+                min(int((ys[i] - low_y) // size), side - 1),
+            )
+            node_cell.append(cell)
+            members.setdefault(cell, []).append(i)
+        centres = [
+            (
+                cell,
+                len(group),
+                sum(xs[i] for i in group) / len(group),
+                sum(ys[i] for i in group) / len(group),
+            )
+            for cell, group in members.items()
+        ]
+
+        disp_x = [0.0] * count
+        disp_y = [0.0] * count
+        for i in range(count):
+            x = xs[i]
+            y = ys[i]
+            own = node_cell[i]
+            fx = fy = 0.0
+            for cell, mass, cx, cy in centres:
+                if cell == own:
+                    # neighbours in the same cell push one by one
+                    for j in members[cell]:
+                        if j != i:
+                            dx = x - xs[j]
+                            dy = y - ys[j]
+                            factor = 1.0 / max(dx * dx + dy * dy, 1.0)
+                            fx += dx * factor
+                            fy += dy * factor
+                    continue
+                dx = x - cx
+                dy = y - cy
+                factor = mass / max(dx * dx + dy * dy, 1.0)
+                fx += dx * factor
+                fy += dy * factor
+            disp_x[i] = fx * strength
+            disp_y[i] = fy * strength
+
+        for a, b in zip(src, dst):
+            dx = xs[b] - xs[a]
+            dy = ys[b] - ys[a]
+            factor = sqrt(dx * dx + dy * dy) / k
+            disp_x[a] += dx * factor
+            disp_y[a] += dy * factor
+            disp_x[b] -= dx * factor
+            disp_y[b] -= dy * factor
+
+        for i in range(count):
+            length = sqrt(disp_x[i] ** 2 + disp_y[i] ** 2)
+            if length > 1e-9:
+                scale = min(length, temperature) / length
+                xs[i] += disp_x[i] * scale
+                ys[i] += disp_y[i] * scale
+        temperature -= cooling
+    progress("laying out", iterations, iterations)
+    return xs, ys
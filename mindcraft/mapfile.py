@@ -0,0 +1,245 @@
+"""Reading and writing MindCraft maps.
+
+JSON is the default, human-readable format; files ending in .mcmap use
+the packed binary format from binmap.
+"""
+
+import json
+import os
+from json.encoder import encode_basestring_ascii
+
+from .binmap import is_binary_map, load_binary, load_binary_records, save_binary
+from .graph import Graph, Node, node_size, paused_gc
+
+BINARY_EXTENSION = ".mcmap"
+PROGRESS_EVERY = 5000  # items between progress reports
+READ_CHUNK = 1 << 20
+
+
+def no_progress(stage, done, total):
+    """Default progress callback."""
+
+
+def graph_to_data(graph):
+    """Return the JSON-serialisable form of a graph."""
+    return {
+        "nodes": [
+            {
+                "id": node_id,
+                "x": n.x,
+                "y": n.y,
+                "text": n.text,
+            }
+            for node_id, n in graph.nodes.items()
+        ],
+        "connections": [
+            {"from": c.from_id, "to": c.to_id} for c in graph.edges.values()
+        ],
+    }
+
+
+def parse_records(data, default_pos=(0, 0), progress=no_progress):
+    """Return the nodes and connections of loaded JSON data as plain lists.
+
+    Nodes are (id, x, y, text) tuples and connections (from, to) pairs;
+    labels are not measured, so this can run where no font is at hand,
+    such as a worker process.  Saved node IDs are kept as they are.
+    Nodes whose ID is missing, not an integer or already taken get a
+    fresh ID after the largest one in the file; connections are resolved
+    through the resulting ID map, so duplicate labels can never be
+    confused with each other.  Nodes without coordinates are placed at
+    `default_pos`.
+    Connections to unknown nodes and from a node to itself are dropped;
+    repeated ones are left for Graph.add_edge to drop.
+    """
+    saved_nodes = data.get("nodes", [])
+    saved_connections = data.get("connections", [])
+    next_id = 1 + max(
+        (n["id"] for n in saved_nodes if type(n.get("id")) is int),
+        default=0,
+    )
+
+    nodes = []
+    taken = set()
+    id_map = {}
+    for i, n in enumerate(saved_nodes):
+        if i % PROGRESS_EVERY == 0:
+            progress("parsing", i, len(saved_nodes))
+        saved_id = n.get("id")
+        node_id = saved_id
+        if type(node_id) is not int or node_id in taken:
+            node_id = next_id
+            next_id += 1
+        taken.add(node_id)
+        if saved_id is not None:
+            id_map.setdefault(saved_id, node_id)
+
+        nodes.append((
+            node_id,
+            n.get("x", default_pos[0]),
+            n.get("y", default_pos[1]),
+            str(n.get("text", "")),
+        ))
+
+    connections = []
+    for c in saved_connections:
+        from_id = id_map.get(c.get("from"))
+        to_id = id_map.get(c.get("to"))
+        if from_id is not None and to_id is not None and from_id != to_id:
+            connections.append((from_id, to_id))
+    return nodes, connections
+
+
+def sized_records(nodes):
+    """(id, x, y, text) node records as (id, x, y, w, h, text), with the
+    box size of each label; repeated labels are measured once."""
+    sizes = {}
+    sized = []
+    for node_id, x, y, text in nodes:
+        size = sizes.get(text)
+        if size is None:
+            size = sizes[text] = node_size(text)
+        sized.append((node_id, x, y, *size, text))
+    return sized
+
+
+def records_from_data(data, default_pos=(0, 0), progress=no_progress):
+    """Like parse_records, with nodes as (id, x, y, w, h, text) records
+    sized for their labels."""
+    nodes, connections = parse_records(data, default_pos, progress)
+    return sized_records(nodes), connections
+
+
+def graph_records(graph):
+    """The nodes and connections of a Graph (or GraphSnapshot) as
+    parse_records returns them."""
+    return (
+        [(n.id, n.x, n.y, n.text) for n in graph.nodes.values()],
+        [(c.from_id, c.to_id) for c in graph.edges.values()],
+    )
+
+
+def graph_from_records(nodes, connections, progress=no_progress):
+    """Build a Graph from sized node and connection records in one batch."""
+    total = len(nodes) + len(connections)
+    with paused_gc():
+        records = []
+        for start in range(0, len(nodes), PROGRESS_EVERY):
+            progress("building", start, total)
+            records.extend(Node(*record) for record in nodes[start:start + PROGRESS_EVERY])
+        progress("building", len(nodes), total)
+        return Graph().load(records, connections)
+
+
+def graph_from_data(data, default_pos=(0, 0), progress=no_progress):
+    """Build a Graph from loaded JSON data; see records_from_data."""
+    return graph_from_records(*records_from_data(data, default_pos, progress), progress)
+
+
+def _number(value):
+    text = repr(value)
+    # json spells nan/inf differently from repr
+    return text if text[-1].isdigit() else json.dumps(value)
+
+
+def write_json(graph, f, progress=no_progress):
+    """Stream a graph as JSON, in the same layout as json.dump(indent=2).
+
+    Writing one record at a time keeps memory flat and lets the progress
+    callback report (and cancel) between records.
+    """
+    total = len(graph.nodes) + len(graph.edges)
+    done = 0
+    f.write('{\n  "nodes": [')
+    sep = "\n"
+    for node_id, n in graph.nodes.items():
+        if done % PROGRESS_EVERY == 0:
+            progress("saving", done, total)
+        done += 1
+        f.write(
+            f'{sep}    {{\n      "id": {_number(node_id)},'
+            f'\n      "x": {_number(n.x)},'
+            f'\n      "y": {_number(n.y)},'
+            f'\n      "text": {encode_basestring_ascii(n.text)}\n    }}'
+        )
+        sep = ",\n"
+    f.write("\n  ],\n" if graph.nodes else "],\n")
+
+    f.write('  "connections": [')
+    sep = "\n"
+    for c in graph.edges.values():
+        if done % PROGRESS_EVERY == 0:
+            progress("saving", done, total)
+        done += 1
+        f.write(
+            f'{sep}    {{\n      "from": {_number(c.from_id)},'
+            f'\n      "to": {_number(c.to_id)}\n    }}'
+        )
+        sep = ",\n"
+    f.write("\n  ]\n}" if graph.edges else "]\n}")
+
+
+def save_json(graph, path, progress=no_progress):
+    with open(path, "w", encoding="utf-8") as f:
+        write_json(graph, f, progress)
+
+
+def read_json(path, progress=no_progress):
+    """Read and parse a JSON map file without building a Graph."""
+    size = os.path.getsize(path)
+    chunks = []
+    done = 0
+    with open(path, "rb") as f:
+        while True:
+            progress("reading", done, size)
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            done += len(chunk)
+    progress("parsing", 0, 1)
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+def load_json(path, default_pos=(0, 0), progress=no_progress):
+    return graph_from_data(read_json(path, progress), default_pos, progress)
+
+
+def save_map(graph, path, progress=no_progress):
+    """Save in the format chosen by the file extension.
+
+    The map is written to a temporary file first and moved into place
+    only when complete, so a failed or cancelled save never leaves a
+    truncated map behind.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        if os.path.splitext(path)[1].lower() == BINARY_EXTENSION:
+            save_binary(graph, tmp_path, progress)
+        else:
+            save_json(graph, tmp_path, progress)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_map(path, default_pos=(0, 0), progress=no_progress):
+    """Load a map in either format, detected from the file contents."""
+    if is_binary_map(path):
+        return load_binary(path, progress)
+    return load_json(path, default_pos, progress)
+
+
+def load_records(path, default_pos=(0, 0)):
+    """Load a map in either format as (nodes, connections) records, as
+    parse_records returns them.
+
+    No Graph is built and no label measured, which makes this the
+    cheaper way to read maps that are only going to be combined into
+    another one, and safe to run in a worker process.
+    """
+    if is_binary_map(path):
+        return load_binary_records(path)
+    return parse_records(read_json(path), default_pos)
@@ -0,0 +1,188 @@
+"""Combining several maps into one."""
+
+import os
+from math import ceil, sqrt
+
+from .graph import Graph, Node, node_box, paused_gc
+from .mapfile import graph_records, load_records, no_progress, sized_records
+from .tasks import run_in_processes
+
+MERGE_GAP = 400.0  # world units left between merged maps
+PROGRESS_EVERY = 5000  # nodes between progress reports
+POOL_MIN_BYTES = 8 << 20  # files smaller than this in total are read here
+
+
+def bounds(graph):
+    """The (x1, y1, x2, y2) box around every node, or None for an empty map."""
+    boxes = [node_box(n) for n in graph.nodes.values()]
+    if not boxes:
+        return None
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def read_maps(paths, jobs=0, progress=no_progress):
+    """Read several map files in parallel, as load_records returns them.
+
+    The worker processes only parse: labels are measured by merge_maps,
+    in this process, with the text metrics the caller installed.  Small
+    imports are read here, as starting the pool would cost more than it
+    saves.
+    """
+    if not jobs and sum(os.path.getsize(path) for path in paths) < POOL_MIN_BYTES:
+        jobs = 1
+    return run_in_processes(jobs, load_records, paths, progress=progress, stage="reading")
+
+
+def _offsets(boxes, gap):
+    """Where each map goes: (dx, dy) per box, None for empty maps.
+
+    Maps are laid out in rows of about sqrt(count) maps, left to right
+    with top edges aligned, each row below the tallest map of the one
+    before.  The first map keeps its position.
+    """
+    placed = [box for box in boxes if box is not None]
+    per_row = max(1, ceil(sqrt(len(placed))))
+    offsets = []
+    column = 0
+    left = cursor = top = bottom = None
+    for box in boxes:
+        if box is None:
+            offsets.append(None)
+            continue
+        if left is None:
+            left = cursor = box[0]
+            top = box[1]
+            bottom = box[3]
+        elif column == per_row:
+            column = 0
+            cursor = left
+            top = bottom + gap
+        dx = cursor - box[0]
+        dy = top - box[1]
+        offsets.append((dx, dy))
+        cursor = box[2] + dx + gap
+        bottom = max(bottom, box[3] + dy)
+        column += 1
+    return offsets
+
+
+def _record_bounds(nodes):
+    if not nodes:
+        return None
+    return (
+        min(x - w / 2 for _, x, _, w, _, _ in nodes),
+        min(y - h / 2 for _, _, y, _, h, _ in nodes),
+        max(x + w / 2 for _, x, _, w, _, _ in nodes),
+        max(y + h / 2 for _, _, y, _, h, _ in nodes),
+    )
+
+
+def merge_maps(
+    maps, gap=MERGE_GAP, dedupe=False, progress=no_progress, base=None, collapsed=()
+):
+    """Return a new Graph holding every node and connection of `maps`,
+    given as (nodes, connections) records like load_records returns.
+    Node boxes are sized here, from the labels.
+
+    With `base` (a Graph or GraphSnapshot), the result starts as a copy
+    of it: its nodes keep their ids and places, and those in `collapsed`
+    stay collapsed.  Merged nodes are numbered on from the largest id of
+    `base`, or from 1, in order, so ids from different maps never
+    collide.  Each merged map is moved into a region of its own next to
+    `base` (see _offsets).  With `dedupe`, a node whose label already
+    appeared in `base` or an earlier map is not added again: its
+    connections go to the first node with that label instead.  Labels
+    repeated within one map, and empty labels, are kept apart.
+    Connections that would duplicate an existing one in either
+    direction, or join a node to itself after deduplication, are dropped
+    as add_edge drops them.
+
+    The nodes and connections are gathered first and the Graph is built
+    from them in one batch (see Graph.load).
+    """
+    with paused_gc():
+        return _merge(maps, gap, dedupe, progress, base, collapsed)
+
+
+def _merge(maps, gap, dedupe, progress, base, collapsed):
+    maps = [(sized_records(nodes), connections) for nodes, connections in maps]
+    merged_nodes = []
+    merged_connections = []
+    labels = {}  # label -> merged id of the first node with it
+    boxes = []
+    next_id = 1
+    if base is not None:
+        for n in base.nodes.values():
+            # copies: the base map may be kept, e.g. to undo the merge
+            merged_nodes.append(Node(n.id, n.x, n.y, n.w, n.h, n.text))
+            if dedupe and n.text:
+                labels.setdefault(n.text, n.id)
+        merged_connections = [(c.from_id, c.to_id) for c in base.edges.values()]
+        boxes.append(bounds(base))
+        next_id = max(base.nodes, default=0) + 1
+    offsets = _offsets(boxes + [_record_bounds(nodes) for nodes, _ in maps], gap)
+    total = sum(len(nodes) for nodes, _ in maps)
+    done = 0
+    add_node = merged_nodes.append
+    add_edge = merged_connections.append
+    for (nodes, connections), offset in zip(maps, offsets[len(boxes):]):
+        if offset is None:
+            continue
+        dx, dy = offset
+        id_map = {}
+        new_labels = {}
+        for node_id, x, y, w, h, text in nodes:
+            if done % PROGRESS_EVERY == 0:
+                progress("merging", done, total)
+            done += 1
+            if dedupe and text:
+                existing = labels.get(text)
+                if existing is not None:
+                    id_map[node_id] = existing
+                    continue
+                new_labels.setdefault(text, next_id)
+            id_map[node_id] = next_id
+            add_node(Node(next_id, x + dx, y + dy, w, h, text))
+            next_id += 1
+        for from_id, to_id in connections:
+            a = id_map[from_id]
+            b = id_map[to_id]
+            if a != b:
+                add_edge((a, b))
+        for text, node_id in new_labels.items():
+            labels.setdefault(text, node_id)
+
+    progress("building", 0, 1)
+    merged = Graph().load(merged_nodes, merged_connections)
+    for node_id in collapsed:
+        if node_id in merged.nodes:
+            merged.collapse(node_id)
+    return merged
+
+
+def merge_graphs(graphs, gap=MERGE_GAP, dedupe=False):
+    """Merge Graph objects; see merge_maps."""
+    return merge_maps([graph_records(graph) for graph in graphs], gap, dedupe)
+
+
+def import_maps(
+    paths,
+    base=None,
+    collapsed=(),
+    gap=MERGE_GAP,
+    dedupe=True,
+    jobs=0,
+    progress=no_progress,
+):
+    """Read the map files at `paths` in parallel and merge them into `base`.
+
+    `base` is the map being imported into (a Graph or GraphSnapshot) and
+    `collapsed` its collapsed nodes; see merge_maps.
+    """
+    maps = read_maps(paths, jobs, progress)
+    return merge_maps(maps, gap, dedupe, progress, base, collapsed)
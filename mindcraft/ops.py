@@ -0,0 +1,72 @@
+"""Edit operations: small records that describe one change to a map.
+
+Records are plain dicts so they can be written as JSON lines:
+
+    {"op": "create", "id": 7, "x": 10.0, "y": 20.0, "text": "Idea"}
+    {"op": "move", "id": 7, "x": 15.0, "y": 20.0}
+    {"op": "move_many", "moves": [[7, 15.0, 20.0], [8, 40.0, 60.0]]}
+    {"op": "connect", "from": 7, "to": 8}
+    {"op": "disconnect", "from": 7, "to": 8}
+    {"op": "delete", "id": 7}
+    {"op": "clear"}
+    {"op": "restore", "nodes": [[7, 15.0, 20.0, "Idea"]], "edges": [[7, 8]]}
+
+Positions are absolute and every record names the exact element it
+touches, so applying a record twice has the same effect as applying it
+once.  That lets a journal be replayed over a snapshot that already
+contains some of its edits.  "restore" replaces the whole map, which
+is how undoing a clear is written to the journal.
+"""
+
+from .graph import Node, node_size
+
+
+def restore_op(graph):
+    """Return a record that replaces any map with the contents of `graph`."""
+    return {
+        "op": "restore",
+        "nodes": [[n.id, n.x, n.y, n.text] for n in graph.nodes.values()],
+        "edges": [[c.from_id, c.to_id] for c in graph.edges.values()],
+    }
+
+
+def _add_node(graph, node_id, x, y, text):
+    width, height = node_size(text)
+    graph.add_node(Node(node_id, x, y, width, height, text))
+
+
+def apply_op(graph, op):
+    """Apply one operation record to a graph."""
+    kind = op["op"]
+    nodes = graph.nodes
+    if kind == "create":
+        node_id = op["id"]
+        if node_id in nodes:
+            graph.set_position(node_id, op["x"], op["y"])
+        else:
+            _add_node(graph, node_id, op["x"], op["y"], op["text"])
+    elif kind == "move":
+        if op["id"] in nodes:
+            graph.set_position(op["id"], op["x"], op["y"])
+    elif kind == "move_many":
+        for node_id, x, y in op["moves"]:
+            if node_id in nodes:
+                graph.set_position(node_id, x, y)
+    elif kind == "connect":
+        from_id, to_id = op["from"], op["to"]
+        if from_id in nodes and to_id in nodes and from_id != to_id:
+            graph.add_edge(from_id, to_id)
+    elif kind == "disconnect":
+        graph.remove_edge(op["from"], op["to"])
+    elif kind == "delete":
+        graph.remove_node(op["id"])
+    elif kind == "clear":
+        graph.clear()
+    elif kind == "restore":
+        graph.clear()
+        for node_id, x, y, text in op["nodes"]:
+            _add_node(graph, node_id, x, y, text)
+        for from_id, to_id in op["edges"]:
+            graph.add_edge(from_id, to_id)
+    else:
+        raise ValueError(f"unknown operation {kind!r}")
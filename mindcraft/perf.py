@@ -0,0 +1,199 @@
+"""Lightweight performance counters for interactive code paths."""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+class DragStats:
+    """Counts coalesced motion events and the latency of their redraws.
+
+    `event()` is called for every motion event and `flush()` each time
+    the pending motion is applied.  Latency is measured from the first
+    event of a batch to the flush that draws it.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.events = 0
+        self.flushes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._batch_start = None
+
+    def event(self):
+        self.events += 1
+        if self._batch_start is None:
+            self._batch_start = time.perf_counter()
+
+    def flush(self):
+        if self._batch_start is None:
+            return
+        latency = time.perf_counter() - self._batch_start
+        self._batch_start = None
+        self.flushes += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def summary(self):
+        """Return a one-line human readable report."""
+        if not self.flushes:
+            return "Drag: no motion"
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"Drag: {self.events} events -> {self.flushes} redraws "
+            f"({self.flushes / elapsed:.0f}/s), latency avg "
+            f"{self.total_latency / self.flushes * 1000:.1f} ms, "
+            f"max {self.max_latency * 1000:.1f} ms"
+        )
+
+
+WINDOW = 2.0  # seconds of history behind HUD rates and averages
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+
+class Timings:
+    """Durations of named operations over a sliding window.
+
+    `wrap(name, fn)` returns a stand-in for `fn` that records how long
+    each call takes while `enabled` is set; when it is not, the only
+    cost is one attribute check.  Anything else can be fed in with
+    `record`.  Recording from a worker thread is safe: the samples are
+    only touched under a lock, which the UI thread takes to read them.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.enabled = False
+        self.samples = {}  # name -> deque of (end time, duration)
+        self._lock = threading.Lock()
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                self._add(name, end, end - start)
+
+        return timed
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self._add(name, time.perf_counter(), seconds)
+
+    def _add(self, name, end, seconds):
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque()
+            samples.append((end, seconds))
+
+    def clear(self):
+        with self._lock:
+            self.samples.clear()
+
+    def summary(self, name):
+        """(calls per second, mean seconds, max seconds) within the window.
+
+        Returns None if `name` has not been recorded in the window.
+        """
+        with self._lock:
+            return self._summary(name)
+
+    def _summary(self, name):
+        samples = self.samples.get(name)
+        if not samples:
+            return None
+        cutoff = time.perf_counter() - self.window
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        if not samples:
+            return None
+        durations = [seconds for _, seconds in samples]
+        return (
+            len(durations) / self.window,
+            sum(durations) / len(durations),
+            max(durations),
+        )
+
+    def lines(self):
+        """One line per operation seen in the window, for a HUD."""
+        out = []
+        with self._lock:
+            summaries = [(name, self._summary(name)) for name in sorted(self.samples)]
+        for name, summary in summaries:
+            if summary is None:
+                continue
+            rate, mean, worst = summary
+            out.append(
+                f"{name:<12} {rate:6.1f}/s  avg {mean * 1e3:7.2f} ms  max {worst * 1e3:7.2f} ms"
+            )
+        return out
+
+
+class Profiler:
+    """Profiles the thread that creates it, with cProfile or stack sampling.
+
+    cProfile counts every call exactly but slows the profiled code down.
+    Sampling reads the thread's stack every SAMPLE_INTERVAL seconds from
+    a helper thread and writes the stacks in the collapsed format flame
+    graph tools read ("outer;inner;leaf count" per line).
+    """
+
+    KINDS = ("cprofile", "sample")
+
+    def __init__(self, kind="cprofile", interval=SAMPLE_INTERVAL):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown profiler {kind!r}")
+        self.kind = kind
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self._profile = None
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        if self.kind == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self, path):
+        """Stop profiling and write the result to `path`."""
+        if self.kind == "cprofile":
+            self._profile.disable()
+            self._profile.dump_stats(path)
+            return
+        self._stop.set()
+        self._sampler.join()
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _sample(self):
+        thread_id = self.thread_id
+        stacks = self._stacks
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                where = f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+                names.append(f"{code.co_name} ({where})")
+                frame = frame.f_back
+            if names:
+                stacks[";".join(reversed(names))] += 1
@@ -0,0 +1,653 @@
+"""Virtualized rendering of a Graph onto a Tk canvas.
+
+The canvas is only passed in, never imported, so this module stays
+usable from code that must not load tkinter.
+"""
+
+import time
+
+from .camera import FONT_BUCKETS, Camera
+from .graph import node_box
+from .routing import EdgeRouter, anchor
+from .spatial import boxes_intersect, rect_difference
+from .textmetrics import TEXT_FONT, node_label
+
+NODE_FILL = "#ffffff"
+NODE_OUTLINE = "#d1d5db"
+HIGHLIGHT_OUTLINE = "#3b82f6"
+TEXT_FILL = "#111827"
+LINE_FILL = "#9ca3af"
+LINE_WIDTH = 2
+BADGE_FILL = "#6b7280"
+
+VIEW_MARGIN = 200  # screen pixels drawn beyond each edge of the viewport
+DETAIL_MIN_SCALE = 0.5  # below this zoom nodes are drawn without text
+DETAIL_NODE_LIMIT = 1500  # more visible nodes than this -> no text either
+SYNC_BUDGET = 0.008  # seconds of canvas work per callback while syncing
+POOL_KEEP = 512  # hidden items of each kind kept for reuse after a collapse
+
+
+class CanvasRenderer:
+    """Keeps canvas items only for the part of the graph that is on screen.
+
+    The graph is the source of truth; canvas items are a cache of what
+    intersects the viewport.  Items that scroll out of view are hidden and
+    pooled, then reused for whatever scrolls in next.  When the view is
+    zoomed out or crowded, nodes are drawn as plain boxes with no text.
+    Collapsed nodes get a badge with the number of nodes they hide.
+
+    Lines follow the routes of an EdgeRouter, which bends them around
+    the nodes in their way and reroutes only what a move affects.
+
+    Items are placed in screen coordinates through `camera`.  Panning and
+    zooming transform the existing items with a single canvas.move or
+    canvas.scale, and the following sync only draws what came into view.
+    """
+
+    def __init__(self, canvas, graph):
+        self.canvas = canvas
+        self.graph = graph
+        self.camera = Camera()
+        self.router = EdgeRouter(graph)
+        self.detailed = True
+        self._fonts = {}  # font bucket -> font description
+        self._font_bucket = self.camera.font_bucket()
+        self.font = self._font_for(self._font_bucket)
+
+        self.node_items = {}  # node_id -> (rect_id, text_id or None)
+        self.edge_items = {}  # edge key -> line_id
+        self.item_to_node = {}  # canvas item id -> node_id
+        self.line_to_edge = {}  # line item id -> edge key
+        self.badges = {}  # collapsed node_id -> hidden-count text item
+        self.highlighted = set()  # node ids drawn with the highlight outline
+        self.selected = set()  # node ids whose items carry the "selected" tag
+        self._group = None  # state of a group move in progress
+
+        self._free_pairs = []  # hidden (rect_id, text_id) pairs
+        self._free_rects = []  # hidden rect ids (simplified nodes)
+        self._free_lines = []  # hidden line ids
+        self._drawn = None  # world rectangle the items are kept up to date for
+        self._sync_pending = None
+        self._work = []  # pending (method, key) canvas updates, run from the end
+        self._drain_pending = None
+        self._lower_edges = False
+
+    # ---------------------------------------------------------------------
+    # Viewport
+    # ---------------------------------------------------------------------
+
+    @property
+    def scale(self):
+        """Zoom factor, used to pick the level of detail."""
+        return self.camera.scale
+
+    def viewport(self):
+        """Return the (x1, y1, x2, y2) world rectangle that should be drawn."""
+        canvas = self.canvas
+        return self.camera.view_rect(
+            canvas.winfo_width(), canvas.winfo_height(), VIEW_MARGIN
+        )
+
+    def region(self):
+        """The world rectangle whose contents have canvas items."""
+        return self._drawn if self._drawn is not None else self.viewport()
+
+    def in_view(self, node):
+        return boxes_intersect(node_box(node), self.region())
+
+    def request_sync(self):
+        """Schedule a view update on the next idle callback, coalescing requests."""
+        if self._sync_pending is None:
+            self._sync_pending = self.canvas.after_idle(self._run_sync)
+
+    def _run_sync(self):
+        self._sync_pending = None
+        self.update_view()
+
+    def sync(self):
+        """Make the canvas items match the nodes and lines inside the viewport.
+
+        The item changes are queued and applied in slices of at most
+        SYNC_BUDGET seconds, so a large redraw never blocks the event loop.
+        """
+        if self._group is not None:
+            return  # the model is behind the canvas until the move ends
+        graph = self.graph
+        view = self.viewport()
+        visible = graph.nodes_in_rect(*view)
+        wanted = graph.edges_in_rect(*view)
+
+        detailed = self.scale >= DETAIL_MIN_SCALE and len(visible) <= DETAIL_NODE_LIMIT
+        if detailed != self.detailed:
+            self.detailed = detailed
+            for node_id in list(self.node_items):
+                self._release_node(node_id)
+
+        self._drawn = view
+        # work runs from the end: releases first so draws can reuse items
+        work = [(self._draw_edge, k) for k in wanted if k not in self.edge_items]
+        if self.router.catch_up():
+            work += [(self._reroute, k) for k in self.edge_items if k in wanted]
+        work += [(self._draw_node, n) for n in visible if n not in self.node_items]
+        work += [(self._hide_edge, k) for k in self.edge_items if k not in wanted]
+        work += [(self._hide_node, n) for n in self.node_items if n not in visible]
+        self._work = work
+        self._drain()
+
+    def update_view(self):
+        """Bring the items up to date after the view was panned or zoomed.
+
+        Only the strips of the world that entered or left the view are
+        queried, so the cost follows what changed on screen rather than
+        everything on it.  Falls back to a full sync when the views do
+        not overlap or the level of detail changes.
+        """
+        if self._group is not None:
+            return
+        old = self._drawn
+        view = self.viewport()
+        if old is None or not boxes_intersect(old, view):
+            self.sync()
+            return
+        graph = self.graph
+        entering_nodes = set()
+        entering_edges = set()
+        for rect in rect_difference(view, old):
+            entering_nodes |= graph.nodes_in_rect(*rect)
+            entering_edges |= graph.edges_in_rect(*rect)
+        leaving_nodes = set()
+        leaving_edges = set()
+        for rect in rect_difference(old, view):
+            leaving_nodes |= graph.nodes_in_rect(*rect)
+            leaving_edges |= graph.edges_in_rect(*rect)
+
+        node_items = self.node_items
+        edge_items = self.edge_items
+        node_boxes = graph.node_index.boxes
+        edge_boxes = graph.edge_index.boxes
+        draw_nodes = [n for n in entering_nodes if n not in node_items]
+        hide_nodes = [
+            n for n in leaving_nodes
+            if n in node_items and not boxes_intersect(node_boxes[n], view)
+        ]
+        visible_count = len(node_items) + len(draw_nodes) - len(hide_nodes)
+        detailed = self.scale >= DETAIL_MIN_SCALE and visible_count <= DETAIL_NODE_LIMIT
+        if detailed != self.detailed:
+            self.sync()
+            return
+
+        self._drawn = view
+        # unfinished work from earlier updates stays queued; the draw and
+        # hide steps re-check the region, so stale entries do nothing
+        work = [(self._draw_edge, k) for k in entering_edges if k not in edge_items]
+        work += [(self._draw_node, n) for n in draw_nodes]
+        work += self._work
+        work += [
+            (self._hide_edge, k) for k in leaving_edges
+            if k in edge_items and not boxes_intersect(edge_boxes[k], view)
+        ]
+        work += [(self._hide_node, n) for n in hide_nodes]
+        self._work = work
+        self._drain()
+
+    def _drain(self, scheduled=False):
+        if scheduled:
+            self._drain_pending = None
+        work = self._work
+        deadline = time.perf_counter() + SYNC_BUDGET
+        done = 0
+        while work:
+            method, key = work.pop()
+            method(key)
+            done += 1
+            if done % 64 == 0 and time.perf_counter() > deadline:
+                break
+        if work:
+            # after(1) rather than after_idle, so input events run in between
+            if self._drain_pending is None:
+                self._drain_pending = self.canvas.after(1, self._drain, True)
+        elif self._lower_edges:
+            self._lower_edges = False
+            self.canvas.tag_lower("edge")
+
+    @property
+    def busy(self):
+        """True while a sync is still being applied in slices."""
+        return bool(self._work)
+
+    def reset(self, graph):
+        """Forget every item (the caller has cleared the canvas) and show `graph`."""
+        self.graph = graph
+        self.router.reset(graph)
+        self._drawn = None
+        self.node_items.clear()
+        self.edge_items.clear()
+        self.item_to_node.clear()
+        self.line_to_edge.clear()
+        self.badges.clear()
+        self.highlighted.clear()
+        self.selected.clear()
+        self._group = None
+        self._work = []
+        self._free_pairs.clear()
+        self._free_rects.clear()
+        self._free_lines.clear()
+        self.request_sync()
+
+    # ---------------------------------------------------------------------
+    # Camera
+    # ---------------------------------------------------------------------
+
+    def pan(self, dx, dy):
+        """Scroll the view by (dx, dy) screen pixels."""
+        self.camera.pan(dx, dy)
+        self.canvas.move("all", dx, dy)
+        self.request_sync()
+
+    def zoom(self, sx, sy, factor):
+        """Zoom about the screen point (sx, sy)."""
+        factor = self.camera.zoom_at(sx, sy, factor)
+        if factor == 1.0:
+            return
+        canvas = self.canvas
+        canvas.scale("all", sx, sy, factor, factor)
+        # Tk does not scale fonts; switch them only at bucket boundaries
+        bucket = self.camera.font_bucket()
+        if bucket != self._font_bucket:
+            self._font_bucket = bucket
+            self.font = self._font_for(bucket)
+            for _, text_id in self.node_items.values():
+                if text_id is not None:
+                    canvas.itemconfig(text_id, font=self.font)
+            for badge_id in self.badges.values():
+                canvas.itemconfig(badge_id, font=self.font)
+        self.request_sync()
+
+    def center_on(self, x, y):
+        """Pan so the world point (x, y) is in the middle of the canvas."""
+        camera = self.camera
+        sx, sy = camera.to_screen(x, y)
+        self.pan(
+            self.canvas.winfo_width() / 2 - sx, self.canvas.winfo_height() / 2 - sy
+        )
+
+    def _font_for(self, bucket):
+        font = self._fonts.get(bucket)
+        if font is None:
+            family, size = TEXT_FONT
+            size = max(1, round(size * 2 ** (bucket / FONT_BUCKETS)))
+            font = self._fonts[bucket] = (family, size)
+        return font
+
+    # ---------------------------------------------------------------------
+    # Model change notifications
+    # ---------------------------------------------------------------------
+
+    def add_node(self, node_id):
+        if self.in_view(self.graph.nodes[node_id]):
+            self._draw_node(node_id)
+        for key in self.router.node_changed(node_id):
+            self._reroute(key)
+
+    def remove_node(self, node_id, edge_keys=()):
+        self.highlighted.discard(node_id)
+        self.selected.discard(node_id)
+        self._release_node(node_id)
+        for key in edge_keys:
+            self.router.forget(key)
+            self._release_edge(key)
+        for key in self.router.node_changed(node_id):
+            self._reroute(key)
+
+    def add_edge(self, key):
+        box = self.graph.edge_index.boxes.get(key)  # None under a collapsed node
+        if box is not None and boxes_intersect(box, self.region()):
+            self._draw_edge(key)
+            self.canvas.tag_lower(self.edge_items[key])
+
+    def remove_edge(self, key):
+        self.router.forget(key)
+        self._release_edge(key)
+
+    def move_node(self, node_id):
+        """Redraw a moved node, its lines and the lines routed around it."""
+        node = self.graph.nodes[node_id]
+        rerouted = self.router.node_changed(node_id)
+        items = self.node_items.get(node_id)
+        if items is None:
+            if self.in_view(node):
+                self._draw_node(node_id)
+                for key in self.graph.incident[node_id]:
+                    if key not in self.edge_items:
+                        self.add_edge(key)
+            for key in rerouted:
+                self._reroute(key)
+            return
+
+        canvas = self.canvas
+        camera = self.camera
+        rect_id, text_id = items
+        canvas.coords(rect_id, *camera.box_to_screen(node_box(node)))
+        if text_id is not None:
+            canvas.coords(text_id, *camera.to_screen(node.x, node.y))
+        badge_id = self.badges.get(node_id)
+        if badge_id is not None:
+            canvas.coords(badge_id, *self._badge_point(node))
+        incident = self.graph.incident[node_id]
+        for key in rerouted:
+            if key in self.edge_items:
+                self._reroute(key)
+            elif key in incident:
+                self.add_edge(key)
+
+    def nodes_moved(self, node_ids):
+        """Reroute the lines affected by nodes the model moved on its own."""
+        stale = set()
+        for node_id in node_ids:
+            stale |= self.router.node_changed(node_id)
+        for key in stale:
+            self._reroute(key)
+
+    def set_highlight(self, node_id, highlight=True):
+        if highlight:
+            self.highlighted.add(node_id)
+        else:
+            self.highlighted.discard(node_id)
+        items = self.node_items.get(node_id)
+        if items is not None:
+            self.canvas.itemconfig(items[0], **self._outline(node_id))
+
+    def set_selected(self, node_id, selected=True):
+        """Add or remove a node's items from the shared "selected" tag."""
+        if selected:
+            self.selected.add(node_id)
+        else:
+            self.selected.discard(node_id)
+        items = self.node_items.get(node_id)
+        if items is None:
+            return
+        for item in items + (self.badges.get(node_id),):
+            if item is None:
+                continue
+            if selected:
+                self.canvas.addtag_withtag("selected", item)
+            else:
+                self.canvas.dtag(item, "selected")
+
+    # ---------------------------------------------------------------------
+    # Collapsing
+    # ---------------------------------------------------------------------
+
+    def hide_nodes(self, node_ids):
+        """Delete the items of nodes that a collapse took out of the indexes.
+
+        Their lines go too, all in one canvas call rather than through the
+        pool, so collapsing a large subtree gives the canvas items back.
+        """
+        incident = self.graph.incident
+        edge_index = self.graph.edge_index
+        item_to_node = self.item_to_node
+        doomed = []
+        for node_id in node_ids:
+            self.highlighted.discard(node_id)
+            self.selected.discard(node_id)
+            items = self.node_items.pop(node_id, None)
+            if items is not None:
+                self._release_badge(node_id)
+                for item in items:
+                    if item is not None:
+                        item_to_node.pop(item, None)
+                        doomed.append(item)
+            for key in incident[node_id]:
+                if key not in edge_index:
+                    line_id = self.edge_items.pop(key, None)
+                    if line_id is not None:
+                        self.line_to_edge.pop(line_id, None)
+                        doomed.append(line_id)
+        if doomed:
+            self.canvas.delete(*doomed)
+        self.trim_pool()
+
+    def update_badge(self, node_id):
+        """Show, hide or recount the badge of a node after collapsing or expanding."""
+        self._release_badge(node_id)
+        items = self.node_items.get(node_id)
+        if items is not None and items[1] is not None and node_id in self.graph.tree.collapsed:
+            self._draw_badge(node_id)
+
+    def refresh_badges(self):
+        """Recount every badge; connections may have changed what they hide."""
+        for node_id in list(self.badges):
+            self.update_badge(node_id)
+
+    def trim_pool(self):
+        """Delete hidden pooled items beyond POOL_KEEP of each kind."""
+        surplus = [item for pair in self._free_pairs[POOL_KEEP:] for item in pair]
+        surplus += self._free_rects[POOL_KEEP:]
+        surplus += self._free_lines[POOL_KEEP:]
+        del self._free_pairs[POOL_KEEP:]
+        del self._free_rects[POOL_KEEP:]
+        del self._free_lines[POOL_KEEP:]
+        if surplus:
+            self.canvas.delete(*surplus)
+
+    # ---------------------------------------------------------------------
+    # Group moves
+    # ---------------------------------------------------------------------
+
+    def begin_group_move(self):
+        """Prepare to drag every selected node with one canvas.move per frame.
+
+        Lines with both ends selected join the "selected" tag and move
+        rigidly; only lines with exactly one selected end are recomputed,
+        as straight lines until the move ends and they are routed again.
+        """
+        graph = self.graph
+        selected = self.selected
+        inner_lines = []
+        cut_edges = []
+        seen = set()
+        for node_id in selected:
+            for key in graph.incident[node_id]:
+                if key in seen:
+                    continue
+                seen.add(key)
+                a, b = key
+                if a in selected and b in selected:
+                    line_id = self.edge_items.get(key)
+                    if line_id is not None:
+                        self.canvas.addtag_withtag("selected", line_id)
+                        inner_lines.append(line_id)
+                else:
+                    cut_edges.append(key)
+        self._group = {"dx": 0.0, "dy": 0.0, "inner": inner_lines, "cut": cut_edges}
+
+    def group_move(self, dx, dy):
+        """Move the selection by (dx, dy) world units on the canvas only."""
+        group = self._group
+        group["dx"] += dx
+        group["dy"] += dy
+        canvas = self.canvas
+        camera = self.camera
+        canvas.move("selected", dx * camera.scale, dy * camera.scale)
+
+        ox, oy = group["dx"], group["dy"]
+        nodes = self.graph.nodes
+        edges = self.graph.edges
+        selected = self.selected
+        for key in group["cut"]:
+            line_id = self.edge_items.get(key)
+            if line_id is None:
+                continue
+            conn = edges[key]
+            moved = nodes[conn.from_id]
+            fixed = nodes[conn.to_id]
+            if conn.to_id in selected:
+                moved, fixed = fixed, moved
+            # anchors on the borders, the moved node taken at its offset
+            x1, y1 = anchor(moved, fixed.x - ox, fixed.y - oy)
+            x2, y2 = anchor(fixed, moved.x + ox, moved.y + oy)
+            canvas.coords(line_id, *camera.box_to_screen((x1 + ox, y1 + oy, x2, y2)))
+
+    def end_group_move(self):
+        """Finish a group move; return the total (dx, dy) applied."""
+        group = self._group
+        self._group = None
+        for line_id in group["inner"]:
+            self.canvas.dtag(line_id, "selected")
+        return group["dx"], group["dy"]
+
+    # ---------------------------------------------------------------------
+    # Item pool
+    # ---------------------------------------------------------------------
+
+    def _outline(self, node_id):
+        if node_id in self.highlighted:
+            return {"outline": HIGHLIGHT_OUTLINE, "width": 2}
+        return {"outline": NODE_OUTLINE, "width": 1}
+
+    def _draw_node(self, node_id):
+        node = self.graph.nodes.get(node_id)
+        if node is None or node_id in self.node_items:
+            return  # removed or drawn since the sync was queued
+        if node_id not in self.graph.node_index:
+            return  # under a collapsed node
+        if self._drawn is not None and not boxes_intersect(node_box(node), self._drawn):
+            return  # scrolled out again before its turn
+        canvas = self.canvas
+        box = self.camera.box_to_screen(node_box(node))
+        x, y = self.camera.to_screen(node.x, node.y)
+        outline = self._outline(node_id)
+        selected = node_id in self.selected
+        rect_tags = ("node", "selected") if selected else ("node",)
+        text_tags = ("node_text", "selected") if selected else ("node_text",)
+
+        text_id = None
+        if self.detailed and self._free_pairs:
+            rect_id, text_id = self._free_pairs.pop()
+        elif not self.detailed and self._free_rects:
+            rect_id = self._free_rects.pop()
+        else:
+            rect_id = None
+
+        if rect_id is None:
+            rect_id = canvas.create_rectangle(
+                *box, fill=NODE_FILL, tags=rect_tags, **outline
+            )
+            if self.detailed:
+                text_id = canvas.create_text(
+                    x,
+                    y,
+                    text=node_label(node.text),
+                    font=self.font,
+                    fill=TEXT_FILL,
+                    justify="center",
+                    tags=text_tags,
+                )
+        else:
+            canvas.coords(rect_id, *box)
+            canvas.itemconfig(rect_id, state="normal", tags=rect_tags, **outline)
+            if text_id is not None:
+                canvas.coords(text_id, x, y)
+                canvas.itemconfig(
+                    text_id,
+                    state="normal",
+                    tags=text_tags,
+                    text=node_label(node.text),
+                    font=self.font,
+                )
+
+        self.node_items[node_id] = (rect_id, text_id)
+        self.item_to_node[rect_id] = node_id
+        if text_id is not None:
+            self.item_to_node[text_id] = node_id
+            if node_id in self.graph.tree.collapsed:
+                self._draw_badge(node_id)
+
+    def _badge_point(self, node):
+        """Screen position of a badge: just outside the top right corner."""
+        return self.camera.to_screen(node.x + node.w / 2, node.y - node.h / 2)
+
+    def _draw_badge(self, node_id):
+        # few nodes are collapsed, so badges are created and deleted, not pooled
+        count = self.graph.tree.descendant_count(node_id)
+        tags = ("badge", "selected") if node_id in self.selected else ("badge",)
+        badge_id = self.canvas.create_text(
+            *self._badge_point(self.graph.nodes[node_id]),
+            text=f"+{count}",
+            font=self.font,
+            fill=BADGE_FILL,
+            anchor="sw",
+            tags=tags,
+        )
+        self.badges[node_id] = badge_id
+        self.item_to_node[badge_id] = node_id
+
+    def _release_badge(self, node_id):
+        badge_id = self.badges.pop(node_id, None)
+        if badge_id is not None:
+            self.canvas.delete(badge_id)
+            self.item_to_node.pop(badge_id, None)
+
+    def _release_node(self, node_id):
+        items = self.node_items.pop(node_id, None)
+        if items is None:
+            return
+        self._release_badge(node_id)
+        rect_id, text_id = items
+        self.canvas.itemconfig(rect_id, state="hidden", tags=("node",))
+        self.item_to_node.pop(rect_id, None)
+        if text_id is None:
+            self._free_rects.append(rect_id)
+        else:
+            self.canvas.itemconfig(text_id, state="hidden", tags=("node_text",))
+            self.item_to_node.pop(text_id, None)
+            self._free_pairs.append(items)
+
+    def _draw_edge(self, key):
+        if key not in self.graph.edges or key in self.edge_items:
+            return  # removed or drawn since the sync was queued
+        box = self.graph.edge_index.boxes.get(key)
+        if box is None:
+            return  # under a collapsed node
+        if self._drawn is not None and not boxes_intersect(box, self._drawn):
+            return  # scrolled out again before its turn
+        coords = self.camera.points_to_screen(self.router.route(key))
+        if self._free_lines:
+            line_id = self._free_lines.pop()
+            self.canvas.coords(line_id, *coords)
+            self.canvas.itemconfig(line_id, state="normal")
+        else:
+            line_id = self.canvas.create_line(
+                *coords, fill=LINE_FILL, width=LINE_WIDTH, smooth=True, tags=("edge",)
+            )
+            self._lower_edges = True
+        self.edge_items[key] = line_id
+        self.line_to_edge[line_id] = key
+
+    def _reroute(self, key):
+        """Redraw a line, if it has one, along its current route."""
+        line_id = self.edge_items.get(key)
+        if line_id is not None and key in self.graph.edges:
+            self.canvas.coords(
+                line_id, *self.camera.points_to_screen(self.router.route(key))
+            )
+
+    def _hide_node(self, node_id):
+        """Release a node queued as off-screen, unless it has come back."""
+        box = self.graph.node_index.boxes.get(node_id)
+        if box is None or not boxes_intersect(box, self.region()):
+            self._release_node(node_id)
+
+    def _hide_edge(self, key):
+        box = self.graph.edge_index.boxes.get(key)
+        if box is None or not boxes_intersect(box, self.region()):
+            self._release_edge(key)
+
+    def _release_edge(self, key):
+        line_id = self.edge_items.pop(key, None)
+        if line_id is None:
+            return
+        self.canvas.itemconfig(line_id, state="hidden")
+        self.line_to_edge.pop(line_id, None)
+        self._free_lines.append(line_id)
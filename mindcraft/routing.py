@@ -0,0 +1,299 @@
+"""Routing connection lines around the nodes they would otherwise cross.
+
+A connection is drawn from the border of one node to the border of the
+other.  When that straight line crosses another node's box, it is bent
+into a quadratic Bézier curve whose control point pushes it clear of
+every box in the way, on whichever side needs the smaller bend.
+
+Routes are cached.  Moving a node only reroutes its own connections, the
+routes that were bent around it and the routes its new box lands on, so
+a drag costs as much as the neighbourhood of the dragged node.
+"""
+
+from math import hypot
+
+from .spatial import SpatialGrid, clip_segment, point_segment_distance
+
+ROUTE_MARGIN = 12.0  # world units kept between a route and the boxes it avoids
+ROUTE_TRIES = 4  # bends tried before a route is left crossing something
+CURVE_STEPS = 12  # segments a curve is flattened into for tests
+MIN_SPREAD = 0.15  # fraction of a route treated as its nearest end when bending
+MAX_BEND = 1.0  # largest control point offset, as a fraction of the route length
+CROWD_LIMIT = 200  # nodes near a route beyond which it is left straight
+MAX_AVOIDED = 8  # boxes a route bends around before it stays straight
+
+
+def anchor(node, tx, ty):
+    """The point where the ray from a node's centre towards (tx, ty)
+    leaves its box; the centre itself if (tx, ty) is inside."""
+    x = node.x
+    y = node.y
+    dx = tx - x
+    dy = ty - y
+    t = 1.0
+    if dx:
+        t = min(t, node.w / 2 / abs(dx))
+    if dy:
+        t = min(t, node.h / 2 / abs(dy))
+    if t >= 1.0:
+        return x, y
+    return x + dx * t, y + dy * t
+
+
+def polyline(route):
+    """Flatten a route to [x1, y1, x2, y2, ...] straight pieces."""
+    if len(route) == 4:
+        return list(route)
+    x0, y0, cx, cy, x2, y2 = route
+    points = [x0, y0]
+    for i in range(1, CURVE_STEPS + 1):
+        t = i / CURVE_STEPS
+        u = 1 - t
+        points.append(u * u * x0 + 2 * u * t * cx + t * t * x2)
+        points.append(u * u * y0 + 2 * u * t * cy + t * t * y2)
+    return points
+
+
+def crosses_box(points, box):
+    """True if the polyline `points` passes through the box (x1, y1, x2, y2)."""
+    for i in range(0, len(points) - 2, 2):
+        if clip_segment(*points[i:i + 4], *box) is not None:
+            return True
+    return False
+
+
+class EdgeRouter:
+    """Computes and caches the drawn route of every connection.
+
+    A route is a flat tuple of world coordinates: (x1, y1, x2, y2) for a
+    straight line, or (x1, y1, cx, cy, x2, y2) for a curve with control
+    point (cx, cy), which Tk draws as a smoothed line.  Nodes under a
+    collapsed node are not in the graph's spatial index and are never
+    avoided.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.routes = {}  # edge key -> route
+        self.curves = SpatialGrid()  # bounding boxes of curved routes
+        self._avoids = {}  # edge key -> node ids its route was bent around
+        self._avoided_by = {}  # node_id -> edge keys bent around it
+        self._crowded = set()  # edge keys left straight through a crowd
+        self._visibility = graph.visibility_changes
+
+    def reset(self, graph):
+        self.graph = graph
+        self.clear()
+
+    def clear(self):
+        self.routes.clear()
+        self.curves.clear()
+        self._avoids.clear()
+        self._avoided_by.clear()
+        self._crowded.clear()
+        self._visibility = self.graph.visibility_changes
+
+    def catch_up(self):
+        """Drop every route if nodes were hidden or shown since they were
+        computed, as that changes what is in the way.  Returns True if so."""
+        if self._visibility == self.graph.visibility_changes:
+            return False
+        self.clear()
+        return True
+
+    def route(self, key):
+        """The route of a connection, computed on first use."""
+        route = self.routes.get(key)
+        if route is None:
+            route = self.routes[key] = self._compute(key)
+        return route
+
+    def forget(self, key):
+        """Drop the cached route of a connection."""
+        if self.routes.pop(key, None) is None:
+            return
+        self.curves.remove(key)
+        self._crowded.discard(key)
+        avoided_by = self._avoided_by
+        for node_id in self._avoids.pop(key, ()):
+            keys = avoided_by.get(node_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del avoided_by[node_id]
+
+    def node_changed(self, node_id):
+        """Drop the routes a node's move, creation or removal may change.
+
+        Those are its own connections, the routes bent around it and the
+        cached routes its box now lies across, except those already left
+        straight through a crowd of nodes.  Returns their keys.
+        """
+        graph = self.graph
+        stale = set(graph.incident.get(node_id, ()))
+        stale.update(self._avoided_by.get(node_id, ()))
+        node = graph.nodes.get(node_id)
+        if node is not None and node_id in graph.node_index:
+            box = self._padded_box(node)
+            routes = self.routes
+            crowded = self._crowded
+            for key in graph.edge_index.query_rect(*box) | self.curves.query_rect(*box):
+                if key in stale or key in crowded or node_id in key:
+                    continue
+                route = routes.get(key)
+                if route is not None and crosses_box(polyline(route), box):
+                    stale.add(key)
+        for key in stale:
+            self.forget(key)
+        return stale
+
+    def edge_at(self, x, y, tolerance):
+        """Return the key of the connection whose route passes nearest to a
+        point, within `tolerance`, or None."""
+        graph = self.graph
+        rect = (x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        best_key = None
+        best_dist = tolerance
+        for key in graph.edge_index.query_rect(*rect) | self.curves.query_rect(*rect):
+            if key not in graph.edge_index:
+                continue
+            points = polyline(self.route(key))
+            for i in range(0, len(points) - 2, 2):
+                d = point_segment_distance(x, y, *points[i:i + 4])
+                if d <= best_dist:
+                    best_dist = d
+                    best_key = key
+        return best_key
+
+    # ---------------------------------------------------------------------
+    # Computing routes
+    # ---------------------------------------------------------------------
+
+    def _padded_box(self, node):
+        half_w = node.w / 2 + ROUTE_MARGIN
+        half_h = node.h / 2 + ROUTE_MARGIN
+        return node.x - half_w, node.y - half_h, node.x + half_w, node.y + half_h
+
+    def _compute(self, key):
+        graph = self.graph
+        conn = graph.edges[key]
+        n1 = graph.nodes[conn.from_id]
+        n2 = graph.nodes[conn.to_id]
+        straight = route = anchor(n1, n2.x, n2.y) + anchor(n2, n1.x, n1.y)
+        avoids = set()
+        for _ in range(ROUTE_TRIES):
+            blocking = self._blocking(polyline(route), key, avoids)
+            if not blocking:
+                break  # clear, or too crowded to tell (None)
+            avoids |= blocking
+            control = None
+            if len(avoids) <= MAX_AVOIDED:
+                control = self._control_point(n1, n2, avoids)
+            if control is None:
+                break  # no gentle bend clears them all
+            cx, cy = control
+            route = anchor(n1, cx, cy) + (cx, cy) + anchor(n2, cx, cy)
+        else:
+            blocking = ()  # the last bend is kept even if it still crosses
+
+        if blocking is None or blocking:
+            # left straight: nothing it could bend around is worth tracking
+            self._crowded.add(key)
+            return straight
+        if avoids:
+            self._avoids[key] = avoids
+            avoided_by = self._avoided_by
+            for node_id in avoids:
+                keys = avoided_by.get(node_id)
+                if keys is None:
+                    keys = avoided_by[node_id] = set()
+                keys.add(key)
+        if len(route) == 6:
+            xs = route[0::2]
+            ys = route[1::2]
+            self.curves.insert(key, (min(xs), min(ys), max(xs), max(ys)))
+        return route
+
+    def _blocking(self, points, key, avoids):
+        """Ids of the nodes not in `avoids` whose padded boxes the polyline
+        crosses, or None if more than CROWD_LIMIT nodes are near it or a
+        piece crosses more grid cells than the index lists.
+
+        Stops early once the route would avoid more than MAX_AVOIDED.
+
+        A box that crosses a piece shares a grid cell with it, so each
+        piece is only tested against the nodes in the cells it passes
+        through.  The route's own ends are skipped, and so are boxes
+        over either end point, which no bend could avoid.
+        """
+        graph = self.graph
+        nodes = graph.nodes
+        node_index = graph.node_index
+        cells = node_index.cells
+        padded_box = self._padded_box
+        sx, sy = points[0], points[1]
+        ex, ey = points[-2], points[-1]
+        near = 0
+        found = set()
+        limit = MAX_AVOIDED - len(avoids)
+        for i in range(0, len(points) - 2, 2):
+            x1, y1, x2, y2 = piece = points[i:i + 4]
+            left, right = (x1, x2) if x1 <= x2 else (x2, x1)
+            top, bottom = (y1, y2) if y1 <= y2 else (y2, y1)
+            crossed = node_index.segment_cells(*piece)
+            if crossed is None:
+                return None  # too long to look along; drawn straight
+            for cell in crossed:
+                bucket = cells.get(cell)
+                if not bucket:
+                    continue
+                near += len(bucket)
+                if near > CROWD_LIMIT:
+                    return None
+                for node_id in bucket:
+                    if node_id in found or node_id in avoids or node_id in key:
+                        continue
+                    bx1, by1, bx2, by2 = box = padded_box(nodes[node_id])
+                    if bx1 > right or bx2 < left or by1 > bottom or by2 < top:
+                        continue
+                    if (bx1 <= sx <= bx2 and by1 <= sy <= by2) or (
+                        bx1 <= ex <= bx2 and by1 <= ey <= by2
+                    ):
+                        continue
+                    if clip_segment(*piece, *box) is not None:
+                        found.add(node_id)
+                        if len(found) > limit:
+                            return found
+        return found
+
+    def _control_point(self, n1, n2, avoids):
+        """A control point that bends the curve clear of every box in `avoids`.
+
+        At a fraction t along the line between the centres, a quadratic
+        curve strays 2t(1-t) times the control point's offset from it, so
+        each box asks for the offset that carries the curve past its
+        farthest corner on either side; the side asking less wins.  None
+        if both ask for more than MAX_BEND.
+        """
+        x1, y1 = n1.x, n1.y
+        dx = n2.x - x1
+        dy = n2.y - y1
+        length = hypot(dx, dy) or 1.0
+        ux = dx / length
+        uy = dy / length
+        nx, ny = -uy, ux
+        left = right = 0.0
+        nodes = self.graph.nodes
+        for node_id in avoids:
+            bx1, by1, bx2, by2 = self._padded_box(nodes[node_id])
+            corners = ((bx1, by1), (bx2, by1), (bx1, by2), (bx2, by2))
+            t = ((bx1 + bx2) / 2 - x1) * ux + ((by1 + by2) / 2 - y1) * uy
+            t = min(max(t / length, MIN_SPREAD), 1 - MIN_SPREAD)
+            spread = 2 * t * (1 - t)
+            offsets = [(cx - x1) * nx + (cy - y1) * ny for cx, cy in corners]
+            left = max(left, max(offsets) / spread)
+            right = max(right, -min(offsets) / spread)
+        if min(left, right) > MAX_BEND * length:
+            return None
+        offset = left if left <= right else -right
+        return x1 + dx / 2 + nx * offset, y1 + dy / 2 + ny * offset
@@ -0,0 +1,186 @@
+"""Full-text search over node labels.
+
+Labels are split into lower-case, accent-free word tokens.  `postings` maps each
+token to the nodes whose label contains it, and a sorted list of the
+distinct tokens answers prefix lookups with a binary search, so the
+word being typed matches every token it starts.  Tokens first seen
+since the list was last sorted wait in a short unsorted list and are
+merged in once it grows, keeping single-node edits O(1).
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+
+TOKEN_RE = re.compile(r"\w+")
+RECENT_LIMIT = 512  # unsorted new tokens tolerated before a merge
+CANDIDATE_LIMIT = 500  # nodes ranked per query at most
+
+
+def tokenize(text):
+    """Distinct lower-case word tokens of `text`, in order.
+
+    Accents are dropped, so "cafe" finds "Café".
+    """
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(
+            ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch)
+        )
+    return tuple(dict.fromkeys(TOKEN_RE.findall(text)))
+
+
+class TextIndex:
+    """Incremental inverted index from label tokens to node ids."""
+
+    def __init__(self):
+        self.postings = {}  # token -> set of node ids
+        self.node_tokens = {}  # node_id -> tokens of its label
+        self._sorted = []  # distinct tokens, sorted; may hold stale ones
+        self._recent = []  # tokens added since the last merge
+
+    def __len__(self):
+        return len(self.node_tokens)
+
+    def add(self, node_id, text):
+        if node_id in self.node_tokens:
+            self.remove(node_id)
+        tokens = tokenize(text)
+        self.node_tokens[node_id] = tokens
+        postings = self.postings
+        for token in tokens:
+            ids = postings.get(token)
+            if ids is None:
+                postings[token] = {node_id}
+                self._recent.append(token)
+            else:
+                ids.add(node_id)
+
+    def add_many(self, items):
+        """Index (node_id, text) pairs, then merge.
+
+        Each distinct label is tokenized once, which is most of the work
+        when a map is loaded: real maps repeat labels.
+        """
+        node_tokens = self.node_tokens
+        postings = self.postings
+        recent = self._recent
+        seen = {}  # label -> tokens
+        for node_id, text in items:
+            if node_id in node_tokens:
+                self.remove(node_id)
+            tokens = seen.get(text)
+            if tokens is None:
+                tokens = seen[text] = tokenize(text)
+            node_tokens[node_id] = tokens
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is None:
+                    postings[token] = {node_id}
+                    recent.append(token)
+                else:
+                    ids.add(node_id)
+        self.merge()
+
+    def remove(self, node_id):
+        tokens = self.node_tokens.pop(node_id, ())
+        postings = self.postings
+        for token in tokens:
+            ids = postings[token]
+            ids.discard(node_id)
+            if not ids:
+                # left in the sorted list; dropped at the next merge
+                del postings[token]
+
+    def clear(self):
+        self.postings.clear()
+        self.node_tokens.clear()
+        self._sorted = []
+        self._recent = []
+
+    def merge(self):
+        """Sort pending tokens into the token list and drop stale ones."""
+        postings = self.postings
+        tokens = [t for t in self._sorted if t in postings]
+        tokens.extend(t for t in self._recent if t in postings)
+        tokens = list(dict.fromkeys(tokens))  # a token can be removed and re-added
+        tokens.sort()
+        self._sorted = tokens
+        self._recent = []
+
+    def completions(self, prefix):
+        """Indexed tokens starting with `prefix`; the exact token comes first."""
+        return list(dict.fromkeys(self._completions(prefix)))
+
+    def _completions(self, prefix):
+        if len(self._recent) > RECENT_LIMIT:
+            self.merge()
+        postings = self.postings
+        if prefix in postings:
+            yield prefix
+        tokens = self._sorted
+        i = bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            token = tokens[i]
+            if token != prefix and token in postings:
+                yield token
+            i += 1
+        for token in self._recent:
+            if token != prefix and token.startswith(prefix) and token in postings:
+                yield token
+
+    def search(self, query, limit=50):
+        """Return up to `limit` node ids whose labels match `query`, best first.
+
+        Every query word must start some word of the label.  Labels where
+        more query words match whole words rank first, then labels with
+        fewer words, then older nodes.  At most CANDIDATE_LIMIT nodes are
+        ranked; they are gathered exact matches first.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        if len(terms) == 1:
+            driver = terms[0]
+            driver_tokens = self._completions(driver)  # consumed lazily
+            others = ()
+        else:
+            postings = self.postings
+            matches = []
+            for term in terms:
+                tokens = self.completions(term)
+                if not tokens:
+                    return []
+                matches.append((sum(len(postings[t]) for t in tokens), term, tokens))
+            # drive the search from the term with the fewest matching nodes
+            matches.sort(key=lambda m: m[0])
+            _, driver, driver_tokens = matches[0]
+            others = [term for _, term, _ in matches[1:]]
+        ranked = self._candidates(driver, driver_tokens, others)
+        ranked.sort()
+        return [node_id for _, _, node_id in ranked[:limit]]
+
+    def _candidates(self, driver, driver_tokens, others):
+        """(rank, word count, node id) for nodes matching every term."""
+        postings = self.postings
+        node_tokens = self.node_tokens
+        ranked = []
+        seen = set()
+        for token in driver_tokens:
+            driver_rank = -1 if token == driver else 0
+            for node_id in postings[token]:
+                if node_id in seen:
+                    continue
+                seen.add(node_id)
+                label = node_tokens[node_id]
+                rank = driver_rank
+                for term in others:
+                    if term in label:
+                        rank -= 1
+                    elif not any(t.startswith(term) for t in label):
+                        break
+                else:
+                    ranked.append((rank, len(label), node_id))
+                    if len(ranked) >= CANDIDATE_LIMIT:
+                        return ranked
+        return ranked
@@ -0,0 +1,339 @@
+"""Uniform-grid spatial index over boxes and line segments."""
+
+from math import floor, hypot, inf
+
+MAX_CELLS = 4096  # cells a shape may occupy before it goes in the long bucket
+
+
+def point_segment_distance(px, py, x1, y1, x2, y2):
+    """Distance from point (px, py) to the segment (x1, y1)-(x2, y2)."""
+    dx = x2 - x1
+    dy = y2 - y1
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return hypot(px - x1, py - y1)
+    t = ((px - x1) * dx + (py - y1) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    return hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+def clip_segment(x1, y1, x2, y2, left, top, right, bottom):
+    """Clip a segment to a rectangle (Liang-Barsky); None if it misses."""
+    t0 = 0.0
+    t1 = 1.0
+    dx = x2 - x1
+    dy = y2 - y1
+    for p, q in ((-dx, x1 - left), (dx, right - x1), (-dy, y1 - top), (dy, bottom - y1)):
+        if p == 0:
+            if q < 0:
+                return None
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+    if t0 > t1:
+        return None
+    return x1 + t0 * dx, y1 + t0 * dy, x1 + t1 * dx, y1 + t1 * dy
+
+
+def point_in_polygon(x, y, points):
+    """Even-odd test of a point against a polygon given as [(x, y), ...]."""
+    inside = False
+    x2, y2 = points[-1]
+    for x1, y1 in points:
+        if (y1 > y) != (y2 > y):
+            cross_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            if x < cross_x:
+                inside = not inside
+        x2, y2 = x1, y1
+    return inside
+
+
+def boxes_intersect(a, b):
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+def rect_difference(a, b):
+    """Split the part of rectangle `a` outside rectangle `b` into rectangles.
+
+    Returns up to four non-overlapping rectangles; `a` itself if the two
+    do not overlap.
+    """
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    if not boxes_intersect(a, b):
+        return [a]
+    parts = []
+    if ay1 < by1:
+        parts.append((ax1, ay1, ax2, by1))
+    if ay2 > by2:
+        parts.append((ax1, by2, ax2, ay2))
+    top = max(ay1, by1)
+    bottom = min(ay2, by2)
+    if ax1 < bx1:
+        parts.append((ax1, top, bx1, bottom))
+    if ax2 > bx2:
+        parts.append((bx2, top, ax2, bottom))
+    return parts
+
+
+class SpatialGrid:
+    """Buckets keys by the grid cells their shapes overlap.
+
+    Boxes are (x1, y1, x2, y2) in world coordinates and occupy every cell
+    they overlap.  Segments occupy only the cells the line passes through,
+    so long diagonal connections do not flood the grid.  Inserting, moving
+    and removing touches only those cells, and a rectangle query visits
+    only the cells inside the rectangle.
+
+    A shape that would occupy more than MAX_CELLS cells, such as a
+    connection to a node far out, goes in a single "long" bucket instead,
+    which every query checks; its cost stays bounded however far it
+    reaches.  Coordinates must be finite.
+    """
+
+    def __init__(self, cell_size=256.0):
+        self.cell_size = float(cell_size)
+        self.cells = {}  # (cx, cy) -> set of keys
+        self.long = set()  # keys of shapes spanning too many cells
+        self.boxes = {}  # key -> (x1, y1, x2, y2) bounding box
+        self._key_cells = {}  # key -> tuple of cells, or None if in `long`
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, key):
+        return key in self.boxes
+
+    def _cell_range(self, x1, y1, x2, y2):
+        size = self.cell_size
+        return floor(x1 / size), floor(y1 / size), floor(x2 / size), floor(y2 / size)
+
+    def _box_cells(self, box):
+        cx1, cy1, cx2, cy2 = self._cell_range(*box)
+        if cx1 == cx2 and cy1 == cy2:
+            return ((cx1, cy1),)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > MAX_CELLS:
+            return None
+        return tuple(
+            (cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1)
+        )
+
+    def segment_cells(self, x1, y1, x2, y2):
+        """Cells crossed by a segment (Amanatides & Woo grid traversal).
+
+        None if that is more than MAX_CELLS cells.
+        """
+        size = self.cell_size
+        cx, cy = floor(x1 / size), floor(y1 / size)
+        end = (floor(x2 / size), floor(y2 / size))
+        if end == (cx, cy):
+            return (end,)  # most connections are short
+        if abs(end[0] - cx) + abs(end[1] - cy) >= MAX_CELLS:
+            return None
+        cells = [(cx, cy)]
+        dx = x2 - x1
+        dy = y2 - y1
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        if dx:
+            t_delta_x = size / abs(dx)
+            t_max_x = ((cx + (step_x > 0)) * size - x1) / dx
+        else:
+            t_delta_x = t_max_x = inf
+        if dy:
+            t_delta_y = size / abs(dy)
+            t_max_y = ((cy + (step_y > 0)) * size - y1) / dy
+        else:
+            t_delta_y = t_max_y = inf
+
+        for _ in range(abs(end[0] - cx) + abs(end[1] - cy)):
+            if t_max_x < t_max_y:
+                cx += step_x
+                t_max_x += t_delta_x
+            else:
+                cy += step_y
+                t_max_y += t_delta_y
+            cells.append((cx, cy))
+        if cells[-1] != end:
+            cells.append(end)
+        return tuple(cells)
+
+    def _place(self, key, box, covered):
+        if covered is None:
+            self.long.add(key)
+        else:
+            cells = self.cells
+            for cell in covered:
+                bucket = cells.get(cell)
+                if bucket is None:
+                    bucket = cells[cell] = set()
+                bucket.add(key)
+        self.boxes[key] = box
+        self._key_cells[key] = covered
+
+    def _move(self, key, box, covered):
+        if key in self.boxes:
+            if self._key_cells[key] == covered:
+                self.boxes[key] = box
+                return
+            self.remove(key)
+        self._place(key, box, covered)
+
+    def insert(self, key, box):
+        if key in self.boxes:
+            self.remove(key)
+        self._place(key, box, self._box_cells(box))
+
+    def insert_many(self, items):
+        """Insert (key, box) pairs for keys not in the grid yet.
+
+        Does what insert() does for each pair, without the per-call
+        overhead, for filling a grid when a map is loaded.
+        """
+        cells = self.cells
+        boxes = self.boxes
+        key_cells = self._key_cells
+        size = self.cell_size
+        for key, box in items:
+            x1, y1, x2, y2 = box
+            cx1 = floor(x1 / size)
+            cy1 = floor(y1 / size)
+            cx2 = floor(x2 / size)
+            cy2 = floor(y2 / size)
+            if cx1 == cx2 and cy1 == cy2:
+                covered = ((cx1, cy1),)
+            else:
+                covered = self._box_cells(box)
+                if covered is None:
+                    self._place(key, box, covered)
+                    continue
+            for cell in covered:
+                bucket = cells.get(cell)
+                if bucket is None:
+                    cells[cell] = {key}
+                else:
+                    bucket.add(key)
+            boxes[key] = box
+            key_cells[key] = covered
+
+    def insert_segments(self, items):
+        """Insert (key, x1, y1, x2, y2) segments for keys not in the grid yet."""
+        cells = self.cells
+        boxes = self.boxes
+        key_cells = self._key_cells
+        segment_cells = self.segment_cells
+        size = self.cell_size
+        for key, x1, y1, x2, y2 in items:
+            cx = floor(x1 / size)
+            cy = floor(y1 / size)
+            box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+            if cx == floor(x2 / size) and cy == floor(y2 / size):
+                covered = ((cx, cy),)
+            else:
+                covered = segment_cells(x1, y1, x2, y2)
+                if covered is None:
+                    self._place(key, box, covered)
+                    continue
+            for cell in covered:
+                bucket = cells.get(cell)
+                if bucket is None:
+                    cells[cell] = {key}
+                else:
+                    bucket.add(key)
+            boxes[key] = box
+            key_cells[key] = covered
+
+    def update(self, key, box):
+        """Move a key to a new box, touching the cell sets only if they change."""
+        old_cells = self._key_cells.get(key)
+        if old_cells:
+            cx1, cy1, cx2, cy2 = self._cell_range(*box)
+            if old_cells[0] == (cx1, cy1) and old_cells[-1] == (cx2, cy2):
+                self.boxes[key] = box
+                return
+        self._move(key, box, self._box_cells(box))
+
+    def insert_segment(self, key, x1, y1, x2, y2):
+        if key in self.boxes:
+            self.remove(key)
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        self._place(key, box, self.segment_cells(x1, y1, x2, y2))
+
+    def update_segment(self, key, x1, y1, x2, y2):
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        self._move(key, box, self.segment_cells(x1, y1, x2, y2))
+
+    def remove(self, key):
+        if self.boxes.pop(key, None) is None:
+            return
+        covered = self._key_cells.pop(key)
+        if covered is None:
+            self.long.discard(key)
+            return
+        cells = self.cells
+        for cell in covered:
+            bucket = cells[cell]
+            bucket.discard(key)
+            if not bucket:
+                del cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.long.clear()
+        self.boxes.clear()
+        self._key_cells.clear()
+
+    def query_rect(self, x1, y1, x2, y2):
+        """Return the set of keys whose bounding boxes intersect the rectangle.
+
+        Segments are matched on the cells they cross, then on their
+        bounding box; callers that need an exact answer for a diagonal
+        segment must check its distance themselves.
+        """
+        boxes = self.boxes
+        cells = self.cells
+        cx1, cy1, cx2, cy2 = self._cell_range(x1, y1, x2, y2)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(cells):
+            # Rectangle covers more cells than are occupied: walk the
+            # occupied cells instead of the rectangle.
+            buckets = [
+                bucket
+                for (cx, cy), bucket in cells.items()
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2
+            ]
+        else:
+            buckets = [
+                bucket
+                for bucket in (
+                    cells.get((cx, cy))
+                    for cx in range(cx1, cx2 + 1)
+                    for cy in range(cy1, cy2 + 1)
+                )
+                if bucket
+            ]
+        if self.long:
+            buckets.append(self.long)
+
+        found = set()
+        for bucket in buckets:
+            for key in bucket:
+                if key in found:
+                    continue
+                bx1, by1, bx2, by2 = boxes[key]
+                if bx1 <= x2 and bx2 >= x1 and by1 <= y2 and by2 >= y1:
+                    found.add(key)
+        return found
+
+    def query_point(self, x, y):
+        """Return the set of keys whose bounding boxes contain the point."""
+        size = self.cell_size
+        bucket = self.cells.get((floor(x / size), floor(y / size)), ())
+        if self.long:
+            bucket = self.long.union(bucket)
+        boxes = self.boxes
+        return {
+            key
+            for key in bucket
+            if boxes[key][0] <= x <= boxes[key][2] and boxes[key][1] <= y <= boxes[key][3]
+        }
@@ -0,0 +1,62 @@
+"""Summary statistics of a map."""
+
+from .graph import node_box
+
+
+def map_stats(graph):
+    """Return a dict of counts and shape measures for `graph`.
+
+    Components are counted over connections in either direction; tree
+    roots, depth and cross links come from the graph's tree index.
+    """
+    nodes = graph.nodes
+    incident = graph.incident
+    tree = graph.tree
+
+    components = 0
+    largest = 0
+    seen = set()
+    for start in nodes:
+        if start in seen:
+            continue
+        components += 1
+        seen.add(start)
+        stack = [start]
+        size = 0
+        while stack:
+            node_id = stack.pop()
+            size += 1
+            for a, b in incident[node_id]:
+                other = b if a == node_id else a
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        largest = max(largest, size)
+
+    depth = 0
+    roots = [n for n in nodes if n not in tree.parent]
+    level = roots
+    while level:
+        level = [c for n in level for c in tree.children_of(n)]
+        if level:
+            depth += 1
+
+    degrees = [len(keys) for keys in incident.values()]
+    stats = {
+        "nodes": len(nodes),
+        "connections": len(graph.edges),
+        "components": components,
+        "largest_component": largest,
+        "isolated_nodes": sum(1 for d in degrees if d == 0),
+        "roots": sum(1 for n in roots if incident[n]),
+        "max_depth": depth,
+        "cross_links": len(graph.edges) - len(tree.parent),
+        "max_degree": max(degrees, default=0),
+        "mean_degree": round(sum(degrees) / len(degrees), 3) if degrees else 0,
+        "distinct_words": len(graph.text_index.postings),
+    }
+    if nodes:
+        boxes = [node_box(n) for n in nodes.values()]
+        stats["width"] = round(max(b[2] for b in boxes) - min(b[0] for b in boxes), 1)
+        stats["height"] = round(max(b[3] for b in boxes) - min(b[1] for b in boxes), 1)
+    return stats
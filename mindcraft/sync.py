@@ -0,0 +1,505 @@
+"""Live sessions: several MindCraft windows editing one map together.
+
+A SyncServer holds the shared map.  Clients send the operation records
+of their edits (see ops.py) in batches, at most one per frame, instead
+of whole maps.  The server applies each batch to its copy, relays it to
+every other client and acknowledges it to the sender.  A client that
+joins late first receives the map as a compressed snapshot, then the
+same stream of batches as everyone else.
+
+Every frame on the wire is a one-byte kind and a four-byte length,
+followed by the payload:
+
+    HELLO     server -> client  {"client": 3, "ids": [start, stop]}
+    SNAPSHOT  server -> client  the map as zlib-compressed .mcmap bytes
+    OPS       client -> server  {"seq": 12, "ops": [...]}
+              server -> client  {"client": 3, "seq": 12, "ops": [...]}
+    ACK       server -> client  {"seq": 12}
+    IDS       client -> server  empty: asks for another block of node ids
+              server -> client  [start, stop]
+
+Records are absolute and idempotent, so windows agree once they apply
+the same records in the server's order.  A client applies its own edits
+at once, so when a batch from someone else arrives, the edits it has
+sent but not yet seen acknowledged were ordered after that batch by the
+server.  The client applies the batch, then those of its own edits that
+touch the same nodes again (see Pending), which ends in the state the
+server has.  New nodes take ids from a block the server hands out to
+each client, so two windows never create the same id.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import queue
+import struct
+import threading
+import zlib
+from collections import deque
+
+from .binmap import dump_binary, load_binary_bytes
+from .graph import Graph, edge_key
+from .mapfile import no_progress
+from .ops import apply_op
+
+HOST = "127.0.0.1"
+PORT = 8765
+CONNECT_TIMEOUT = 10.0  # seconds to wait for the snapshot when joining
+CLOSE_TIMEOUT = 1.0  # seconds to wait for the connection to close when leaving
+ID_BLOCK = 1 << 20  # node ids handed out to a client at a time
+MAX_FRAME = 1 << 30  # largest payload accepted, in bytes
+MAX_BACKLOG = 16 << 20  # unsent bytes after which a slow client is dropped
+SNAPSHOT_LEVEL = 6  # zlib compression level of snapshots
+
+HEADER = struct.Struct("!BI")
+HELLO, SNAPSHOT, OPS, ACK, IDS = b"hsoai"
+
+RESETS = ("clear", "restore")
+
+
+def frame(kind, payload=b""):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+def _json(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+async def read_frame(reader):
+    """Return (kind, payload) for the next frame."""
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes is too large")
+    return kind, await reader.readexactly(length)
+
+
+def encode_snapshot(graph):
+    return zlib.compress(dump_binary(graph), SNAPSHOT_LEVEL)
+
+
+def decode_snapshot(data, progress=no_progress):
+    return load_binary_bytes(zlib.decompress(data), progress)
+
+
+def op_nodes(op):
+    """Ids of the nodes an operation record touches (not for resets)."""
+    kind = op["op"]
+    if kind == "move_many":
+        return {move[0] for move in op["moves"]}
+    if kind in ("connect", "disconnect"):
+        return {op["from"], op["to"]}
+    return {op["id"]}
+
+
+class Outbox:
+    """Local edits waiting for the next batch.
+
+    Like the journal, a run of moves keeps only the last position of each
+    node; the run is sent as a single "move" or "move_many" record.
+    """
+
+    def __init__(self):
+        self._ops = []
+        self._moves = {}  # node_id -> [node_id, x, y] in the current run
+
+    def __bool__(self):
+        return bool(self._ops or self._moves)
+
+    def append(self, op):
+        kind = op["op"]
+        if kind == "move":
+            self._moves[op["id"]] = [op["id"], op["x"], op["y"]]
+        elif kind == "move_many":
+            for move in op["moves"]:
+                self._moves[move[0]] = move
+        else:
+            self._end_run()
+            self._ops.append(op)
+
+    def take(self):
+        """Return the batch and start a new one."""
+        self._end_run()
+        ops = self._ops
+        self._ops = []
+        return ops
+
+    def _end_run(self):
+        moves = self._moves
+        if not moves:
+            return
+        if len(moves) == 1:
+            ((node_id, x, y),) = moves.values()
+            self._ops.append({"op": "move", "id": node_id, "x": x, "y": y})
+        else:
+            self._ops.append({"op": "move_many", "moves": list(moves.values())})
+        self._moves = {}
+
+
+class Pending:
+    """Batches a client has sent that the server has not acknowledged."""
+
+    def __init__(self):
+        self._batches = deque()  # (seq, ops, resets)
+
+    def __len__(self):
+        return len(self._batches)
+
+    def sent(self, seq, ops):
+        resets = any(op["op"] in RESETS for op in ops)
+        self._batches.append((seq, ops, resets))
+
+    def acked(self, seq):
+        if not self._batches or self._batches[0][0] != seq:
+            raise ValueError(f"unexpected acknowledgement {seq}")
+        self._batches.popleft()
+
+    def rebase(self, ops):
+        """The records to apply for a batch `ops` from another client.
+
+        That batch comes before every pending one in the server's order.
+        Pending records touching the nodes it touches are applied again
+        after it, trimmed to those nodes.  If a pending batch clears or
+        replaces the map, the remote batch is overwritten anyway and
+        nothing is applied.
+
+        A connection is keyed by its two ends, whatever its direction,
+        and a node keeps the first parent it is given.  So before a
+        remote record about a pair that a pending "connect" joined, or a
+        remote "connect" to the same child, the local connection is
+        removed: it did not exist yet at that point of the server's
+        order, and is made again with the pending records.
+        """
+        batches = self._batches
+        if not batches:
+            return ops
+        if any(resets for _, _, resets in batches):
+            return []
+        again = []
+        if any(op["op"] in RESETS for op in ops):
+            for _, batch, _ in batches:
+                again.extend(batch)
+            return ops + again
+
+        ops = self._unlinked(ops)
+        touched = set()
+        for op in ops:
+            touched |= op_nodes(op)
+        for _, batch, _ in batches:
+            for op in batch:
+                if op["op"] == "move_many":
+                    moves = [move for move in op["moves"] if move[0] in touched]
+                    if moves:
+                        again.append({"op": "move_many", "moves": moves})
+                elif not touched.isdisjoint(op_nodes(op)):
+                    again.append(op)
+        return ops + again
+
+    def _unlinked(self, ops):
+        """`ops`, with a "disconnect" of each pending local connection
+        ahead of the first remote record that comes before it."""
+        joined = {}  # edge key -> pending connect record
+        for _, batch, _ in self._batches:
+            for op in batch:
+                if op["op"] == "connect":
+                    joined[edge_key(op["from"], op["to"])] = op
+        if not joined:
+            return ops
+        result = []
+        for op in ops:
+            if op["op"] in ("connect", "disconnect"):
+                key = edge_key(op["from"], op["to"])
+                for other, local in list(joined.items()):
+                    # the same pair, or the same child to hang under a parent
+                    if other == key or op["op"] == "connect" and local["to"] == op["to"]:
+                        del joined[other]
+                        result.append(
+                            {"op": "disconnect", "from": local["from"], "to": local["to"]}
+                        )
+            result.append(op)
+        return result
+
+
+# -------------------------------------------------------------------------
+# Server
+# -------------------------------------------------------------------------
+
+
+class SyncServer:
+    """Holds the shared map and relays edits between the clients.
+
+    Runs on an asyncio loop; every batch is applied and relayed before
+    the next is read, which fixes the order all clients end up in.
+    """
+
+    def __init__(self, graph=None):
+        self.graph = graph if graph is not None else Graph()
+        self.clients = {}  # client number -> StreamWriter
+        self.batches = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._next_client = 1
+        self._next_id = self.graph.max_node_id() + 1
+        self._server = None
+
+    async def start(self, host=HOST, port=PORT):
+        """Start listening; returns the port (useful with port 0)."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        for writer in list(self.clients.values()):
+            writer.close()
+        await self._server.wait_closed()
+
+    def _id_block(self):
+        # ids already on the map (from a restore, say) are skipped too
+        start = max(self._next_id, self.graph.max_node_id() + 1)
+        self._next_id = start + ID_BLOCK
+        return [start, self._next_id]
+
+    def _send(self, writer, data):
+        self.bytes_out += len(data)
+        writer.write(data)
+
+    async def _serve(self, reader, writer):
+        client = self._next_client
+        self._next_client += 1
+        # nothing is awaited between the snapshot and joining the relay,
+        # so the client misses no batch and gets none twice
+        self._send(writer, frame(HELLO, _json({"client": client, "ids": self._id_block()})))
+        self._send(writer, frame(SNAPSHOT, encode_snapshot(self.graph)))
+        self.clients[client] = writer
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                self.bytes_in += HEADER.size + len(payload)
+                if kind == OPS:
+                    self._relay(client, payload)
+                elif kind == IDS:
+                    self._send(writer, frame(IDS, _json(self._id_block())))
+                else:
+                    raise ValueError(f"unexpected frame kind {kind}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # the client went away
+        except (KeyError, TypeError, ValueError):
+            pass  # a malformed frame; the client is dropped
+        finally:
+            self.clients.pop(client, None)
+            writer.close()
+
+    def _relay(self, client, payload):
+        if payload[:1] != b"{":
+            raise ValueError("malformed batch")
+        batch = json.loads(payload)
+        graph = self.graph
+        for op in batch["ops"]:
+            apply_op(graph, op)
+        self.batches += 1
+        # the ops are passed on as received rather than encoded again
+        out = frame(OPS, b'{"client":%d,' % client + payload[1:])
+        ack = frame(ACK, _json({"seq": batch["seq"]}))
+        for other, writer in list(self.clients.items()):
+            if other == client:
+                self._send(writer, ack)
+            elif writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                # too far behind to catch up; it can join again
+                self.clients.pop(other)
+                writer.close()
+            else:
+                self._send(writer, out)
+
+
+def serve(graph=None, host=HOST, port=PORT, ready=None):
+    """Run a SyncServer until interrupted; returns its map.
+
+    `ready(port)`, if given, is called once the server listens.
+    """
+    server = SyncServer(graph)
+
+    async def main():
+        bound = await server.start(host, port)
+        if ready is not None:
+            ready(bound)
+        await server._server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    return server.graph
+
+
+# -------------------------------------------------------------------------
+# Client
+# -------------------------------------------------------------------------
+
+
+class SyncClient:
+    """The client end of a session, for a UI thread.
+
+    The connection is served by an asyncio loop on a thread of its own;
+    the UI thread never blocks on it.  It calls `send(op)` for every
+    local edit, and once per frame `flush()` to send them as one batch,
+    then `poll()` to collect what arrived:
+
+        ("ops", records, (client, seq))   records to apply, in order
+        ("closed", reason)                the session ended
+
+    `bytes_sent` and `bytes_received` count everything on the wire.
+    """
+
+    def __init__(self):
+        self.client_id = None
+        self.outbox = Outbox()
+        self.pending = Pending()
+        self.seq = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._incoming = queue.Queue()
+        self._ids = deque()  # [next, stop] blocks of node ids
+        self._asked_ids = False
+        self._loop = None
+        self._writer = None
+        self._receiver = None
+        self._closed = False
+
+    def connect(self, host=HOST, port=PORT, progress=no_progress):
+        """Join the session at host:port and return a copy of its map."""
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        future = asyncio.run_coroutine_threadsafe(self._open(host, port), self._loop)
+        try:
+            hello, snapshot = future.result(CONNECT_TIMEOUT)
+            graph = decode_snapshot(snapshot, progress)
+        except BaseException:
+            # cancelled, timed out or sent a bad snapshot: nothing may keep
+            # the connection, or the server would go on relaying to it
+            future.cancel()
+            self.close()
+            raise
+        self.client_id = hello["client"]
+        self._ids.append(hello["ids"])
+        return graph
+
+    async def _open(self, host, port):
+        reader, self._writer = await asyncio.open_connection(host, port)
+        hello = await self._expect(reader, HELLO)
+        snapshot = await self._expect(reader, SNAPSHOT)
+        self._receiver = self._loop.create_task(self._receive(reader))
+        return json.loads(hello), snapshot
+
+    async def _expect(self, reader, kind):
+        got, payload = await read_frame(reader)
+        self.bytes_received += HEADER.size + len(payload)
+        if got != kind:
+            raise ValueError("not a MindCraft session")
+        return payload
+
+    async def _receive(self, reader):
+        incoming = self._incoming
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                self.bytes_received += HEADER.size + len(payload)
+                incoming.put((kind, payload))
+        except asyncio.IncompleteReadError:
+            incoming.put(("closed", "the server closed the connection"))
+        except (ConnectionError, ValueError) as e:
+            incoming.put(("closed", str(e)))
+
+    def _write(self, data):
+        self.bytes_sent += len(data)
+        self._loop.call_soon_threadsafe(self._writer.write, data)
+
+    def send(self, op):
+        """Queue a local edit for the next batch."""
+        self.outbox.append(op)
+
+    def flush(self):
+        """Send the queued edits as one batch; returns its seq, or None."""
+        if self._closed or not self.outbox:
+            return None
+        ops = self.outbox.take()
+        self.seq += 1
+        self.pending.sent(self.seq, ops)
+        self._write(frame(OPS, _json({"seq": self.seq, "ops": ops})))
+        return self.seq
+
+    def poll(self):
+        """Return the events that arrived since the last call."""
+        events = []
+        incoming = self._incoming
+        while not self._closed:
+            try:
+                kind, payload = incoming.get_nowait()
+            except queue.Empty:
+                break
+            if kind == OPS:
+                batch = json.loads(payload)
+                ops = self.pending.rebase(batch["ops"])
+                events.append(("ops", ops, (batch["client"], batch["seq"])))
+            elif kind == ACK:
+                self.pending.acked(json.loads(payload)["seq"])
+            elif kind == IDS:
+                self._ids.append(json.loads(payload))
+                self._asked_ids = False
+            else:
+                events.append(("closed", payload))
+                self.close()
+        return events
+
+    def new_id(self, nodes):
+        """A node id no other client of the session will use.
+
+        Another block is asked for once half of the last one is used.
+        """
+        ids = self._ids
+        while ids:
+            block = ids[0]
+            node_id, stop = block
+            if node_id >= stop:
+                ids.popleft()
+                continue
+            block[0] = node_id + 1
+            if len(ids) == 1 and stop - node_id < ID_BLOCK // 2 and not self._asked_ids:
+                self._asked_ids = True
+                self._write(frame(IDS))
+            if node_id not in nodes:
+                return node_id
+        # out of ids before the next block arrived; this may collide
+        # with a node another window is creating at the same moment
+        return max(nodes, default=0) + 1
+
+    def close(self):
+        """Leave the session."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._loop is None:
+            return
+        done = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            done.result(CLOSE_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _shutdown(self):
+        if self._receiver is not None:
+            self._receiver.cancel()
+            try:
+                await self._receiver
+            except asyncio.CancelledError:
+                pass
+        if self._writer is not None:
+            self._writer.close()
+
+
+def join(host=HOST, port=PORT, progress=no_progress):
+    """Connect a SyncClient and return (client, graph).
+
+    Blocks until the snapshot has arrived, so call it off the UI thread.
+    """
+    client = SyncClient()
+    return client, client.connect(host, port, progress)
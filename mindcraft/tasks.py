@@ -0,0 +1,105 @@
+"""Running slow work off the UI thread."""
+
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+class Cancelled(Exception):
+    """Raised inside a background task once cancellation was requested."""
+
+
+class BackgroundTask:
+    """Runs `fn(*args, progress=...)` on a worker thread.
+
+    The worker never touches the UI: it reports through `messages`, a
+    queue the UI polls (for Tk, from an `after` callback).  Messages are
+    tuples:
+
+        ("progress", stage, done, total)
+        ("done", result)
+        ("error", exception)
+        ("cancelled", None)
+
+    `fn` should call `progress(stage, done, total)` regularly; the call
+    raises Cancelled after `cancel()`, which is how the work stops early.
+    """
+
+    def __init__(self, fn, *args):
+        self.messages = queue.Queue()
+        self._fn = fn
+        self._args = args
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def poll(self):
+        """Return the messages queued so far without blocking."""
+        out = []
+        while True:
+            try:
+                out.append(self.messages.get_nowait())
+            except queue.Empty:
+                return out
+
+    def _progress(self, stage, done, total):
+        if self._cancel.is_set():
+            raise Cancelled()
+        self.messages.put(("progress", stage, done, total))
+
+    def _run(self):
+        try:
+            result = self._fn(*self._args, progress=self._progress)
+        except Cancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as e:
+            self.messages.put(("error", e))
+        else:
+            self.messages.put(("done", result))
+
+
+def run_in_processes(jobs, func, *arg_lists, progress=None, stage="working"):
+    """Map `func` over the argument lists, in a process pool when it pays off.
+
+    `func` must be a top-level function so the pool can send it to its
+    processes.  `jobs` is the number of processes (0 for one per CPU, 1
+    to run here); with a single CPU or call, the calls run here too.
+    Results come back in argument order; `progress` is called as each
+    one arrives, and if it raises (Cancelled), the calls not yet started
+    are dropped.
+    """
+    calls = list(zip(*arg_lists))
+    count = len(calls)
+    workers = min(jobs or os.cpu_count() or 1, count)
+    if workers < 2:
+        results = []
+        for i, args in enumerate(calls):
+            if progress is not None:
+                progress(stage, i, count)
+            results.append(func(*args))
+        return results
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(func, *args): i for i, args in enumerate(calls)}
+        results = [None] * count
+        for done, future in enumerate(as_completed(futures)):
+            if progress is not None:
+                progress(stage, done, count)
+            results[futures[future]] = future.result()
+        return results
+    finally:
+        pool.shutdown(cancel_futures=True)
@@ -0,0 +1,235 @@
+"""Measured label widths for sizing nodes, cached by font and string.
+
+A node box is sized from the pixel width of its label, wrapped to at
+most NODE_MAX_WIDTH.  Exact widths come from the font engine (in the app,
+a Tk font's measure()), which costs a round trip into Tcl per call; from
+the loader thread tkinter additionally has to hand the call over to the
+UI thread.  So widths are kept in an LRU keyed by (font, string), and a
+label is laid out from the widths of its words: a map with 100k
+distinct labels built from a few thousand distinct words only measures
+those words.
+
+This module never imports tkinter.  Until the UI installs a TextMetrics
+built on a real font, widths are estimated from character classes.
+Estimating is cheaper than a cache lookup, so estimated widths and
+layouts are not cached at all.
+"""
+
+import threading
+import unicodedata
+from collections import OrderedDict
+
+TEXT_FONT = ("SF Pro Text", 11)
+NODE_HEIGHT = 40
+NODE_MIN_WIDTH = 70
+NODE_MAX_WIDTH = 220
+NODE_PAD_X = 16  # gap between the label and the left/right box edges
+NODE_PAD_Y = 12  # gap between the label and the top/bottom box edges
+CACHE_SIZE = 1 << 16  # entries per cache
+
+
+def estimate_width(font, text):
+    """Approximate pixel width of `text` without a font engine.
+
+    East Asian wide characters count double and combining marks count
+    nothing, so multi-byte labels are not sized by their code point count.
+    """
+    size = font[1]
+    if text.isascii():
+        return round(len(text) * size * 0.6)
+    units = 0
+    for ch in text:
+        if ch < "\u0300":
+            units += 1
+        elif unicodedata.combining(ch):
+            continue
+        elif unicodedata.east_asian_width(ch) in "WF":
+            units += 2
+        else:
+            units += 1
+    return round(units * size * 0.6)
+
+
+def estimate_line_height(font):
+    return round(font[1] * 1.4)
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping; `capacity` 0 disables caching.
+
+    Lookups take no lock: each dict operation is atomic on its own, and
+    a key evicted between finding it and marking it recent is simply not
+    marked.  Only insertion, which evicts, is locked.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entries = self._entries
+        value = entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            entries.move_to_end(key)
+        except KeyError:
+            pass  # evicted by another thread meanwhile
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TextMetrics:
+    """Node sizes and wrapped labels for one font.
+
+    `measure(font, text)` returns the width of `text` in pixels and
+    `line_height(font)` the distance between baselines; both default to
+    estimates.  `line_height` is asked once, here, so a Tk-backed font is
+    created on the thread that builds this object.  Widths and layouts
+    are cached unless `measure` is the estimate.
+    """
+
+    def __init__(
+        self,
+        measure=estimate_width,
+        line_height=estimate_line_height,
+        font=TEXT_FONT,
+        capacity=CACHE_SIZE,
+    ):
+        self.measure = measure
+        self.font = font
+        self.line_height = line_height(font)
+        self.cached = measure is not estimate_width
+        self.widths = LRUCache(capacity)  # (font, string) -> pixels
+        self.layouts = LRUCache(capacity)  # (font, label) -> (w, h, wrapped)
+        self._space = self.width(" ")
+
+    def width(self, text):
+        """Cached pixel width of `text`, measured as a single run."""
+        if not self.cached:
+            return self.measure(self.font, text)
+        key = (self.font, text)
+        width = self.widths.get(key)
+        if width is None:
+            width = self.measure(self.font, text)
+            self.widths.put(key, width)
+        return width
+
+    def layout(self, text):
+        """Return (width, height, wrapped) for a node labelled `text`.
+
+        `wrapped` is the label with line breaks inserted so no line is
+        wider than the box allows; it is what the canvas should draw.
+        """
+        if self.cached:
+            key = (self.font, text)
+            result = self.layouts.get(key)
+            if result is not None:
+                return result
+        lines, widest = self.wrap(text, NODE_MAX_WIDTH - 2 * NODE_PAD_X)
+        width = min(NODE_MAX_WIDTH, max(NODE_MIN_WIDTH, widest + 2 * NODE_PAD_X))
+        height = max(NODE_HEIGHT, len(lines) * self.line_height + 2 * NODE_PAD_Y)
+        result = (width, height, "\n".join(lines))
+        if self.cached:
+            self.layouts.put(key, result)
+        return result
+
+    def wrap(self, text, max_width):
+        """Greedily break `text` into lines no wider than `max_width`.
+
+        Returns (lines, widest line width).  Existing line breaks are
+        kept, runs of spaces collapse, and a word too long for a line is
+        split between characters.
+        """
+        width = self.width
+        space = self._space
+        lines = []
+        widest = 0
+        for paragraph in text.split("\n"):
+            line = []
+            line_width = 0
+            for word in paragraph.split():
+                word_width = width(word)
+                if word_width > max_width:
+                    if line:
+                        lines.append(" ".join(line))
+                        widest = max(widest, line_width)
+                    pieces = self._split_word(word, max_width)
+                    for piece, piece_width in pieces[:-1]:
+                        lines.append(piece)
+                        widest = max(widest, piece_width)
+                    word, word_width = pieces[-1]
+                    line = [word]
+                    line_width = word_width
+                elif not line:
+                    line = [word]
+                    line_width = word_width
+                elif line_width + space + word_width <= max_width:
+                    line.append(word)
+                    line_width += space + word_width
+                else:
+                    lines.append(" ".join(line))
+                    widest = max(widest, line_width)
+                    line = [word]
+                    line_width = word_width
+            lines.append(" ".join(line))
+            widest = max(widest, line_width)
+        return lines, widest
+
+    def _split_word(self, word, max_width):
+        width = self.width
+        pieces = []
+        start = 0
+        piece_width = 0
+        for i, ch in enumerate(word):
+            ch_width = width(ch)
+            if i > start and piece_width + ch_width > max_width:
+                pieces.append((word[start:i], piece_width))
+                start = i
+                piece_width = 0
+            piece_width += ch_width
+        pieces.append((word[start:], piece_width))
+        return pieces
+
+
+_metrics = TextMetrics()
+
+
+def install(metrics):
+    """Make `metrics` the one node_size() and node_label() use."""
+    global _metrics
+    _metrics = metrics
+
+
+def text_metrics():
+    return _metrics
+
+
+def node_size(text):
+    """(width, height) of a node box for its label."""
+    width, height, _ = _metrics.layout(text)
+    return width, height
+
+
+def node_label(text):
+    """The label as drawn, with line breaks for wrapping."""
+    return _metrics.layout(text)[2]
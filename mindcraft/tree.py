@@ -0,0 +1,213 @@
+"""Parent/child structure of a map, for collapsing subtrees.
+
+A connection makes its "to" node a child of its "from" node, unless the
+child already has a parent or the connection would close a cycle; such
+connections are cross links and do not change the tree.  Subtree sizes
+are kept up to date as connections come and go, so a collapsed node
+can show how many nodes it hides without walking them.
+
+A node is hidden while any of its ancestors is collapsed.  Every method
+that changes that returns the nodes whose visibility changed, so the
+Graph can take them out of (or put them back into) its spatial indexes.
+"""
+
+
+class TreeIndex:
+    def __init__(self):
+        self.parent = {}  # node_id -> parent node_id (tree roots are absent)
+        self.children = {}  # node_id -> set of child ids (leaves are absent)
+        self.size = {}  # node_id -> nodes in its subtree, itself included
+        self.collapsed = set()
+        self.hidden = set()  # nodes under a collapsed ancestor
+
+    def add_node(self, node_id):
+        self.size.setdefault(node_id, 1)
+
+    def load(self, node_ids, links):
+        """Fill an empty index with `node_ids` and (child, parent) `links`.
+
+        The same tree as add_node for every node and then attach for
+        every link in order, but subtree sizes are summed once at the
+        end instead of walking up to the root for each link.
+        """
+        parent = self.parent
+        children = self.children
+        for child, up in links:
+            if child in parent or child == up:
+                continue
+            if child in children and self.is_ancestor(child, up):
+                continue
+            parent[child] = up
+            kids = children.get(up)
+            if kids is None:
+                kids = children[up] = set()
+            kids.add(child)
+
+        size = self.size
+        size.update(dict.fromkeys(node_ids, 1))
+        # every node after its parent, then sizes added up from the leaves
+        order = [node_id for node_id in size if node_id not in parent]
+        no_children = ()
+        for node_id in order:
+            order.extend(children.get(node_id, no_children))
+        for node_id in reversed(order):
+            up = parent.get(node_id)
+            if up is not None:
+                size[up] += size[node_id]
+
+    def children_of(self, node_id):
+        return self.children.get(node_id, ())
+
+    def remove_node(self, node_id):
+        """Forget a node that has no connections left."""
+        self.children.pop(node_id, None)
+        self.size.pop(node_id, None)
+        self.collapsed.discard(node_id)
+        self.hidden.discard(node_id)
+
+    def clear(self):
+        self.parent.clear()
+        self.children.clear()
+        self.size.clear()
+        self.collapsed.clear()
+        self.hidden.clear()
+
+    def descendant_count(self, node_id):
+        return self.size[node_id] - 1
+
+    def subtree(self, node_id):
+        """`node_id` and every node below it."""
+        children = self.children
+        no_children = ()
+        found = []
+        stack = [node_id]
+        while stack:
+            node_id = stack.pop()
+            found.append(node_id)
+            stack.extend(children.get(node_id, no_children))
+        return found
+
+    def root(self, node_id):
+        """The root of the tree holding `node_id`; O(depth)."""
+        parent = self.parent
+        up = parent.get(node_id)
+        while up is not None:
+            node_id = up
+            up = parent.get(node_id)
+        return node_id
+
+    def is_ancestor(self, a, b):
+        """True if `a` is `b` or one of its ancestors; O(depth)."""
+        parent = self.parent
+        while b is not None:
+            if b == a:
+                return True
+            b = parent.get(b)
+        return False
+
+    def attach(self, child, parent):
+        """Hang `child` (a root) under `parent`.
+
+        Returns (newly hidden nodes, newly shown nodes), or None when the
+        link would make a cycle and was not made.
+        """
+        if child in self.parent or child == parent:
+            return None
+        # a leaf cannot be an ancestor; loading a map attaches mostly leaves
+        if child in self.children and self.is_ancestor(child, parent):
+            return None
+        self.parent[child] = parent
+        kids = self.children.get(parent)
+        if kids is None:
+            kids = self.children[parent] = set()
+        kids.add(child)
+        self._add_size(parent, self.size[child])
+        return self._refresh(child)
+
+    def detach(self, child):
+        """Make `child` a root; returns (newly hidden, newly shown)."""
+        parent = self.parent.pop(child, None)
+        if parent is None:
+            return [], []
+        kids = self.children[parent]
+        kids.discard(child)
+        if not kids:
+            del self.children[parent]
+        self._add_size(parent, -self.size[child])
+        return self._refresh(child)
+
+    def _add_size(self, node_id, delta):
+        size = self.size
+        parent = self.parent
+        while node_id is not None:
+            size[node_id] += delta
+            node_id = parent.get(node_id)
+
+    def collapse(self, node_id):
+        """Hide the subtree below `node_id`; returns the newly hidden nodes."""
+        if node_id in self.collapsed:
+            return []
+        self.collapsed.add(node_id)
+        if node_id in self.hidden:
+            return []  # already hidden by an ancestor
+        return self._set_hidden(self.children_of(node_id), True)
+
+    def expand(self, node_id):
+        """Show the subtree below `node_id`; returns the newly shown nodes.
+
+        Parts of it below other collapsed nodes stay hidden.
+        """
+        if node_id not in self.collapsed:
+            return []
+        self.collapsed.discard(node_id)
+        if node_id in self.hidden:
+            return []
+        return self._set_hidden(self.children_of(node_id), False)
+
+    def collapsed_ancestors(self, node_id):
+        """The collapsed nodes that keep `node_id` hidden, nearest first."""
+        found = []
+        node_id = self.parent.get(node_id)
+        while node_id is not None:
+            if node_id in self.collapsed:
+                found.append(node_id)
+            node_id = self.parent.get(node_id)
+        return found
+
+    def _refresh(self, node_id):
+        """Recompute the visibility of a subtree after its parent changed."""
+        if not self.collapsed:
+            return [], []  # nothing is hidden
+        parent = self.parent.get(node_id)
+        hidden = parent is not None and (parent in self.collapsed or parent in self.hidden)
+        if hidden == (node_id in self.hidden):
+            return [], []
+        changed = self._set_hidden([node_id], hidden)
+        return (changed, []) if hidden else ([], changed)
+
+    def _set_hidden(self, roots, hidden):
+        """Set the visibility of `roots` and their subtrees; return the nodes changed.
+
+        Hiding stops at nodes that are already hidden, showing stops below
+        collapsed nodes, so each call only walks nodes that change.
+        """
+        children = self.children
+        no_children = ()
+        collapsed = self.collapsed
+        flags = self.hidden
+        changed = []
+        stack = list(roots)
+        while stack:
+            node_id = stack.pop()
+            if hidden:
+                if node_id in flags:
+                    continue
+                flags.add(node_id)
+                changed.append(node_id)
+                stack.extend(children.get(node_id, no_children))
+            else:
+                flags.discard(node_id)
+                changed.append(node_id)
+                if node_id not in collapsed:
+                    stack.extend(children.get(node_id, no_children))
+        return changed
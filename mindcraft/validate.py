@@ -0,0 +1,123 @@
+"""Consistency checks for map files.
+
+The loaders are forgiving: they renumber clashing ids and drop
+connections they cannot resolve.  These checks report what they would
+have to fix, so a map can be verified before it is opened or shared.
+"""
+
+import json
+from math import isfinite
+
+from .binmap import HEADER, is_binary_map, load_binary
+
+MAX_REPORTED = 20  # problems of one kind listed before summarizing
+
+
+class _Problems:
+    """Collects messages, listing only the first few of each kind."""
+
+    def __init__(self):
+        self.messages = []
+        self.counts = {}
+
+    def add(self, kind, message):
+        count = self.counts.get(kind, 0) + 1
+        self.counts[kind] = count
+        if count <= MAX_REPORTED:
+            self.messages.append(message)
+
+    def result(self):
+        out = list(self.messages)
+        for kind, count in self.counts.items():
+            if count > MAX_REPORTED:
+                out.append(f"... {count - MAX_REPORTED} more {kind}")
+        return out
+
+
+def check_data(data):
+    """Return a list of problems in map data in the JSON layout ([] if none)."""
+    problems = _Problems()
+    if not isinstance(data, dict):
+        return ["top level is not an object"]
+    nodes = data.get("nodes", [])
+    connections = data.get("connections", [])
+    if not isinstance(nodes, list) or not isinstance(connections, list):
+        return ['"nodes" and "connections" must be lists']
+
+    ids = set()
+    for i, n in enumerate(nodes):
+        if not isinstance(n, dict):
+            problems.add("malformed nodes", f"node #{i} is not an object")
+            continue
+        node_id = n.get("id")
+        if type(node_id) is not int:
+            problems.add("bad ids", f"node #{i} has no integer id ({node_id!r})")
+        elif node_id in ids:
+            problems.add("duplicate ids", f"node id {node_id} is used more than once")
+        else:
+            ids.add(node_id)
+        for axis in ("x", "y"):
+            value = n.get(axis)
+            if value is None:
+                problems.add("missing coordinates", f"node {node_id!r} has no {axis}")
+            elif type(value) not in (int, float) or not isfinite(value):
+                problems.add("bad coordinates", f"node {node_id!r} has {axis} = {value!r}")
+        if not isinstance(n.get("text", ""), str):
+            problems.add("bad labels", f"node {node_id!r} has a non-string text")
+
+    seen = set()
+    for i, c in enumerate(connections):
+        if not isinstance(c, dict):
+            problems.add("malformed connections", f"connection #{i} is not an object")
+            continue
+        a = c.get("from")
+        b = c.get("to")
+        if type(a) is not int or type(b) is not int:
+            problems.add(
+                "bad endpoints", f"connection #{i} ({a!r} -> {b!r}) has a non-integer end"
+            )
+        elif a not in ids or b not in ids:
+            problems.add(
+                "dangling connections", f"connection #{i} ({a!r} -> {b!r}) names a missing node"
+            )
+        elif a == b:
+            problems.add("self connections", f"connection #{i} connects node {a} to itself")
+        else:
+            key = (a, b) if a <= b else (b, a)
+            if key in seen:
+                problems.add("duplicate connections", f"connection #{i} duplicates {a} - {b}")
+            seen.add(key)
+    return problems.result()
+
+
+def check_map(path):
+    """Return a list of problems with the map file at `path` ([] if none)."""
+    try:
+        if is_binary_map(path):
+            return _check_binary(path)
+        with open(path, "rb") as f:
+            data = json.loads(f.read().decode("utf-8"))
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return [f"cannot be read: {e}"]
+    return check_data(data)
+
+
+def _check_binary(path):
+    # the binary writer only stores what a Graph holds, so anything the
+    # loader drops points at a damaged file
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return [f"truncated header ({len(header)} of {HEADER.size} bytes)"]
+    _, _, node_count, edge_count, _, _ = HEADER.unpack(header)
+    graph = load_binary(path)  # rejects non-finite positions itself
+    problems = []
+    if len(graph.nodes) != node_count:
+        problems.append(
+            f"header lists {node_count} nodes but {len(graph.nodes)} distinct ids were read"
+        )
+    if len(graph.edges) != edge_count:
+        problems.append(
+            f"header lists {edge_count} connections but {len(graph.edges)} are valid"
+        )
+    return problems
@@ -0,0 +1,101 @@
+import random
+import unittest
+
+from mindcraft import analytics
+from mindcraft.analytics import Analytics
+from mindcraft.graph import Graph, Node
+
+
+def components(graph, stats):
+    """Every component as a sorted list of node ids, orphans included."""
+    seen = set()
+    found = []
+    for node_id in graph.nodes:
+        if node_id not in seen:
+            nodes = stats.component_of(node_id)
+            seen |= nodes
+            found.append(sorted(nodes))
+    return sorted(found)
+
+
+class AnalyticsTest(unittest.TestCase):
+    def assertMatchesRebuild(self, graph, stats):
+        fresh = Analytics(graph)
+        self.assertEqual(components(graph, stats), components(graph, fresh))
+        self.assertEqual(stats.orphans, fresh.orphans)
+        self.assertEqual(stats.degrees, fresh.degrees)
+        self.assertEqual(stats.component_count, fresh.component_count)
+        self.assertEqual(stats.cycle_count, fresh.cycle_count)
+        self.assertEqual(set(stats.label), set(fresh.label))
+        for label, roots in stats.roots.items():
+            nodes = stats.component_of(next(iter(roots)))
+            self.assertEqual(stats.sizes[label], len(nodes))
+            crossing = {
+                key for node_id in nodes for key in graph.incident[node_id]
+                if stats._is_cross(key)
+            }
+            self.assertEqual(stats.cross[label], crossing)
+        self.assertEqual(
+            [size for _, size in stats.largest_components(3)],
+            [size for _, size in fresh.largest_components(3)],
+        )
+        self.assertEqual(
+            [size for _, size in stats.largest_trees(3)],
+            [size for _, size in fresh.largest_trees(3)],
+        )
+
+    def random_edits(self, seed):
+        rng = random.Random(seed)
+        graph = Graph()
+        stats = graph.track_analytics()
+        next_id = 0
+        for step in range(400):
+            r = rng.random()
+            ids = list(graph.nodes)
+            if r < 0.3 or len(ids) < 3:
+                next_id += 1
+                graph.add_node(Node(next_id, 0.0, 0.0, 10.0, 10.0, "x"))
+            elif r < 0.65:
+                graph.add_edge(*rng.sample(ids, 2))
+            elif r < 0.85 and graph.edges:
+                connection = graph.edges[rng.choice(list(graph.edges))]
+                graph.remove_edge(connection.from_id, connection.to_id)
+            elif r < 0.995:
+                graph.remove_node(rng.choice(ids))
+            else:
+                graph.clear()
+            if step % 10 == 0:
+                self.assertMatchesRebuild(graph, stats)
+        self.assertMatchesRebuild(graph, stats)
+
+    def test_random_edits_match_a_rebuild(self):
+        for seed in range(10):
+            self.random_edits(seed)
+
+    def test_random_edits_splitting_by_search(self):
+        limit = analytics.CROSS_SCAN_LIMIT
+        analytics.CROSS_SCAN_LIMIT = 0
+        try:
+            for seed in range(10):
+                self.random_edits(seed)
+        finally:
+            analytics.CROSS_SCAN_LIMIT = limit
+
+    def test_cycle(self):
+        graph = Graph()
+        stats = graph.track_analytics()
+        for node_id in range(1, 5):
+            graph.add_node(Node(node_id, 0.0, 0.0, 10.0, 10.0, "x"))
+        graph.add_edge(1, 2)
+        graph.add_edge(2, 3)
+        self.assertIsNone(stats.find_cycle())
+        graph.add_edge(3, 1)
+        self.assertEqual(stats.cycle_count, 1)
+        _, nodes = stats.find_cycle()
+        self.assertEqual(sorted(nodes), [1, 2, 3])
+        self.assertEqual(stats.component_count, 2)
+        self.assertEqual(stats.largest_components(1)[0][1], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
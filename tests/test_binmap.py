@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from mindcraft.binmap import dump_binary, load_binary_bytes
+from mindcraft.graph import Graph, Node
+
+
+def sample_map():
+    rng = random.Random(3)
+    graph = Graph()
+    for node_id in range(1, 41):
+        text = rng.choice(["Idea", "Plan", "ünïcode", "", "a longer label"])
+        graph.add_node(Node(node_id, rng.uniform(-500, 500), rng.uniform(-500, 500), 80.0, 40.0, text))
+    for _ in range(60):
+        a, b = rng.sample(range(1, 41), 2)
+        graph.add_edge(a, b)
+    return graph
+
+
+def contents(graph):
+    nodes = sorted((n.id, n.x, n.y, n.text) for n in graph.nodes.values())
+    return nodes, sorted((c.from_id, c.to_id) for c in graph.edges.values())
+
+
+class BinaryMapTest(unittest.TestCase):
+    def test_round_trip(self):
+        graph = sample_map()
+        self.assertEqual(contents(load_binary_bytes(dump_binary(graph))), contents(graph))
+
+    def test_empty_map(self):
+        self.assertEqual(len(load_binary_bytes(dump_binary(Graph()))), 0)
+
+    def test_truncated_data_is_rejected(self):
+        data = dump_binary(sample_map())
+        for length in range(len(data)):
+            with self.assertRaises(ValueError):
+                load_binary_bytes(data[:length])
+
+    def test_corrupt_bytes_raise_value_error(self):
+        data = dump_binary(sample_map())
+        rng = random.Random(5)
+        for _ in range(300):
+            corrupt = bytearray(data)
+            for _ in range(rng.randint(1, 4)):
+                corrupt[rng.randrange(len(corrupt))] = rng.randrange(256)
+            try:
+                load_binary_bytes(bytes(corrupt))
+            except ValueError:
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
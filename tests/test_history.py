@@ -0,0 +1,69 @@
+import unittest
+
+from mindcraft.history import RECORD_BYTES, Command, History
+
+
+def move(node_id, x):
+    return {"op": "move", "id": node_id, "x": x, "y": 0.0}
+
+
+def drag(x, previous):
+    return Command("Move", [move(1, x)], [move(1, previous)], merge_key=("drag", 1))
+
+
+class HistoryTest(unittest.TestCase):
+    def test_commands_with_the_same_key_merge(self):
+        history = History()
+        for x in range(1, 6):
+            history.record(drag(float(x), float(x - 1)))
+        self.assertEqual(len(history), 1)
+        command = history.undo()
+        self.assertEqual(command.undo, [move(1, 0.0)])  # the first undo
+        self.assertEqual(command.do, [move(1, 5.0)])  # the latest do
+        self.assertEqual(history.size, command.size)
+
+    def test_an_undone_command_does_not_merge(self):
+        history = History()
+        history.record(drag(1.0, 0.0))
+        history.undo()
+        history.redo()
+        history.record(drag(2.0, 1.0))
+        self.assertEqual(len(history), 2)
+
+    def test_other_keys_do_not_merge(self):
+        history = History()
+        history.record(drag(1.0, 0.0))
+        history.record(Command("Add", [{"op": "create", "id": 2, "x": 0.0, "y": 0.0, "text": ""}],
+                               [{"op": "delete", "id": 2}]))
+        history.record(drag(2.0, 1.0))
+        self.assertEqual(len(history), 3)
+
+    def test_oldest_entries_are_evicted(self):
+        history = History(limit=3 * 2 * RECORD_BYTES)
+        commands = [Command(str(i), [move(i, 1.0)], [move(i, 0.0)]) for i in range(10)]
+        for command in commands:
+            history.record(command)
+        self.assertEqual(len(history), 3)
+        self.assertLessEqual(history.size, history.limit)
+        self.assertIs(history.undo(), commands[-1])
+
+    def test_the_newest_entry_is_kept_over_the_limit(self):
+        history = History(limit=RECORD_BYTES)
+        history.record(Command("Move", [move(1, 1.0)], [move(1, 0.0)]))
+        history.record(Command("Move", [move(2, 1.0)], [move(2, 0.0)]))
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history.undo().label, "Move")
+
+    def test_recording_drops_redo(self):
+        history = History()
+        history.record(Command("a", [move(1, 1.0)], [move(1, 0.0)]))
+        history.record(Command("b", [move(2, 1.0)], [move(2, 0.0)]))
+        history.undo()
+        self.assertTrue(history.can_redo)
+        history.record(Command("c", [move(3, 1.0)], [move(3, 0.0)]))
+        self.assertFalse(history.can_redo)
+        self.assertEqual(history.size, 2 * 2 * RECORD_BYTES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from mindcraft.graph import Graph
+from mindcraft.journal import Journal
+from mindcraft.ops import apply_op
+
+
+def create(node_id, x=0.0):
+    return {"op": "create", "id": node_id, "x": x, "y": 0.0, "text": f"n{node_id}"}
+
+
+def contents(graph):
+    nodes = sorted((n.id, n.x, n.y, n.text) for n in graph.nodes.values())
+    return nodes, sorted((c.from_id, c.to_id) for c in graph.edges.values())
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.dir.name, "map.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, journal, ops):
+        for op in ops:
+            journal.append(op)
+        journal.flush()
+
+    def test_recover_replays_the_journal(self):
+        journal = Journal(self.base)
+        self.write(journal, [create(1), create(2), {"op": "connect", "from": 1, "to": 2}])
+        journal.close()
+        graph = Journal(self.base).recover()
+        self.assertEqual(contents(graph), ([(1, 0.0, 0.0, "n1"), (2, 0.0, 0.0, "n2")], [(1, 2)]))
+
+    def test_recover_skips_a_torn_final_record(self):
+        journal = Journal(self.base)
+        self.write(journal, [create(1), create(2)])
+        journal.close()
+        with open(journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"op":"connect","from":1,"to"')  # crashed mid-write
+        recovered = Journal(self.base)
+        self.assertTrue(recovered.has_recovery())
+        nodes, edges = contents(recovered.recover())
+        self.assertEqual([node[0] for node in nodes], [1, 2])
+        self.assertEqual(edges, [])
+
+    def test_moves_in_a_row_keep_only_the_last(self):
+        journal = Journal(self.base)
+        journal.append(create(1))
+        for x in range(5):
+            journal.append({"op": "move", "id": 1, "x": float(x), "y": 0.0})
+        self.assertEqual(journal.flush(), 2)
+        journal.close()
+        nodes, _ = contents(Journal(self.base).recover())
+        self.assertEqual(nodes, [(1, 4.0, 0.0, "n1")])
+
+    def test_recover_after_compaction(self):
+        graph = Graph()
+        journal = Journal(self.base)
+        before = [create(1), create(2), {"op": "connect", "from": 1, "to": 2}]
+        for op in before:
+            apply_op(graph, op)
+        self.write(journal, before)
+        journal.compact(graph.snapshot())
+        after = [create(3, 5.0), {"op": "connect", "from": 2, "to": 3}, {"op": "delete", "id": 1}]
+        for op in after:
+            apply_op(graph, op)
+        self.write(journal, after)
+        journal.close()
+        self.assertTrue(os.path.exists(journal.snapshot_path))
+        self.assertFalse(os.path.exists(journal.prev_path))
+        self.assertEqual(contents(Journal(self.base).recover()), contents(graph))
+
+    def test_recover_replays_an_unfinished_compaction(self):
+        journal = Journal(self.base)
+        self.write(journal, [create(1), create(2)])
+        journal.close()
+        # the snapshot was never written: its edits are still in .prev
+        os.replace(journal.journal_path, journal.prev_path)
+        journal = Journal(self.base)
+        self.write(journal, [{"op": "connect", "from": 1, "to": 2}])
+        journal.close()
+        _, edges = contents(Journal(self.base).recover())
+        self.assertEqual(edges, [(1, 2)])
+
+    def test_discard_removes_the_autosave(self):
+        journal = Journal(self.base)
+        self.write(journal, [create(1)])
+        journal.discard()
+        self.assertFalse(Journal(self.base).has_recovery())
+
+
+if __name__ == "__main__":
+    unittest.main()
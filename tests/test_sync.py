@@ -0,0 +1,97 @@
+import random
+import unittest
+
+from mindcraft.graph import Graph, Node
+from mindcraft.ops import apply_op
+from mindcraft.sync import Pending
+
+
+def three_nodes():
+    graph = Graph()
+    for node_id in (1, 2, 3):
+        graph.add_node(Node(node_id, node_id * 100.0, 0.0, 80.0, 40.0, "x"))
+    return graph
+
+
+def connections(graph):
+    return sorted((c.from_id, c.to_id) for c in graph.edges.values())
+
+
+class RebaseTest(unittest.TestCase):
+    def remote_first(self, local, remote):
+        """Apply `local` as pending in one window, with `remote` ordered
+        before it by the server; return (server, window)."""
+        server = three_nodes()
+        window = three_nodes()
+        pending = Pending()
+        for op in local:
+            apply_op(window, op)
+        pending.sent(1, local)
+        for op in remote + local:
+            apply_op(server, op)
+        for op in pending.rebase(remote):
+            apply_op(window, op)
+        pending.acked(1)
+        return server, window
+
+    def test_remote_connect_of_the_same_pair_keeps_its_direction(self):
+        server, window = self.remote_first(
+            [{"op": "connect", "from": 2, "to": 1}],
+            [{"op": "connect", "from": 1, "to": 2}],
+        )
+        self.assertEqual(connections(window), connections(server))
+        self.assertEqual(window.tree.parent, server.tree.parent)
+        self.assertEqual(window.tree.parent, {2: 1})
+
+    def test_remote_disconnect_of_the_same_pair(self):
+        server, window = self.remote_first(
+            [{"op": "connect", "from": 2, "to": 1}],
+            [{"op": "disconnect", "from": 1, "to": 2}],
+        )
+        self.assertEqual(connections(window), connections(server))
+
+    def test_remote_connect_to_the_same_child_takes_it(self):
+        server, window = self.remote_first(
+            [{"op": "connect", "from": 1, "to": 3}],
+            [{"op": "connect", "from": 2, "to": 3}],
+        )
+        self.assertEqual(connections(window), connections(server))
+        self.assertEqual(window.tree.parent, server.tree.parent)
+
+    def test_random_two_window_sessions_agree(self):
+        rng = random.Random(7)
+        ids = [1, 2, 3, 4, 5]
+        for _ in range(2000):
+            server = Graph()
+            windows = [Graph(), Graph()]
+            for graph in [server] + windows:
+                for node_id in ids:
+                    graph.add_node(Node(node_id, 0.0, 0.0, 80.0, 40.0, "x"))
+            batches = []
+            for graph in windows:
+                pending = Pending()
+                ops = []
+                for _ in range(rng.randint(1, 3)):
+                    a, b = rng.sample(ids, 2)
+                    kind = "connect" if rng.random() < 0.7 else "disconnect"
+                    if kind == "connect" and graph.has_edge(a, b):
+                        continue  # the app only records connections it made
+                    op = {"op": kind, "from": a, "to": b}
+                    apply_op(graph, op)
+                    ops.append(op)
+                pending.sent(1, ops)
+                batches.append((graph, pending, ops))
+            # the server takes the second window's batch first
+            (first, first_pending, first_ops), (second, _, second_ops) = batches
+            for op in second_ops + first_ops:
+                apply_op(server, op)
+            for op in first_pending.rebase(second_ops):
+                apply_op(first, op)
+            for op in first_ops:
+                apply_op(second, op)
+            for graph in windows:
+                self.assertEqual(connections(graph), connections(server))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from mindcraft.tree import TreeIndex
+
+
+def sample_tree():
+    """1 -> 2 -> 3 -> 4, 2 -> 5 and 1 -> 6."""
+    tree = TreeIndex()
+    for node_id in range(1, 7):
+        tree.add_node(node_id)
+    for child, parent in ((2, 1), (3, 2), (4, 3), (5, 2), (6, 1)):
+        tree.attach(child, parent)
+    return tree
+
+
+class TreeIndexTest(unittest.TestCase):
+    def test_sizes(self):
+        tree = sample_tree()
+        self.assertEqual(tree.size, {1: 6, 2: 4, 3: 2, 4: 1, 5: 1, 6: 1})
+        self.assertIsNone(tree.attach(1, 4))  # would close a cycle
+        self.assertIsNone(tree.attach(3, 6))  # already has a parent
+
+    def test_load_matches_attach(self):
+        loaded = TreeIndex()
+        loaded.load(range(1, 7), [(2, 1), (3, 2), (4, 3), (5, 2), (6, 1), (1, 4), (3, 6)])
+        tree = sample_tree()
+        self.assertEqual(loaded.parent, tree.parent)
+        self.assertEqual(loaded.size, tree.size)
+
+    def test_collapse_and_expand(self):
+        tree = sample_tree()
+        self.assertEqual(sorted(tree.collapse(2)), [3, 4, 5])
+        self.assertEqual(tree.hidden, {3, 4, 5})
+        self.assertEqual(tree.collapse(2), [])
+        self.assertEqual(sorted(tree.expand(2)), [3, 4, 5])
+        self.assertEqual(tree.hidden, set())
+
+    def test_nested_collapse(self):
+        tree = sample_tree()
+        tree.collapse(3)
+        self.assertEqual(tree.hidden, {4})
+        self.assertEqual(sorted(tree.collapse(1)), [2, 3, 5, 6])
+        self.assertEqual(tree.collapse(3), [])
+        self.assertEqual(tree.collapsed_ancestors(4), [3, 1])
+        # nodes below 3 stay hidden when 1 is expanded
+        self.assertEqual(sorted(tree.expand(1)), [2, 3, 5, 6])
+        self.assertEqual(tree.hidden, {4})
+        # expanding a hidden collapsed node shows nothing yet
+        tree.collapse(1)
+        self.assertEqual(tree.expand(3), [])
+        self.assertEqual(sorted(tree.expand(1)), [2, 3, 4, 5, 6])
+
+    def test_attach_and_detach_under_a_collapsed_node(self):
+        tree = sample_tree()
+        tree.add_node(7)
+        tree.add_node(8)
+        tree.attach(8, 7)
+        tree.collapse(2)
+        self.assertEqual(tree.attach(7, 5), ([7, 8], []))
+        self.assertEqual(tree.hidden, {3, 4, 5, 7, 8})
+        self.assertEqual(tree.size[1], 8)
+        self.assertEqual(tree.detach(7), ([], [7, 8]))
+        self.assertEqual(tree.hidden, {3, 4, 5})
+        self.assertEqual(tree.size[1], 6)
+        self.assertEqual(sorted(tree.detach(3)[1]), [3, 4])
+        self.assertEqual(tree.hidden, {5})
+
+
+if __name__ == "__main__":
+    unittest.main()